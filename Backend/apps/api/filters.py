@@ -1,6 +1,9 @@
 from django_filters.rest_framework import CharFilter, FilterSet
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
 
 from .models import BlogPost
+from .search import get_backend
 
 
 class BlogFilter(FilterSet):
@@ -14,3 +17,18 @@ class BlogFilter(FilterSet):
     class Meta:
         model = BlogPost
         fields = ["title", "description", "category_id", "category_name"]
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    ``?search=`` through the configured blog search backend, best matches
+    first; see ``apps.api.search``.
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        return get_backend().search(queryset, query)
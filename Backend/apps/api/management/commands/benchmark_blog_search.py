@@ -0,0 +1,83 @@
+import itertools
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.api.models import BlogPost, PostCategory
+from apps.api.search import LikeBackend, SQLiteFTSBackend
+from apps.reports import benchmarking
+
+SYLLABLES = "ka ri mo sa de lu na ti po ve ha zu".split()
+# 1,728 made-up words; a few are common, most are rare.
+WORDS = ["".join(parts) for parts in itertools.product(SYLLABLES, repeat=3)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds ROWS blog posts inside a transaction, compares the old "
+        "icontains search with the FTS5 index, then rolls back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+
+        def text(count):
+            return " ".join(rng.choices(WORDS, weights, k=count))
+
+        queries = [
+            WORDS[1700],  # rare
+            WORDS[100],
+            f"{WORDS[20]} {WORDS[300]}",
+            WORDS[900][:4],  # prefix
+            "nosuchword",
+            WORDS[0],  # in nearly every post, like a stop word
+        ]
+
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['rows']:,} posts...")
+            categories = PostCategory.objects.bulk_create(
+                PostCategory(category_name=text(2)) for _ in range(20)
+            )
+            benchmarking.batched(
+                BlogPost,
+                options["rows"],
+                lambda i: BlogPost(
+                    title=text(5), description=text(80), category=rng.choice(categories)
+                ),
+            )
+            _, best = benchmarking.measure(SQLiteFTSBackend().rebuild, 1)
+            self.stdout.write(f"Index build: {best:.0f} ms")
+
+            # BlogPostViewSet is unpaginated, so "all" is what a search
+            # request costs today; "top 20" is what a paged client would see.
+            self.stdout.write(
+                f"{'query':<16}{'impl':<10}{'results':>9}{'all ms':>10}{'top 20 ms':>11}"
+            )
+            for query in queries:
+                for label, backend in (
+                    ("icontains", LikeBackend()),
+                    ("fts5", SQLiteFTSBackend()),
+                ):
+
+                    def search():
+                        return backend.search(BlogPost.objects.all(), query)
+
+                    _, every = benchmarking.measure(
+                        lambda: list(search().values_list("pk", flat=True)),
+                        options["repeat"],
+                    )
+                    _, top = benchmarking.measure(
+                        lambda: list(search()[:20]), options["repeat"]
+                    )
+                    self.stdout.write(
+                        f"{query:<16}{label:<10}{search().count():>9}"
+                        f"{every:>10.1f}{top:>11.1f}"
+                    )
+
+            transaction.set_rollback(True)
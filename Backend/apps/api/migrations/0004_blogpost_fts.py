@@ -0,0 +1,53 @@
+from django.db import OperationalError, migrations
+
+# The FTS5 table from apps.api.search.SQLiteFTSBackend as it was when this
+# migration was written, frozen so later changes there can't change it.
+
+FTS_TABLE = "api_blogpost_fts"
+
+
+def create_fts_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    BlogPost = apps.get_model("api", "BlogPost")
+    rows = (
+        BlogPost.objects.using(connection.alias)
+        .order_by()
+        .values_list("pk", "title", "description", "category__category_name")
+    )
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "title, description, category_name, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5; search falls back to LikeBackend.
+            return
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, description, category_name) "
+            "VALUES (%s, %s, %s, %s)",
+            list(rows.iterator(chunk_size=1000)),
+        )
+
+
+def drop_fts_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_alter_blogpost_image"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -1,15 +1,10 @@
-from django.contrib.auth import get_user_model
-from rest_framework.permissions import BasePermission
+from apps.users.permissions import RolePermission
 
 
-class CanUpdatePrice(BasePermission):
+class CanUpdatePrice(RolePermission):
     """
     Custom permission to allow only receptionists to update prices.
     """
 
-    def has_permission(self, request, view):
-        User = get_user_model()  # Get the User model from Django's auth app
-
-        # Ensure the user is authenticated and has the role 'Reception'
-        user_role = request.user.role
-        return user_role == 2  # 2 corresponds to the 'Reception' role
+    def get_action(self, request, view):
+        return "orders.update_price"
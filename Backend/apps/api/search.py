@@ -0,0 +1,248 @@
+"""
+Full-text search over blog posts.
+
+The search goes through a backend chosen by ``settings.BLOG_SEARCH_BACKEND``
+(a dotted path), or by the database vendor when that isn't set:
+
+- ``SQLiteFTSBackend`` keeps an FTS5 table, ``api_blogpost_fts``, with one
+  row per post (title, description and category name, rowid = post id).
+  ``apps.api.signals`` writes to it whenever a post or category changes.
+  Results are ranked with bm25, weighting title over category over body,
+  and come with a highlighted snippet of the description (see
+  ``render_snippet``).
+- ``PostgresFTSBackend`` uses PostgreSQL's own text search: the same
+  fields and weighting, ``websearch`` query syntax, ``ts_rank`` ordering
+  and ``ts_headline`` snippets. It needs nothing kept in sync.
+- ``LikeBackend`` is the old ``icontains`` filter; it works everywhere and
+  is what other databases get until they have a backend of their own, as
+  does SQLite when it was built without FTS5 (no ``api_blogpost_fts``).
+
+Both expose ``index``, ``remove``, ``rebuild`` and ``search``, so the
+signals and ``BlogPostViewSet`` never need to know which one is active.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import Substr
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+SNIPPET_WORDS = 16
+BATCH_SIZE = 1000
+# The database marks matches with these control characters rather than
+# with <mark>, so the description can be escaped before the tags go in.
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_STOP = "\x03"
+
+
+def render_snippet(snippet):
+    """
+    HTML for a backend's ``snippet``: the description text escaped, and the
+    highlighted matches wrapped in ``<mark>``.
+    """
+    if snippet is None:
+        return None
+    return (
+        escape(snippet)
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_STOP, "</mark>")
+    )
+
+
+class LikeBackend:
+    """
+    Every word must appear (``icontains``) in the title, description or
+    category name. Nothing to maintain, but no ranking and no index use.
+    """
+
+    def index(self, posts):
+        pass
+
+    def remove(self, post_ids):
+        pass
+
+    def rebuild(self, queryset=None):
+        pass
+
+    def search(self, queryset, query):
+        matches = Q()
+        for word in query.split():
+            matches &= (
+                Q(title__icontains=word)
+                | Q(description__icontains=word)
+                | Q(category__category_name__icontains=word)
+            )
+        return queryset.filter(matches).annotate(
+            rank=Value(None, output_field=FloatField()),
+            snippet=Substr("description", 1, 200),
+        )
+
+
+class SQLiteFTSBackend:
+    table = "api_blogpost_fts"
+    # bm25 weights for (title, description, category_name).
+    weights = (10.0, 1.0, 5.0)
+    # Set once the table has been seen, so only a missing table is looked up
+    # again.
+    _available = False
+
+    @classmethod
+    def available(cls):
+        if not cls._available:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = %s", [cls.table]
+                )
+                cls._available = cursor.fetchone() is not None
+        return cls._available
+
+    def create(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                "title, description, category_name, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+        SQLiteFTSBackend._available = True
+
+    def drop(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+        SQLiteFTSBackend._available = False
+
+    def index(self, posts):
+        """
+        Writes (or rewrites) the index rows for ``posts``, any iterable of
+        posts with their category loaded or loadable.
+        """
+        batch = []
+        for post in posts:
+            batch.append(
+                (post.pk, post.title, post.description, post.category.category_name)
+            )
+            if len(batch) == BATCH_SIZE:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f"INSERT INTO {self.table}(rowid, title, description, category_name) "
+                "VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+
+    def rebuild(self, queryset=None):
+        """
+        Reindexes every post, e.g. after a bulk import that skipped signals.
+        """
+        from .models import BlogPost
+
+        if queryset is None:
+            queryset = BlogPost.objects.all()
+        self.create()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+        self.index(queryset.select_related("category").iterator(chunk_size=BATCH_SIZE))
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [(pk,) for pk in post_ids],
+            )
+
+    def match_expression(self, query):
+        """
+        Turns free text into an FTS5 query: every word must match, and the
+        last one may be a prefix, so results follow the user as they type.
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return None
+        terms = ['"{}"'.format(word) for word in words]
+        terms[-1] += "*"
+        return " ".join(terms)
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if match is None:
+            return queryset.none()
+        weights = ", ".join(str(weight) for weight in self.weights)
+        return queryset.extra(
+            select={
+                "rank": f"bm25({self.table}, {weights})",
+                "snippet": (f"snippet({self.table}, 1, %s, %s, '…', {SNIPPET_WORDS})"),
+            },
+            select_params=[HIGHLIGHT_START, HIGHLIGHT_STOP],
+            tables=[self.table],
+            where=[
+                f"{self.table}.rowid = api_blogpost.id",
+                f"{self.table} MATCH %s",
+            ],
+            params=[match],
+        ).order_by("rank")
+
+
+class PostgresFTSBackend(LikeBackend):
+    """
+    Builds the weighted document per query, so there is no index to
+    maintain (``index``, ``remove`` and ``rebuild`` are no-ops). The
+    category name is a join, which keeps it out of an expression index;
+    add a stored ``SearchVectorField`` if posts ever outgrow a scan.
+    """
+
+    config = "simple"
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import (
+            SearchHeadline,
+            SearchQuery,
+            SearchRank,
+            SearchVector,
+        )
+
+        vector = (
+            SearchVector("title", weight="A", config=self.config)
+            + SearchVector("category__category_name", weight="B", config=self.config)
+            + SearchVector("description", weight="C", config=self.config)
+        )
+        search_query = SearchQuery(query, search_type="websearch", config=self.config)
+        return (
+            queryset.annotate(
+                document=vector,
+                rank=SearchRank(vector, search_query),
+                snippet=SearchHeadline(
+                    "description",
+                    search_query,
+                    config=self.config,
+                    start_sel=HIGHLIGHT_START,
+                    stop_sel=HIGHLIGHT_STOP,
+                    max_words=SNIPPET_WORDS,
+                ),
+            )
+            .filter(document=search_query)
+            .order_by("-rank")
+        )
+
+
+def get_backend():
+    path = getattr(settings, "BLOG_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "sqlite":
+        if SQLiteFTSBackend.available():
+            return SQLiteFTSBackend()
+        return LikeBackend()
+    if connection.vendor == "postgresql":
+        return PostgresFTSBackend()
+    return LikeBackend()
@@ -1,5 +1,6 @@
 from apps.api.models import BlogPost, Category, Order, PostCategory, Reception
 from apps.users.serializers import UserSerializer
+from apps.api.search import render_snippet
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 
@@ -126,10 +127,23 @@ from .models import BlogPost, PostCategory
 
 class BlogPostSerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(queryset=PostCategory.objects.all())
+    # Only filled in for ?search= results.
+    snippet = serializers.SerializerMethodField()
 
     class Meta:
         model = BlogPost
-        fields = ["id", "title", "category", "image", "description", "created_at"]
+        fields = [
+            "id",
+            "title",
+            "category",
+            "image",
+            "description",
+            "created_at",
+            "snippet",
+        ]
+
+    def get_snippet(self, obj):
+        return render_snippet(getattr(obj, "snippet", None))
 
     def create(self, validated_data):
         category = validated_data.pop("category")
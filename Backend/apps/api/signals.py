@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import BlogPost, PostCategory
+from .search import get_backend
+
+
+@receiver(post_save, sender=BlogPost)
+def index_blog_post(sender, instance, **kwargs):
+    get_backend().index([instance])
+
+
+@receiver(post_delete, sender=BlogPost)
+def remove_blog_post(sender, instance, **kwargs):
+    get_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=PostCategory)
+def reindex_category_posts(sender, instance, created, **kwargs):
+    # The category name is indexed with every post in it.
+    if not created:
+        posts = instance.blogpost_set.all()
+        get_backend().index(posts.iterator(chunk_size=1000))
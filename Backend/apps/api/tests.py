@@ -1,3 +1,86 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory
 
-# Create your tests here.
+from .models import BlogPost, PostCategory
+from .search import LikeBackend, SQLiteFTSBackend, get_backend
+from .views import BlogPostViewSet
+
+
+class BlogSearchTests(TestCase):
+    def setUp(self):
+        self.health = PostCategory.objects.create(category_name="Health")
+        self.news = PostCategory.objects.create(category_name="News")
+        self.vaccines = BlogPost.objects.create(
+            title="Vaccination schedule",
+            description="When children should get each vaccine.",
+            category=self.health,
+        )
+        self.clinic = BlogPost.objects.create(
+            title="New clinic hours",
+            description="The clinic now also offers vaccination on Fridays.",
+            category=self.news,
+        )
+
+    def search(self, query):
+        view = BlogPostViewSet.as_view({"get": "list"})
+        response = view(APIRequestFactory().get("/blog/blog-posts/", {"search": query}))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def ids(self, query):
+        return [post["id"] for post in self.search(query)]
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self.ids("vaccination"), [self.vaccines.pk, self.clinic.pk])
+
+    def test_last_word_matches_as_a_prefix(self):
+        self.assertEqual(self.ids("clinic fri"), [self.clinic.pk])
+
+    def test_snippet_highlights_the_match(self):
+        (post,) = self.search("fridays")
+        self.assertIn("<mark>Fridays</mark>", post["snippet"])
+
+    def test_snippet_escapes_the_description(self):
+        BlogPost.objects.create(
+            title="Visiting hours",
+            description='<script>alert("x")</script> Visitors welcome daily.',
+            category=self.news,
+        )
+
+        (post,) = self.search("visitors")
+        self.assertNotIn("<script>", post["snippet"])
+        self.assertIn("&lt;script&gt;", post["snippet"])
+        self.assertIn("<mark>Visitors</mark>", post["snippet"])
+
+    def test_search_is_routed(self):
+        response = APIClient().get("/api/blog/blog-posts/", {"search": "fridays"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post["id"] for post in response.data], [self.clinic.pk])
+
+    def test_index_follows_edits_deletes_and_category_renames(self):
+        self.vaccines.title = "Immunisation schedule"
+        self.vaccines.save()
+        self.clinic.delete()
+        self.assertEqual(self.ids("vaccination"), [])
+        self.assertEqual(self.ids("immunisation"), [self.vaccines.pk])
+
+        self.health.category_name = "Wellbeing"
+        self.health.save()
+        self.assertEqual(self.ids("wellbeing"), [self.vaccines.pk])
+
+    @override_settings(BLOG_SEARCH_BACKEND="apps.api.search.LikeBackend")
+    def test_backend_is_pluggable(self):
+        self.assertEqual(
+            sorted(self.ids("vaccin")), sorted([self.vaccines.pk, self.clinic.pk])
+        )
+
+    def test_falls_back_to_like_without_the_fts_table(self):
+        # As on an SQLite build without FTS5, where migration 0004 skips it.
+        SQLiteFTSBackend().drop()
+        self.assertIsInstance(get_backend(), LikeBackend)
+
+        BlogPost.objects.create(
+            title="Flu season", description="Book early.", category=self.news
+        )
+        self.assertEqual(len(self.ids("flu")), 1)
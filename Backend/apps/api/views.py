@@ -1,12 +1,12 @@
 from apps.api import serializers as api_serializer
-from django.contrib.auth.models import User
+from apps.users.models import User
+from apps.users.permissions import role_allows
 from django_filters.rest_framework.backends import DjangoFilterBackend
 from rest_framework import generics, viewsets
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.filters import SearchFilter
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
-from .filters import BlogFilter
+from .filters import BlogFilter, FullTextSearchFilter
 from .models import BlogPost, Category, PostCategory, Reception
 from .serializers import (
     BlogPostSerializer,
@@ -25,10 +25,10 @@ class ReceptionCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
 
-        if user.role == user.Designer:
+        if user.role == User.Doctor:
             # Designers can only see orders assigned to them
             return Reception.objects.filter(designer=user)
-        elif user.role == user.Reception:
+        elif user.role == User.Reception:
             # Receptionists can see orders that have either no prices or any other status
             return (
                 Reception.objects.all()
@@ -40,7 +40,7 @@ class ReceptionCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         user = self.request.user
 
-        if user.role == user.Designer:
+        if role_allows(user, "orders.create"):
             # Only Designers can create new orders
             serializer.save(designer=user)
         else:
@@ -49,7 +49,7 @@ class ReceptionCreateView(generics.ListCreateAPIView):
     def perform_update(self, serializer):
         user = self.request.user
 
-        if user.role == user.Reception:
+        if role_allows(user, "orders.update_price"):
             # Only Receptionists can update orders (like setting prices)
             serializer.save(updated_by=user)
         else:
@@ -115,6 +115,5 @@ class BlogPostViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     queryset = BlogPost.objects.all()
     serializer_class = BlogPostSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_class = BlogFilter
-    search_fields = ["title", "description", "category__category_name"]
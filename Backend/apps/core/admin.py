@@ -4,6 +4,7 @@ from .models import (
     CategoryType,
     DailyExpense,
     DailyExpensePharmacy,
+    DrugConsumption,
     LabTest,
     Patient,
     Pharmaceutical,
@@ -68,6 +69,7 @@ class PharmaceuticalDrugInline(admin.TabularInline):
 @admin.register(Pharmaceutical)
 class PharmaceuticalAdmin(admin.ModelAdmin):
     list_display = ("patient_name", "doctor_name", "price", "created_at")
+    list_select_related = ("patient_name", "doctor_name")
     search_fields = ("patient_name__name", "doctor_name__username")
     list_filter = ("created_at",)
     inlines = [PharmaceuticalDrugInline]
@@ -143,5 +145,22 @@ class TestTypeAdmin(admin.ModelAdmin):
 @admin.register(LabTest)
 class LabTestAdmin(admin.ModelAdmin):
     list_display = ("patient", "test_type", "price", "refer_to", "date")
+    list_select_related = ("patient", "test_type")
     search_fields = ("patient__name", "refer_to")
     list_filter = ("test_type", "date")
+
+
+# -------------------------------
+# DrugConsumption Admin
+# -------------------------------
+@admin.register(DrugConsumption)
+class DrugConsumptionAdmin(admin.ModelAdmin):
+    list_display = (
+        "drug",
+        "avg_7_days",
+        "peak_daily",
+        "reorder_point",
+        "computed_for",
+    )
+    list_select_related = ("drug",)
+    search_fields = ("drug__name",)
@@ -1,4 +1,22 @@
 from django.apps import AppConfig
+from django.core.exceptions import FieldDoesNotExist
+from django.db import router
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, apps=None, **kwargs):
+    from .search import ensure_fts_index
+
+    if not router.allow_migrate(using, sender.label):
+        return
+    if apps is not None:
+        # Migrating back past the column the index covers.
+        try:
+            apps.get_model("core", "Patient")._meta.get_field("name_normalized")
+        except (LookupError, FieldDoesNotExist):
+            return
+    ensure_fts_index(using)
 
 
 class CoreConfig(AppConfig):
@@ -6,4 +24,7 @@ class CoreConfig(AppConfig):
     name = "apps.core"
 
     def ready(self):
-        import apps.core.signals
+        from .db import configure_sqlite
+
+        post_migrate.connect(ensure_search_index, sender=self)
+        connection_created.connect(configure_sqlite)
@@ -0,0 +1,57 @@
+"""
+Per-connection database setup.
+
+``configure_sqlite`` runs on ``connection_created`` and applies
+``settings.SQLITE_PRAGMAS`` to each new SQLite connection. Journal mode is
+stored in the database file, so it is only switched when it differs; the
+rest of the pragmas last for the life of the connection, which with
+``CONN_MAX_AGE`` spans many requests.
+"""
+
+from django.conf import settings
+
+# Accepted values, checked before they're formatted into a PRAGMA statement
+# (pragmas can't take query parameters).
+JOURNAL_MODES = {"delete", "truncate", "persist", "memory", "wal", "off"}
+SYNCHRONOUS = {"off", "normal", "full", "extra"}
+TEMP_STORES = {"default", "file", "memory"}
+
+
+def pragma_statements(pragmas):
+    """
+    Turns a ``{pragma: value}`` dict into PRAGMA statements, rejecting
+    anything that isn't a known pragma with a valid value.
+    """
+    statements = []
+    for name, value in pragmas.items():
+        if name in ("busy_timeout", "cache_size", "mmap_size"):
+            value = int(value)
+        elif name == "journal_mode" and str(value).lower() in JOURNAL_MODES:
+            value = str(value).lower()
+        elif name == "synchronous" and str(value).lower() in SYNCHRONOUS:
+            value = str(value).lower()
+        elif name == "temp_store" and str(value).lower() in TEMP_STORES:
+            value = str(value).lower()
+        else:
+            raise ValueError(f"Unsupported SQLite pragma {name}={value!r}.")
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = dict(getattr(settings, "SQLITE_PRAGMAS", {}))
+    if not pragmas:
+        return
+
+    with connection.cursor() as cursor:
+        journal_mode = pragmas.pop("journal_mode", None)
+        if journal_mode:
+            cursor.execute("PRAGMA journal_mode")
+            # In-memory test databases report "memory" and can't use WAL.
+            current = cursor.fetchone()[0]
+            if current not in (journal_mode.lower(), "memory"):
+                cursor.execute(pragma_statements({"journal_mode": journal_mode})[0])
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
@@ -0,0 +1,140 @@
+"""
+Drug consumption analytics.
+
+Dispensing history is pulled in one grouped query as a drugs x days matrix,
+and every figure (moving averages, spread, reorder points) is computed for
+all drugs at once with NumPy. Results land in ``DrugConsumption`` so reorder
+planning reads one small table instead of the whole dispensing history.
+
+``Stock.avg_daily_usage`` is the live 30-day average that dispensing keeps
+current (see ``services.refresh_usage``) and is refreshed here too. Reorder
+points don't use it: it always ends now, while the spread and peak come
+from the history ending at ``end_date``, so they take the mean of that same
+30-day window instead.
+"""
+
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.reports.engine import day_start
+
+from .models import DrugConsumption, PharmaceuticalDrug, Stock
+from .services import refresh_usage
+
+HISTORY_DAYS = 90
+LEAD_TIME_DAYS = 7
+# z-score for a ~95% chance of not running out during the lead time.
+SERVICE_LEVEL_Z = 1.65
+
+
+def usage_matrix(end_date, days=HISTORY_DAYS, drug_ids=None):
+    """
+    Returns ``(drug_ids, matrix)`` where ``matrix[i, j]`` is the amount of
+    drug ``drug_ids[i]`` dispensed on day ``j`` of the ``days`` days ending
+    with ``end_date``. Drugs with no usage get a row of zeros.
+
+    ``drug_ids`` (sorted) defaults to every drug. Usage of drugs that are not
+    in it, such as drugs added after it was read, is left out.
+    """
+    first_day = end_date - timedelta(days=days - 1)
+    if drug_ids is None:
+        drug_ids = np.fromiter(
+            Stock.objects.order_by("pk").values_list("pk", flat=True), dtype=np.int64
+        )
+    rows = list(
+        PharmaceuticalDrug.objects.filter(
+            pharmaceutical__created_at__gte=day_start(first_day),
+            pharmaceutical__created_at__lt=day_start(end_date + timedelta(days=1)),
+        )
+        .annotate(day=TruncDate("pharmaceutical__created_at"))
+        .values_list("drug_id", "day")
+        .annotate(total=Sum("amount_used"))
+        .order_by()
+    )
+
+    matrix = np.zeros((len(drug_ids), days))
+    if rows and len(drug_ids):
+        drugs, day_list, totals = (np.array(column) for column in zip(*rows))
+        offsets = np.fromiter(
+            ((day - first_day).days for day in day_list), dtype=np.int64
+        )
+        positions = np.searchsorted(drug_ids, drugs)
+        known = drug_ids[np.minimum(positions, len(drug_ids) - 1)] == drugs
+        np.add.at(
+            matrix,
+            (positions[known], offsets[known]),
+            totals[known].astype(float),
+        )
+    return drug_ids, matrix
+
+
+def moving_average(matrix, window):
+    """
+    Trailing ``window``-day mean for every drug and day, shape
+    ``(drugs, days - window + 1)``.
+    """
+    cumulative = np.cumsum(matrix, axis=1)
+    cumulative = np.concatenate([np.zeros((len(matrix), 1)), cumulative], axis=1)
+    return (cumulative[:, window:] - cumulative[:, :-window]) / window
+
+
+def summarize(matrix, lead_time=LEAD_TIME_DAYS, z=SERVICE_LEVEL_Z):
+    """
+    Per-drug figures as arrays: the latest 7-day moving average, the
+    standard deviation and peak of daily usage over the last 30 days, and
+    the reorder point ``mean * lead_time + z * std * sqrt(lead_time)`` from
+    the mean of those same 30 days.
+    """
+    recent = matrix[:, -30:]
+    avg_7 = moving_average(matrix, 7)[:, -1]
+    std_30 = recent.std(axis=1)
+    reorder_point = np.ceil(
+        recent.mean(axis=1) * lead_time + z * std_30 * math.sqrt(lead_time)
+    )
+    return {
+        "avg_7_days": avg_7.round(2),
+        "std_daily": std_30.round(2),
+        "peak_daily": recent.max(axis=1).astype(int),
+        "reorder_point": reorder_point.astype(int),
+    }
+
+
+def refresh(
+    end_date=None, days=HISTORY_DAYS, lead_time=LEAD_TIME_DAYS, z=SERVICE_LEVEL_Z
+):
+    """
+    Recomputes ``DrugConsumption`` for every drug from the ``days`` days up
+    to ``end_date`` (yesterday by default, the last complete day), after
+    bringing ``Stock.avg_daily_usage`` up to date. Returns the number of
+    drugs summarized.
+    """
+    if days < 30:
+        raise ValueError("At least 30 days of history are needed.")
+    if end_date is None:
+        end_date = timezone.localdate() - timedelta(days=1)
+
+    refresh_usage()
+    drug_ids, matrix = usage_matrix(end_date, days)
+    figures = summarize(matrix, lead_time, z)
+    summaries = [
+        DrugConsumption(
+            drug_id=int(drug_id),
+            computed_for=end_date,
+            **{name: values[i].item() for name, values in figures.items()},
+        )
+        for i, drug_id in enumerate(drug_ids)
+    ]
+
+    DrugConsumption.objects.bulk_create(
+        summaries,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["drug"],
+        update_fields=["computed_for", "updated_at", *figures],
+    )
+    return len(summaries)
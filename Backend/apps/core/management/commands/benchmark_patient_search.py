@@ -0,0 +1,66 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core.models import Patient, normalize_name
+from apps.core.search import search_patients
+from apps.reports import benchmarking
+
+FIRST_NAMES = """
+    Ahmad Mohammad Ali Hassan Hussain Omar Karim Yusuf Bilal Hamid Farid
+    Nasir Rahim Zahir Javid Tariq Fatima Maryam Zainab Aisha Khadija
+    Laila Nadia Sara Hanifa Shabnam Parisa Roya Soraya Zahra Nilofar
+    Marzia
+""".split()
+LAST_NAMES = """
+    Ahmadi Rahimi Karimi Hakimi Naziri Sultani Popal Safi Noori Hashimi
+    Azizi Yousufzai Wardak Stanikzai Barakzai Amiri Haidari Mohammadi
+    Qaderi Sadat Rezai Nazari Jalali Sharifi Habibi Akbari Samadi Zaki
+""".split()
+QUERIES = ["fat", "zainab", "karimi", "mohammad safi", "rezai", "hakimi q", "zz"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds ROWS patients inside a transaction, compares the indexed "
+        "patient search with the old icontains scan, then rolls back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+
+        def patient(i):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            return Patient(
+                name=name, name_normalized=normalize_name(name), patient_type="OPD"
+            )
+
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['rows']:,} patients...")
+            benchmarking.batched(Patient, options["rows"], patient)
+
+            self.stdout.write(
+                f"{'query':<16}{'impl':<10}{'results':>10}{'best ms':>12}"
+            )
+            for query in QUERIES:
+                for label, func in (
+                    (
+                        "icontains",
+                        lambda: list(
+                            Patient.objects.filter(name__icontains=query)[:20]
+                        ),
+                    ),
+                    ("search", lambda: search_patients(query)),
+                ):
+                    _, best = benchmarking.measure(func, options["repeat"])
+                    results = len(func())
+                    self.stdout.write(
+                        f"{query:<16}{label:<10}{results:>10}{best:>12.1f}"
+                    )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    OperationalError,
+    close_old_connections,
+    connections,
+    transaction,
+)
+from django.test.utils import override_settings
+
+from apps.core.models import CategoryType, Patient
+
+# name -> (OPTIONS, CONN_MAX_AGE, SQLITE_PRAGMAS); "tuned" is what
+# config/settings.py runs with.
+PROFILES = {
+    "default": ({}, 0, {}),
+    "tuned": (
+        {"transaction_mode": "IMMEDIATE"},
+        600,
+        {**settings.SQLITE_PRAGMAS, "journal_mode": "wal"},
+    ),
+}
+
+
+@contextmanager
+def scratch_database(path, options, conn_max_age):
+    """
+    Points the default connection at ``path`` with the given OPTIONS and
+    CONN_MAX_AGE until the block exits.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    connection.close()
+    fields = ("NAME", "OPTIONS", "CONN_MAX_AGE")
+    saved = {field: connection.settings_dict[field] for field in fields}
+    connection.settings_dict.update(
+        NAME=path, OPTIONS=options, CONN_MAX_AGE=conn_max_age
+    )
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict.update(saved)
+
+
+def serve(seed, deadline, write_ratio, results):
+    """
+    One worker process: handles "requests" until ``deadline``, each either
+    registering a patient or listing the newest ones, and cleaning up
+    connections afterwards the way ``request_finished`` does.
+    """
+    rng = random.Random(seed)
+    counts = Counter()
+    while time.monotonic() < deadline:
+        write = rng.random() < write_ratio
+        try:
+            if write:
+                # Read, then write, in one transaction, like a serializer
+                # that looks up a foreign key before saving.
+                with transaction.atomic():
+                    category = CategoryType.objects.order_by("pk").first()
+                    Patient.objects.create(
+                        name=f"Patient {seed}-{counts['writes']}",
+                        patient_type="OPD",
+                        category=category,
+                    )
+                counts["writes"] += 1
+            else:
+                list(Patient.objects.order_by("-created_at", "-pk")[:20])
+                counts["reads"] += 1
+        except OperationalError:
+            counts["locked"] += 1
+        finally:
+            close_old_connections()
+    results.put(counts)
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs WORKERS processes against a scratch SQLite database, each "
+        "mixing patient registrations and list reads for SECONDS, once with "
+        "SQLite's defaults and once with the tuned profile, and reports "
+        "throughput and 'database is locked' errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--write-ratio", type=float, default=0.5)
+        parser.add_argument(
+            "--profile", choices=sorted(PROFILES), action="append", dest="profiles"
+        )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != "sqlite":
+            raise CommandError("This benchmark needs the SQLite backend.")
+
+        self.stdout.write(
+            f"{'profile':<10}{'workers':>8}{'req/s':>10}{'writes/s':>10}"
+            f"{'reads/s':>10}{'locked':>8}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options["profiles"] or list(PROFILES):
+                path = os.path.join(directory, f"{name}.sqlite3")
+                counts = self.run_profile(name, path, options)
+                seconds = options["seconds"]
+                total = counts["writes"] + counts["reads"]
+                self.stdout.write(
+                    f"{name:<10}{options['workers']:>8}{total / seconds:>10.0f}"
+                    f"{counts['writes'] / seconds:>10.0f}"
+                    f"{counts['reads'] / seconds:>10.0f}{counts['locked']:>8}"
+                )
+
+    def run_profile(self, name, path, options):
+        db_options, conn_max_age, pragmas = PROFILES[name]
+        with override_settings(SQLITE_PRAGMAS=pragmas), scratch_database(
+            path, db_options, conn_max_age
+        ):
+            call_command("migrate", verbosity=0)
+            CategoryType.objects.create(name="General")
+            connections.close_all()
+
+            # Forked workers inherit the scratch settings above.
+            context = multiprocessing.get_context("fork")
+            results = context.Queue()
+            deadline = time.monotonic() + options["seconds"]
+            workers = [
+                context.Process(
+                    target=serve,
+                    args=(seed, deadline, options["write_ratio"], results),
+                )
+                for seed in range(options["workers"])
+            ]
+            for worker in workers:
+                worker.start()
+            counts = sum((results.get() for _ in workers), Counter())
+            for worker in workers:
+                worker.join()
+        return counts
@@ -0,0 +1,182 @@
+import os
+from itertools import islice
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+SOURCE_ALIAS = "sqlite_source"
+
+# Rows ``migrate`` creates on its own. They are replaced by the source's, so
+# the ids everything else points at still line up.
+GENERATED = {"contenttypes.contenttype", "auth.permission"}
+
+
+def register_source(path):
+    connections.settings[SOURCE_ALIAS] = {
+        **connections[DEFAULT_DB_ALIAS].settings_dict,
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path,
+        "USER": "",
+        "PASSWORD": "",
+        "HOST": "",
+        "PORT": "",
+        "CONN_MAX_AGE": 0,
+        "OPTIONS": {},
+    }
+
+
+def unregister_source():
+    connections[SOURCE_ALIAS].close()
+    del connections[SOURCE_ALIAS]
+    del connections.settings[SOURCE_ALIAS]
+
+
+def copy_order(models):
+    """
+    Orders ``models`` so each comes after the models its foreign keys point
+    to. Cycles are left to the database's deferred constraint checks.
+    """
+    remaining = {
+        model: {
+            field.related_model._meta.concrete_model
+            for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model is not None
+        }
+        - {model}
+        for model in models
+    }
+    ordered = []
+    while remaining:
+        ready = [
+            model
+            for model, targets in remaining.items()
+            if not targets & remaining.keys()
+        ] or list(remaining)
+        for model in sorted(ready, key=lambda model: model._meta.label_lower):
+            ordered.append(model)
+            del remaining[model]
+    return ordered
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies every table from an SQLite file into the default database "
+        "(e.g. a freshly migrated PostgreSQL) in batches, in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Path to the SQLite file to copy.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Delete rows already in the default database first.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["source"]
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file: {path}")
+
+        register_source(path)
+        try:
+            self.copy(options["batch_size"], options["replace"])
+        finally:
+            unregister_source()
+
+    def copy(self, batch_size, replace):
+        for alias in (SOURCE_ALIAS, DEFAULT_DB_ALIAS):
+            executor = MigrationExecutor(connections[alias])
+            if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+                raise CommandError(
+                    f"{alias} has unapplied migrations; migrate both databases "
+                    "first (DB_NAME=<file> manage.py migrate for the SQLite one)."
+                )
+
+        target = connections[DEFAULT_DB_ALIAS]
+        source_tables = set(connections[SOURCE_ALIAS].introspection.table_names())
+        models = []
+        for model in apps.get_models(include_auto_created=True):
+            opts = model._meta
+            if opts.proxy or not opts.managed:
+                continue
+            if not router.allow_migrate_model(DEFAULT_DB_ALIAS, model):
+                continue
+            if opts.db_table not in source_tables:
+                self.stderr.write(f"Skipping {opts.label}: not in {SOURCE_ALIAS}.")
+                continue
+            models.append(model)
+        models = copy_order(models)
+
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            occupied = [
+                model._meta.label
+                for model in models
+                if model._meta.label_lower not in GENERATED
+                and model._base_manager.using(DEFAULT_DB_ALIAS).exists()
+            ]
+            if occupied and not replace:
+                raise CommandError(
+                    "The default database already has data in "
+                    f"{', '.join(occupied)}; pass --replace to overwrite it."
+                )
+
+            with target.cursor() as cursor:
+                for model in reversed(models):
+                    table = target.ops.quote_name(model._meta.db_table)
+                    cursor.execute(f"DELETE FROM {table}")
+                for model in models:
+                    copied = self.copy_table(cursor, model, batch_size)
+                    self.stdout.write(f"{model._meta.label:<40}{copied:>12,}")
+
+                for statement in target.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(statement)
+                if target.vendor == "postgresql":
+                    # Fresh planner statistics, for query plans and for the
+                    # row estimates in apps.core.pagination.estimate_count.
+                    cursor.execute("ANALYZE")
+
+    def copy_table(self, cursor, model, batch_size):
+        """
+        Streams ``model``'s rows out of the source with the ORM (so values
+        come back as Python types) and writes them with plain INSERTs, which
+        leaves ``auto_now`` timestamps and other save-time logic alone.
+        """
+        target = connections[DEFAULT_DB_ALIAS]
+        fields = model._meta.concrete_fields
+        quote = target.ops.quote_name
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(field.column) for field in fields),
+            ", ".join(["%s"] * len(fields)),
+        )
+        rows = (
+            model._base_manager.using(SOURCE_ALIAS)
+            .order_by("pk")
+            .values_list(*(field.attname for field in fields))
+            .iterator(chunk_size=batch_size)
+        )
+
+        copied = 0
+        for batch in batched(rows, batch_size):
+            cursor.executemany(
+                sql,
+                [
+                    [
+                        field.get_db_prep_save(value, connection=target)
+                        for field, value in zip(fields, row)
+                    ]
+                    for row in batch
+                ],
+            )
+            copied += len(batch)
+        return copied
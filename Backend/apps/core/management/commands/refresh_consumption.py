@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import forecasting
+
+
+class Command(BaseCommand):
+    help = (
+        "Refreshes Stock.avg_daily_usage and rebuilds the per-drug consumption "
+        "summary (moving average, spread and reorder points) from dispensing "
+        "history. Run it once a day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--end",
+            type=date.fromisoformat,
+            help="Last day of history to include (YYYY-MM-DD). Default: yesterday.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=forecasting.HISTORY_DAYS,
+            help="Days of history to read (at least 30).",
+        )
+        parser.add_argument(
+            "--lead-time",
+            type=int,
+            default=forecasting.LEAD_TIME_DAYS,
+            help="Days between placing an order and receiving it.",
+        )
+        parser.add_argument(
+            "--z",
+            type=float,
+            default=forecasting.SERVICE_LEVEL_Z,
+            help="Safety-stock z-score (1.65 ~ 95%% service level).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            count = forecasting.refresh(
+                options["end"], options["days"], options["lead_time"], options["z"]
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(f"Summarized {count} drugs."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.core import services
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every drug's average daily usage and days of cover over "
+        "the rolling usage window. Dispensing keeps the drugs it touches up to "
+        "date; run this daily so drugs that stopped moving age out too."
+    )
+
+    def handle(self, *args, **options):
+        updated = services.refresh_usage()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {updated} drugs."))
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_labtest_price_labtest_refer_to"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stock",
+            name="avg_daily_usage",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name="stock",
+            name="days_of_cover",
+            field=models.DecimalField(
+                blank=True, decimal_places=1, max_digits=12, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stock",
+            index=models.Index(fields=["amount"], name="stock_amount_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="stock",
+            index=models.Index(
+                fields=["days_of_cover"], name="stock_days_of_cover_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_stock_usage_and_cover"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DrugConsumption",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("computed_for", models.DateField()),
+                ("avg_7_days", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("avg_30_days", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("std_daily", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("peak_daily", models.IntegerField()),
+                ("reorder_point", models.IntegerField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "drug",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="consumption",
+                        to="core.stock",
+                    ),
+                ),
+            ],
+        ),
+    ]
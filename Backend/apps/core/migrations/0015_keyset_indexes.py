@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_drugconsumption"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="dailyexpense",
+            index=models.Index(fields=["date", "id"], name="dailyexp_date_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dailyexpensepharmacy",
+            index=models.Index(fields=["date", "id"], name="pharmexp_date_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="labtest",
+            index=models.Index(fields=["date", "id"], name="labtest_date_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patient",
+            index=models.Index(
+                fields=["created_at", "id"], name="patient_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pharmaceutical",
+            index=models.Index(
+                fields=["created_at", "id"], name="pharm_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="takenprice",
+            index=models.Index(fields=["date", "id"], name="takenprice_date_id_idx"),
+        ),
+    ]
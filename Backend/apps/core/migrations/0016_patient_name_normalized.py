@@ -0,0 +1,103 @@
+import unicodedata
+
+from django.db import OperationalError, migrations, models
+
+# Frozen copies of apps.core.models.normalize_name and the FTS5 index from
+# apps.core.search as they were when this migration was written, so later
+# changes there can't change what it does.
+
+FTS_TABLE = "core_patient_fts"
+
+FTS_TRIGGERS = {
+    f"{FTS_TABLE}_insert": f"""
+        CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON core_patient BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name_normalized)
+            VALUES (new.id, new.name_normalized);
+        END
+    """,
+    f"{FTS_TABLE}_delete": f"""
+        CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON core_patient BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_normalized)
+            VALUES ('delete', old.id, old.name_normalized);
+        END
+    """,
+    f"{FTS_TABLE}_update": f"""
+        CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF name_normalized
+        ON core_patient BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_normalized)
+            VALUES ('delete', old.id, old.name_normalized);
+            INSERT INTO {FTS_TABLE}(rowid, name_normalized)
+            VALUES (new.id, new.name_normalized);
+        END
+    """,
+}
+
+
+def normalize_name(value):
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(value.casefold().split())
+
+
+def normalize_names(apps, schema_editor):
+    Patient = apps.get_model("core", "Patient")
+    patients = Patient.objects.using(schema_editor.connection.alias)
+    batch = []
+    for patient in patients.only("name").iterator(chunk_size=2000):
+        patient.name_normalized = normalize_name(patient.name)
+        batch.append(patient)
+        if len(batch) == 2000:
+            patients.bulk_update(batch, ["name_normalized"])
+            batch = []
+    if batch:
+        patients.bulk_update(batch, ["name_normalized"])
+
+
+def create_fts_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "name_normalized, content='core_patient', content_rowid='id', "
+                "tokenize='trigram')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5 or older than 3.34 (no trigram).
+            return
+        for name, sql in FTS_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_fts_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name in FTS_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patient",
+            name="name_normalized",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=255
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(normalize_names, migrations.RunPython.noop),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
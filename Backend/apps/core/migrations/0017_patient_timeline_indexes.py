@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_patient_name_normalized"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="labtest",
+            index=models.Index(
+                fields=["patient", "date", "id"], name="labtest_patient_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pharmaceutical",
+            index=models.Index(
+                fields=["patient_name", "created_at", "id"],
+                name="pharm_patient_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_patient_timeline_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="pharmaceuticaldrug",
+            index=models.Index(
+                fields=["pharmaceutical", "drug", "amount_used"],
+                name="pharmdrug_pharm_drug_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pharmaceuticaldrug",
+            index=models.Index(
+                fields=["drug", "pharmaceutical", "amount_used"],
+                name="pharmdrug_drug_pharm_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="pharmaceuticaldrug",
+            name="drug",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="core.stock",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="pharmaceuticaldrug",
+            name="pharmaceutical",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="core.pharmaceutical",
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import DatabaseError, migrations, transaction
+
+# A frozen copy of the pg_trgm index from apps.core.search as it was when
+# this migration was written.
+
+TRIGRAM_INDEX = "patient_name_trgm_idx"
+
+
+def create_trigram_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        try:
+            with transaction.atomic(using=connection.alias):
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError:
+            # Not allowed to create the extension; substring search scans.
+            return
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON core_patient "
+            "USING gin (name_normalized gin_trgm_ops)"
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_report_query_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
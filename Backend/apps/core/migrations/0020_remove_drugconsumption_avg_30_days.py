@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_patient_name_trigram"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="drugconsumption",
+            name="avg_30_days",
+        ),
+    ]
@@ -1,5 +1,9 @@
+import unicodedata
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Cast, NullIf, Round
 
 
 class CategoryType(models.Model):
@@ -18,9 +22,17 @@ class StaffType(models.Model):
 
     def __str__(self) -> str:
         return self.name
-    
 
 
+def _operand(value, column):
+    """
+    ``F(column)`` when ``value`` is None, otherwise the value or expression.
+    """
+    if value is None:
+        return models.F(column)
+    if hasattr(value, "resolve_expression"):
+        return value
+    return models.Value(value)
 
 
 class Stock(models.Model):
@@ -30,12 +42,81 @@ class Stock(models.Model):
     total_price = models.DecimalField(max_digits=12, decimal_places=2)
     amount = models.IntegerField(default=0.00)
     daily_used = models.IntegerField(null=True, blank=True)
+    # Average units dispensed per day over the last USAGE_WINDOW_DAYS, and
+    # how many days the current amount lasts at that rate (NULL when the
+    # drug isn't being used). Kept up to date by ``services.refresh_usage``.
+    avg_daily_usage = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    days_of_cover = models.DecimalField(
+        max_digits=12, decimal_places=1, null=True, blank=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    USAGE_WINDOW_DAYS = 30
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["amount"], name="stock_amount_idx"),
+            models.Index(fields=["days_of_cover"], name="stock_days_of_cover_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def days_of_cover_expression(amount=None, avg_daily_usage=None):
+        """
+        SQL for ``amount / avg_daily_usage``, NULL when there is no usage.
+
+        As with ``total_price_expression``, pass the new values (or
+        expressions) when they change in the same UPDATE. The amount is cast
+        to a float so SQLite doesn't divide in integers.
+        """
+        amount = _operand(amount, "amount")
+        avg_daily_usage = _operand(avg_daily_usage, "avg_daily_usage")
+        return Round(
+            models.ExpressionWrapper(
+                Cast(amount, models.FloatField())
+                / NullIf(avg_daily_usage, models.Value(0)),
+                output_field=models.DecimalField(max_digits=12, decimal_places=1),
+            ),
+            1,
+        )
+
+    @staticmethod
+    def total_price_expression(price=None, percentage=None):
+        """
+        SQL for ``price * (1 + percentage / 100)`` rounded to cents.
+
+        The right-hand side of an UPDATE sees the row as it was, so pass the
+        new ``price``/``percentage`` (values or expressions) when they change
+        in the same statement. The percentage is scaled by a decimal 0.01
+        rather than divided by 100, which SQLite would do in integers.
+        """
+        price = _operand(price, "price")
+        percentage = _operand(percentage, "percentage")
+        return Round(
+            models.ExpressionWrapper(
+                price * (1 + percentage * models.Value(Decimal("0.01"))),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            2,
+        )
+
+
+class PharmaceuticalQuerySet(models.QuerySet):
+    def with_drugs(self):
+        """
+        Loads the patient and every prescribed drug up front, so serializing a
+        page of prescriptions costs a fixed number of queries.
+        """
+        return self.select_related("patient_name").prefetch_related(
+            models.Prefetch(
+                "pharmaceuticaldrug_set",
+                queryset=PharmaceuticalDrug.objects.select_related("drug"),
+            )
+        )
+
 
 class Pharmaceutical(models.Model):
     User = get_user_model()
@@ -57,29 +138,104 @@ class Pharmaceutical(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PharmaceuticalQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination walks (timestamp, id) newest first.
+            models.Index(fields=["created_at", "id"], name="pharm_created_id_idx"),
+            # A patient's prescriptions, newest first, for the timeline.
+            models.Index(
+                fields=["patient_name", "created_at", "id"],
+                name="pharm_patient_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.patient_name.name
 
 
 class PharmaceuticalDrug(models.Model):
-    pharmaceutical = models.ForeignKey(Pharmaceutical, on_delete=models.CASCADE)
-    drug = models.ForeignKey("Stock", on_delete=models.CASCADE)
+    # Indexed through the composites below rather than on their own.
+    pharmaceutical = models.ForeignKey(
+        Pharmaceutical, on_delete=models.CASCADE, db_index=False
+    )
+    drug = models.ForeignKey("Stock", on_delete=models.CASCADE, db_index=False)
     amount_used = models.IntegerField(default=1)
 
+    class Meta:
+        indexes = [
+            # Covering indexes: usage reports join in from a date range of
+            # prescriptions, usage refreshes look up one drug's history, and
+            # neither has to touch the table itself.
+            models.Index(
+                fields=["pharmaceutical", "drug", "amount_used"],
+                name="pharmdrug_pharm_drug_idx",
+            ),
+            models.Index(
+                fields=["drug", "pharmaceutical", "amount_used"],
+                name="pharmdrug_drug_pharm_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.drug.name} x {self.amount_used}"
 
 
+class DrugConsumption(models.Model):
+    """
+    Consumption figures for one drug, rebuilt by ``forecasting.refresh``.
+    """
+
+    drug = models.OneToOneField(
+        Stock, on_delete=models.CASCADE, related_name="consumption"
+    )
+    # Last day of dispensing history the figures cover.
+    computed_for = models.DateField()
+    avg_7_days = models.DecimalField(max_digits=12, decimal_places=2)
+    std_daily = models.DecimalField(max_digits=12, decimal_places=2)
+    peak_daily = models.IntegerField()
+    reorder_point = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.drug.name} (reorder at {self.reorder_point})"
+
+
+def normalize_name(value):
+    """
+    Case-folds ``value``, strips accents and collapses whitespace, so
+    "  José  Ramos" and "jose ramos" compare equal.
+    """
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(value.casefold().split())
+
+
 class Patient(models.Model):
     name = models.CharField(max_length=255)
+    # Search key derived from ``name``; see ``apps.core.search``.
+    name_normalized = models.CharField(max_length=255, db_index=True, editable=False)
     age = models.IntegerField(null=True, blank=True)
     patient_type = models.CharField(max_length=255)
     category = models.ForeignKey(CategoryType, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="patient_created_id_idx"),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.name_normalized = normalize_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "name_normalized"}
+        super().save(*args, **kwargs)
+
 
 class Staff(models.Model):
     Other = 0
@@ -112,6 +268,11 @@ class DailyExpense(models.Model):
     totla_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "id"], name="dailyexp_date_id_idx"),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
@@ -122,6 +283,11 @@ class TakenPrice(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "id"], name="takenprice_date_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} - ({self.description[:50]}"
 
@@ -131,6 +297,11 @@ class DailyExpensePharmacy(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "id"], name="pharmexp_date_id_idx"),
+        ]
+
 
 class TestType(models.Model):
     name = models.CharField(max_length=500)
@@ -147,6 +318,14 @@ class LabTest(models.Model):
     refer_to = models.CharField(max_length=300)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "id"], name="labtest_date_id_idx"),
+            models.Index(
+                fields=["patient", "date", "id"], name="labtest_patient_date_idx"
+            ),
+        ]
+
     def __str__(self):
         patient = self.patient.name if self.patient else "Unknown Patient"
         test = self.test_type.name if self.test_type else "Unknown Test"
@@ -1,9 +1,191 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import datetime
 
+from django.db import connections
+from django.db.models import Max, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
-class PharmaceuticalPagination(PageNumberPagination):
+
+def encode_cursor(data):
+    """
+    Packs a JSON-serializable cursor position into an opaque URL-safe token.
+    """
+    return base64.urlsafe_b64encode(json.dumps(data).encode("ascii")).decode("ascii")
+
+
+def decode_cursor(token):
+    """
+    Reverses ``encode_cursor``. Raises ValueError for a malformed token.
+    """
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except UnicodeEncodeError as exc:
+        raise ValueError(token) from exc
+
+
+def estimate_count(queryset):
+    """
+    A cheap row count for pagination headers. An unfiltered table is
+    estimated from the planner's row count on PostgreSQL (kept current by
+    autovacuum) or from its highest primary key elsewhere, a single index
+    seek (rows lost to deletes are still counted); a filtered queryset gets
+    an exact count.
+    """
+    if queryset.query.where:
+        return queryset.count()
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        # -1 until the table is first analyzed.
+        if row and row[0] >= 0:
+            return int(row[0])
+    return queryset.aggregate(estimate=Max("pk"))["estimate"] or 0
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first keyset pagination on ``(timestamp_field, id)``.
+
+    Each page is a ``WHERE (ts, id) < (last ts, last id) ORDER BY ts DESC,
+    id DESC LIMIT n`` over the composite index, so page 1,000 costs the same
+    as page 1, and rows inserted while scrolling never shift a page. The
+    cursor is an opaque token carrying the boundary row's key.
+
+    ``?limit=`` sets the page size and ``?count=true`` adds an approximate
+    ``count`` (see ``estimate_count``). With ``opt_in`` set, a request with
+    neither ``cursor`` nor ``limit`` gets the plain unpaginated list, which
+    keeps existing clients of list endpoints working.
+    """
+
+    timestamp_field = "created_at"
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    count_query_param = "count"
+    include_count = False
+    opt_in = False
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.opt_in and not (
+            self.cursor_query_param in params or self.page_size_query_param in params
+        ):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        if self.include_count or params.get(self.count_query_param) in ("1", "true"):
+            self.count = estimate_count(queryset)
+
+        timestamp, pk, reverse = self.decode_cursor(request)
+        field = self.timestamp_field
+        if timestamp is None:
+            queryset = queryset.order_by(f"-{field}", "-pk")
+        elif reverse:
+            queryset = queryset.filter(
+                Q(**{f"{field}__gt": timestamp}) | Q(**{field: timestamp, "pk__gt": pk})
+            ).order_by(field, "pk")
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{field}__lt": timestamp}) | Q(**{field: timestamp, "pk__lt": pk})
+            ).order_by(f"-{field}", "-pk")
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, timestamp is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, None, False
+        try:
+            data = decode_cursor(encoded)
+            return datetime.fromisoformat(data["t"]), int(data["id"]), bool(data["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        data = {
+            "t": getattr(row, self.timestamp_field).isoformat(),
+            "id": row.pk,
+            "r": reverse,
+        }
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(data))
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Walked off the end; the first page is the only safe way back.
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {"next": self.get_next_link(), "previous": self.get_previous_link()}
+        if self.count is not None:
+            payload["count"] = self.count
+        payload["results"] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer"},
+                "results": schema,
+            },
+        }
+
+
+class PharmaceuticalPagination(KeysetPagination):
     page_size = 10
-    page_query_param = "size"
+    include_count = True
+
+
+class OptionalKeysetPagination(KeysetPagination):
+    opt_in = True
+
+
+class OptionalDateKeysetPagination(OptionalKeysetPagination):
+    timestamp_field = "date"
 
 
 class TestTypePagination(PageNumberPagination):
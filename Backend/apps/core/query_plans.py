@@ -0,0 +1,66 @@
+"""
+Reading SQLite query plans, so tests can pin down which index a query uses.
+
+``capture_plans`` runs any callable (a view, a report function) and returns
+the ``EXPLAIN QUERY PLAN`` of every SELECT, UPDATE and DELETE it issued.
+A plan is a list of detail lines such as::
+
+    SEARCH core_labtest USING INDEX labtest_date_id_idx (date>? AND date<?)
+    SCAN core_patient
+
+``full_scans`` picks out the second kind: a table read row by row with no
+index at all, which is what a missing index looks like.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+EXPLAINED = ("SELECT", "UPDATE", "DELETE")
+
+
+def explain(sql, params=(), using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[3] for row in cursor.fetchall()]
+
+
+def queryset_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return explain(sql, params, using=queryset.db)
+
+
+def capture_plans(func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Calls ``func`` and returns ``[(sql, plan), ...]`` for the statements it
+    ran. The SQL is Django's logged form with parameters inlined, which
+    SQLite can explain as-is.
+    """
+    connection = connections[using]
+    with CaptureQueriesContext(connection) as captured:
+        func(*args, **kwargs)
+    return [
+        (query["sql"], explain(query["sql"], using=using))
+        for query in captured.captured_queries
+        if query["sql"].lstrip().upper().startswith(EXPLAINED)
+    ]
+
+
+def full_scans(plan):
+    """
+    The lines of ``plan`` that read a whole table without an index. A
+    ``SCAN ... USING INDEX`` (walking an index in order, e.g. for a
+    ``LIMIT``) is not counted.
+    """
+    return [line for line in plan if line.startswith("SCAN ") and " USING " not in line]
+
+
+def indexes_used(plan):
+    """
+    Names of the indexes ``plan`` reads, covering or not.
+    """
+    names = set()
+    for line in plan:
+        _, found, rest = line.partition(" INDEX ")
+        if found:
+            names.add(rest.split(" ", 1)[0])
+    return names
@@ -0,0 +1,135 @@
+"""
+Read-replica routing.
+
+When ``settings.DATABASES`` has a ``replica`` alias, GET requests to views
+with ``replica_reads = True`` read from it, so reports, lists and exports
+stay off the primary that dispensing writes to. Everything else uses the
+primary:
+
+- all writes, and every read in the same request after a write, so a
+  request always sees what it just wrote;
+- every request for ``REPLICA_STICKY_SECONDS`` after one that wrote, so a
+  client that saves and then reloads a list isn't shown stale rows while
+  the replica catches up (tracked with the ``db_primary`` cookie);
+- anything outside a request (management commands, workers), unless it
+  opts in with ``use_replica()``.
+
+Without a ``replica`` alias the router always answers with the primary.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = "replica"
+STICKY_COOKIE = "db_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class RoutingState:
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_state = ContextVar("db_routing_state", default=None)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in connections.settings
+
+
+def read_alias():
+    """
+    The alias reads go to right now. Code that reads after the request
+    has returned, such as a streaming response, should fetch this up front
+    and pass it to ``.using()``.
+    """
+    state = _state.get()
+    if state and state.replica and not state.wrote and replica_configured():
+        return REPLICA_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_replica(enabled=True):
+    token = _state.set(RoutingState(enabled))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+def _elsewhere(hints):
+    """
+    True when the ``instance`` hint lives in a database outside the
+    primary/replica pair (say, one opened by a command), which Django's
+    default routing then keeps it in.
+    """
+    instance = hints.get("instance")
+    db = instance._state.db if instance is not None else None
+    return db is not None and db not in (DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _elsewhere(hints):
+            return None
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        if _elsewhere(hints):
+            return None
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # A real replica gets its schema through replication.
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(replica=False)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if state.wrote:
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 5),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None) or getattr(
+            view_func, "view_class", None
+        )
+        state = _state.get()
+        if state is not None:
+            state.replica = (
+                getattr(view_class, "replica_reads", False)
+                and request.method in SAFE_METHODS
+                and STICKY_COOKIE not in request.COOKIES
+            )
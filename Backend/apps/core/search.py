@@ -0,0 +1,191 @@
+"""
+Patient name search.
+
+Queries are matched against ``Patient.name_normalized`` (see
+``normalize_name``) in two steps:
+
+- prefixes ("ahm" finds "Ahmad Zaki") come from the column's B-tree index:
+  a range scan, ``name_normalized >= 'ahm' AND name_normalized < 'ahn'``,
+  on SQLite, and ``LIKE 'ahm%'`` over the ``varchar_pattern_ops`` index
+  Django adds on PostgreSQL, where the range would follow the collation;
+- substrings of three or more characters ("zak" finds "Ahmad Zaki") come
+  from the ``core_patient_fts`` FTS5 trigram index on SQLite, and from the
+  ``patient_name_trgm_idx`` pg_trgm GIN index (``LIKE '%zak%'``) on
+  PostgreSQL. Other databases scan.
+
+``core_patient_fts`` is an external-content index over ``core_patient``, so
+it stores no copy of the names; triggers keep it in sync, which also covers
+``bulk_create`` and raw SQL. SQLite rebuilds a table (dropping its triggers)
+for some schema changes, so ``ensure_fts_index`` runs after every migrate
+and restores anything missing.
+"""
+
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    DatabaseError,
+    OperationalError,
+    connections,
+    transaction,
+)
+
+from .models import Patient, normalize_name
+
+FTS_TABLE = "core_patient_fts"
+TRIGRAM_INDEX = "patient_name_trgm_idx"
+
+FTS_TRIGGERS = {
+    f"{FTS_TABLE}_insert": f"""
+        CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON core_patient BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name_normalized)
+            VALUES (new.id, new.name_normalized);
+        END
+    """,
+    f"{FTS_TABLE}_delete": f"""
+        CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON core_patient BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_normalized)
+            VALUES ('delete', old.id, old.name_normalized);
+        END
+    """,
+    f"{FTS_TABLE}_update": f"""
+        CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF name_normalized
+        ON core_patient BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_normalized)
+            VALUES ('delete', old.id, old.name_normalized);
+            INSERT INTO {FTS_TABLE}(rowid, name_normalized)
+            VALUES (new.id, new.name_normalized);
+        END
+    """,
+}
+
+
+def ensure_fts_index(using=DEFAULT_DB_ALIAS):
+    """
+    Creates the FTS5 table and its triggers on SQLite if any are missing, and
+    reindexes when something had to be recreated. Returns True when the
+    index is in place.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR name LIKE %s",
+            [FTS_TABLE, f"{FTS_TABLE}_%"],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in FTS_TRIGGERS if name not in existing]
+        if FTS_TABLE in existing and not missing:
+            return True
+
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "name_normalized, content='core_patient', content_rowid='id', "
+                "tokenize='trigram')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5 or older than 3.34 (no trigram).
+            return False
+        for name in missing:
+            cursor.execute(FTS_TRIGGERS[name])
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def drop_fts_index(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name in FTS_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def ensure_trigram_index(using=DEFAULT_DB_ALIAS):
+    """
+    Creates the pg_trgm extension and a GIN trigram index on
+    ``name_normalized`` on PostgreSQL. Returns True when the index is in
+    place. Creating the extension needs a role allowed to do so; when it
+    can't, substring search still works, by scanning.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        try:
+            with transaction.atomic(using=using):
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError:
+            return False
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON core_patient "
+            "USING gin (name_normalized gin_trgm_ops)"
+        )
+    return True
+
+
+def drop_trigram_index(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+def _successor(term):
+    """
+    The smallest string greater than every string starting with ``term``.
+    """
+    return term[:-1] + chr(ord(term[-1]) + 1)
+
+
+def _fts_phrase(term):
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def search_patients(query, limit=20, **filters):
+    """
+    Returns up to ``limit`` patients whose name starts with ``query``, in
+    name order, followed by those that merely contain it, newest first.
+    ``filters`` apply to both (e.g. ``category_id=`` or ``patient_type=``).
+    """
+    term = normalize_name(query)
+    if not term:
+        return []
+
+    patients = Patient.objects.filter(**filters)
+    vendor = connections[patients.db].vendor
+    if vendor == "postgresql":
+        prefixed = patients.filter(name_normalized__startswith=term)
+    else:
+        prefixed = patients.filter(
+            name_normalized__gte=term, name_normalized__lt=_successor(term)
+        )
+    matches = list(prefixed.order_by("name_normalized", "pk")[:limit])
+    if len(matches) == limit or len(term) < 3:
+        return matches
+
+    others = patients.exclude(pk__in=[patient.pk for patient in matches])
+    remaining = limit - len(matches)
+    if vendor == "sqlite":
+        # Join from the FTS table and order by its rowid, so SQLite walks the
+        # matches newest first and stops after ``remaining`` rows instead of
+        # sorting every patient that shares a common surname.
+        fts_matches = others.extra(
+            select={"fts_rowid": f"{FTS_TABLE}.rowid"},
+            tables=[FTS_TABLE],
+            where=[
+                f"{FTS_TABLE}.rowid = {Patient._meta.db_table}.id",
+                f"{FTS_TABLE} MATCH %s",
+            ],
+            params=[_fts_phrase(term)],
+        ).order_by("-fts_rowid")
+        try:
+            return matches + list(fts_matches[:remaining])
+        except OperationalError:
+            pass  # No FTS index in this database; scan instead.
+    return matches + list(
+        others.filter(name_normalized__contains=term).order_by("-pk")[:remaining]
+    )
@@ -1,10 +1,14 @@
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
 
 from .models import (
     CategoryType,
     DailyExpense,
     DailyExpensePharmacy,
+    DrugConsumption,
     LabTest,
     Patient,
     Pharmaceutical,
@@ -14,6 +18,7 @@ from .models import (
     TakenPrice,
     TestType,
 )
+from .services import InsufficientStock, dispense, release_stock, update_stock
 
 User = get_user_model()
 
@@ -43,9 +48,12 @@ class StockSerializer(serializers.ModelSerializer):
             "percentage",
             "total_price",
             "amount",
+            "avg_daily_usage",
+            "days_of_cover",
             "created_at",
             "updated_at",
         ]
+        read_only_fields = ["avg_daily_usage", "days_of_cover"]
 
     def calculate_total_price(self, price, percentage):
         """Helper function to calculate total price."""
@@ -60,17 +68,46 @@ class StockSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
-        price = validated_data.get("price", instance.price)
-        percentage = validated_data.get("percentage", instance.percentage)
-        instance.total_price = self.calculate_total_price(price, percentage)
-
-        # Update other fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        # The same single UPDATE StockListView.put runs, so total_price always
+        # comes from Stock.total_price_expression.
+        update_stock(instance.pk, validated_data)
+        instance.refresh_from_db()
         return instance
 
 
+class DrugConsumptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DrugConsumption
+        exclude = ["id", "drug"]
+
+
+class ReorderSerializer(serializers.ModelSerializer):
+    consumption = DrugConsumptionSerializer(read_only=True)
+
+    class Meta:
+        model = Stock
+        fields = ["id", "name", "amount", "avg_daily_usage", "consumption"]
+
+
+class LowStockQuerySerializer(serializers.Serializer):
+    # Drugs that run out within ``days`` at their current rate, or that hold
+    # ``min_amount`` units or fewer, most urgent first.
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    days = serializers.DecimalField(
+        max_digits=12, decimal_places=1, min_value=Decimal("0"), default=14
+    )
+    min_amount = serializers.IntegerField(default=0)
+
+
+class StockPriceAdjustmentSerializer(serializers.Serializer):
+    percentage = serializers.DecimalField(
+        max_digits=6, decimal_places=2, min_value=Decimal("-99.99")
+    )
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+
+
 # ---------------- CategoryType ---------------- #
 class CategoryTypeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -90,6 +127,18 @@ class PatientSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "age", "patient_type", "category", "all_categories"]
 
 
+class PatientSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=255)
+    category = serializers.IntegerField(required=False)
+    patient_type = serializers.CharField(max_length=255, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
+
+
+class PatientTimelineQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    cursor = serializers.CharField(required=False)
+
+
 # ---------------- Pharmaceutical & Drugs ---------------- #
 class PharmaceuticalDrugSerializer(serializers.ModelSerializer):
     drug = StockSerializer(read_only=True)  # nested drug info for reads
@@ -123,70 +172,102 @@ class PharmaceuticalSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
 
+    def _dispense(self, pharmaceutical, drugs_data):
+        try:
+            dispense(
+                pharmaceutical,
+                [(item["drug"], item["amount_used"]) for item in drugs_data],
+            )
+        except InsufficientStock as e:
+            raise serializers.ValidationError({f"drug_{e.drug.id}": str(e)})
+
     def create(self, validated_data):
         drugs_data = validated_data.pop("pharmaceuticaldrug_set", [])
-        pharmaceutical = Pharmaceutical.objects.create(**validated_data)
-
-        for item in drugs_data:
-            drug_instance = item["drug"]
-            amount_used = item["amount_used"]
-
-            # Decrease stock
-            if drug_instance.amount < amount_used:
-                raise serializers.ValidationError(
-                    {
-                        f"drug_{drug_instance.id}": f"Not enough stock for '{drug_instance.name}'."
-                    }
-                )
-            drug_instance.amount -= amount_used
-            drug_instance.save()
-
-            # Create through model
-            PharmaceuticalDrug.objects.create(
-                pharmaceutical=pharmaceutical,
-                drug=drug_instance,
-                amount_used=amount_used,
-            )
+
+        with transaction.atomic():
+            pharmaceutical = Pharmaceutical.objects.create(**validated_data)
+            self._dispense(pharmaceutical, drugs_data)
 
         return pharmaceutical
 
     def update(self, instance, validated_data):
         drugs_data = validated_data.pop("pharmaceuticaldrug_set", None)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        if drugs_data is not None:
-            # Restore previous stock before clearing old relations
-            for old_relation in instance.pharmaceuticaldrug_set.all():
-                old_relation.drug.amount += old_relation.amount_used
-                old_relation.drug.save()
-            instance.pharmaceuticaldrug_set.all().delete()
-
-            # Deduct stock for new relations
-            for item in drugs_data:
-                drug_instance = item["drug"]
-                amount_used = item["amount_used"]
-
-                if drug_instance.amount < amount_used:
-                    raise serializers.ValidationError(
-                        {
-                            f"drug_{drug_instance.id}": f"Not enough stock for '{drug_instance.name}'."
-                        }
-                    )
-                drug_instance.amount -= amount_used
-                drug_instance.save()
-
-                PharmaceuticalDrug.objects.create(
-                    pharmaceutical=instance,
-                    drug=drug_instance,
-                    amount_used=amount_used,
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            if drugs_data is not None:
+                # Restore previous stock before replacing the old relations
+                old_relations = instance.pharmaceuticaldrug_set.select_related("drug")
+                release_stock(
+                    [
+                        (relation.drug, relation.amount_used)
+                        for relation in old_relations
+                    ]
                 )
+                instance.pharmaceuticaldrug_set.all().delete()
+
+                self._dispense(instance, drugs_data)
 
         return instance
 
 
+class BulkPharmaceuticalDrugSerializer(serializers.Serializer):
+    drug_id = serializers.IntegerField()
+    amount_used = serializers.IntegerField(min_value=1, default=1)
+
+
+class BulkPharmaceuticalSerializer(serializers.Serializer):
+    """
+    One prescription of a batch. Related ids are only type-checked here; the
+    batch view resolves them for all items at once.
+    """
+
+    doctor_name = serializers.IntegerField(required=False, allow_null=True)
+    patient_name = serializers.IntegerField()
+    drugs = BulkPharmaceuticalDrugSerializer(many=True)
+    copy = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def resolve(self, patients, doctors, stocks):
+        """
+        Swaps ids for the preloaded instances and returns ``(fields, items)``
+        for ``dispense_batch``, or raises ``ValidationError``.
+        """
+        data = self.validated_data
+        errors = {}
+
+        patient = patients.get(data["patient_name"])
+        if patient is None:
+            errors["patient_name"] = ["Patient not found."]
+        doctor = None
+        if data.get("doctor_name") is not None:
+            doctor = doctors.get(data["doctor_name"])
+            if doctor is None:
+                errors["doctor_name"] = ["User not found."]
+
+        items = []
+        for drug in data["drugs"]:
+            stock = stocks.get(drug["drug_id"])
+            if stock is None:
+                errors[f"drug_{drug['drug_id']}"] = "Drug not found."
+            else:
+                items.append((stock, drug["amount_used"]))
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        fields = {
+            "patient_name": patient,
+            "doctor_name": doctor,
+            "copy": data["copy"],
+            "price": data["price"],
+        }
+        return fields, items
+
+
 # ---------------- DailyExpense ---------------- #
 class DailyExpenseSerializer(serializers.ModelSerializer):
     class Meta:
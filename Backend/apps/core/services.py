@@ -0,0 +1,304 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from functools import reduce
+from itertools import count
+from operator import or_
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Round
+from django.utils import timezone
+
+from .models import Pharmaceutical, PharmaceuticalDrug, Stock
+from .signals import bulk_created, bulk_updated
+
+
+class InsufficientStock(Exception):
+    message = "Not enough stock for '{}'."
+
+    def __init__(self, drug):
+        self.drug = drug
+        super().__init__(self.message.format(drug.name))
+
+
+class StockContention(InsufficientStock):
+    """
+    Other counters kept changing the stock while ``reserve_stock`` retried;
+    nothing was taken.
+    """
+
+    message = "Stock for '{}' kept changing; please try again."
+
+
+def _totals(items):
+    """
+    Sums ``(drug, amount)`` pairs per drug id, so a drug listed twice in one
+    prescription is checked against its combined amount.
+    """
+    totals = defaultdict(int)
+    for drug, amount in items:
+        totals[drug.pk] += amount
+    return totals
+
+
+def _shift_stock(totals, sign):
+    """
+    Moves every drug's amount by ``sign * total`` in one UPDATE and returns
+    the number of rows changed. When taking stock out, rows that don't hold
+    enough are left alone by the WHERE clause.
+    """
+    if sign < 0:
+        condition = reduce(
+            or_, (Q(pk=pk, amount__gte=total) for pk, total in totals.items())
+        )
+    else:
+        condition = Q(pk__in=totals)
+
+    return Stock.objects.filter(condition).update(
+        amount=Case(
+            *(
+                When(pk=pk, then=F("amount") + sign * total)
+                for pk, total in totals.items()
+            ),
+            default=F("amount"),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def reserve_stock(items, attempts=3):
+    """
+    Takes ``(drug, amount)`` pairs out of stock, all or nothing.
+
+    The check and the decrement happen in the same
+    ``UPDATE ... WHERE amount >= n`` statement, so concurrent counters
+    cannot both pass the check and oversell. Raises ``InsufficientStock``
+    for the first drug that can't cover its amount, or ``StockContention``
+    when the UPDATE still falls short after ``attempts`` tries although
+    every drug covers its amount by the time it is checked.
+    """
+    totals = _totals(items)
+    if not totals:
+        return
+
+    for _ in range(attempts):
+        with transaction.atomic():
+            if _shift_stock(totals, -1) == len(totals):
+                return
+            # Some drug fell short: undo the rows that were decremented.
+            transaction.set_rollback(True)
+
+        stocks = Stock.objects.in_bulk(totals)
+        for drug, _ in items:
+            stock = stocks.get(drug.pk)
+            if stock is None or stock.amount < totals[drug.pk]:
+                raise InsufficientStock(stock or drug)
+        # Restocked between our UPDATE and the check above; try again.
+    raise StockContention(items[0][0])
+
+
+def release_stock(items):
+    """
+    Puts ``(drug, amount)`` pairs back into stock in one UPDATE.
+    """
+    totals = _totals(items)
+    if totals:
+        _shift_stock(totals, 1)
+        refresh_usage(totals)
+
+
+def refresh_usage(drug_ids=None):
+    """
+    Recomputes ``avg_daily_usage`` and ``days_of_cover`` from what was
+    dispensed over the last ``Stock.USAGE_WINDOW_DAYS`` days, for
+    ``drug_ids`` or for every drug. Dispensing refreshes the drugs it
+    touched; the ``refresh_stock_usage`` command catches up the rest as
+    the window moves on.
+    """
+    window = Stock.USAGE_WINDOW_DAYS
+    used = (
+        PharmaceuticalDrug.objects.filter(
+            drug=OuterRef("pk"),
+            pharmaceutical__created_at__gte=timezone.now() - timedelta(days=window),
+        )
+        .values("drug")
+        .annotate(total=Sum("amount_used"))
+        .values("total")
+    )
+
+    stocks = Stock.objects.all()
+    if drug_ids is not None:
+        stocks = stocks.filter(pk__in=drug_ids)
+
+    with transaction.atomic():
+        updated = stocks.update(
+            avg_daily_usage=Coalesce(
+                Round(
+                    ExpressionWrapper(
+                        Cast(Subquery(used), FloatField()) / Value(window),
+                        output_field=DecimalField(max_digits=12, decimal_places=2),
+                    ),
+                    2,
+                ),
+                Value(Decimal("0")),
+            )
+        )
+        # A second statement, so the cover is computed from the new average.
+        stocks.update(days_of_cover=Stock.days_of_cover_expression())
+    return updated
+
+
+def dispense(pharmaceutical, items):
+    """
+    Reserves stock for ``(drug, amount)`` pairs and records them against
+    ``pharmaceutical`` with a single bulk insert.
+    """
+    items = list(items)
+    with transaction.atomic():
+        reserve_stock(items)
+        PharmaceuticalDrug.objects.bulk_create(
+            PharmaceuticalDrug(
+                pharmaceutical=pharmaceutical, drug=drug, amount_used=amount
+            )
+            for drug, amount in items
+        )
+        refresh_usage(_totals(items))
+
+
+def dispense_batch(prescriptions, attempts=3):
+    """
+    Creates many prescriptions in one transaction.
+
+    ``prescriptions`` is a list of ``(fields, items)`` pairs, where ``fields``
+    are Pharmaceutical field values and ``items`` are ``(drug, amount)``
+    pairs. Stock is checked for the whole batch in memory, in order; a
+    prescription that would overdraw a drug is skipped and reported instead
+    of aborting the rest.
+
+    When another counter takes stock between the read and the reservation,
+    the batch is planned again from fresh counts. After ``attempts`` such
+    retries, the prescriptions needing the contended drug are given up on
+    and reported, so the call always returns.
+
+    Returns ``(created, errors)``: the new Pharmaceutical rows and a dict of
+    batch index -> ``InsufficientStock``.
+    """
+    drug_ids = {drug.pk for _, items in prescriptions for drug, _ in items}
+    given_up = {}
+
+    for attempt in count():
+        try:
+            with transaction.atomic():
+                remaining = dict(
+                    Stock.objects.filter(pk__in=drug_ids).values_list("pk", "amount")
+                )
+                accepted, errors = [], dict(given_up)
+                for index, (fields, items) in enumerate(prescriptions):
+                    if index in given_up:
+                        continue
+                    totals = _totals(items)
+                    short = next(
+                        (
+                            drug
+                            for drug, _ in items
+                            if remaining.get(drug.pk, 0) < totals[drug.pk]
+                        ),
+                        None,
+                    )
+                    if short is not None:
+                        errors[index] = InsufficientStock(short)
+                        continue
+                    for pk, total in totals.items():
+                        remaining[pk] -= total
+                    accepted.append((fields, items))
+
+                # The counts above were read without a lock; reserve_stock's
+                # guarded UPDATE is what actually protects against overselling.
+                reserve_stock([item for _, items in accepted for item in items])
+                created = Pharmaceutical.objects.bulk_create(
+                    Pharmaceutical(**fields) for fields, _ in accepted
+                )
+                PharmaceuticalDrug.objects.bulk_create(
+                    PharmaceuticalDrug(
+                        pharmaceutical=pharmaceutical, drug=drug, amount_used=amount
+                    )
+                    for pharmaceutical, (_, items) in zip(created, accepted)
+                    for drug, amount in items
+                )
+                refresh_usage({drug.pk for _, items in accepted for drug, _ in items})
+                bulk_created.send(sender=Pharmaceutical, instances=created)
+        except InsufficientStock as e:
+            # Another counter took stock after our read; re-plan the batch.
+            if attempt >= attempts - 1:
+                # Each pass drops at least the prescription that hit the
+                # shortage, so this ends.
+                given_up.update(
+                    (index, e)
+                    for index, (_, items) in enumerate(prescriptions)
+                    if index not in given_up
+                    and any(drug.pk == e.drug.pk for drug, _ in items)
+                )
+            continue
+
+        return created, errors
+
+
+def update_stock(pk, changes):
+    """
+    Writes only the ``changes`` to Stock ``pk`` in one UPDATE, recomputing
+    ``total_price`` (and ``days_of_cover`` on a restock) in the database.
+    Returns False when the row doesn't exist.
+    """
+    fields = dict(changes)
+    if "amount" in fields:
+        fields["days_of_cover"] = Stock.days_of_cover_expression(
+            amount=fields["amount"]
+        )
+    if "price" in fields or "percentage" in fields:
+        fields["total_price"] = Stock.total_price_expression(
+            price=fields.get("price"), percentage=fields.get("percentage")
+        )
+    updated = Stock.objects.filter(pk=pk).update(**fields, updated_at=timezone.now())
+    if updated:
+        bulk_updated.send(sender=Stock)
+    return bool(updated)
+
+
+def adjust_prices(percentage_change, ids=None):
+    """
+    Moves the price of every drug (or just ``ids``) by ``percentage_change``
+    percent and recomputes ``total_price``, all in a single UPDATE. Returns
+    the number of drugs changed.
+    """
+    queryset = Stock.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+
+    factor = 1 + percentage_change * Decimal("0.01")
+    new_price = Round(
+        ExpressionWrapper(
+            F("price") * Value(factor),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        2,
+    )
+    updated = queryset.update(
+        price=new_price,
+        total_price=Stock.total_price_expression(price=new_price),
+        updated_at=timezone.now(),
+    )
+    bulk_updated.send(sender=Stock)
+    return updated
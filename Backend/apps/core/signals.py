@@ -1,14 +1,9 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal
 
-from .models import Pharmaceutical, PharmaceuticalDrug, Stock
+# Sent after rows are inserted with ``bulk_create``, which skips
+# ``post_save``. Arguments: ``sender`` (the model) and ``instances``.
+bulk_created = Signal()
 
-
-@receiver(post_save, sender=Pharmaceutical)
-def decrease_stock(sender, instance, created, **kwargs):
-    if created:
-        # Loop through the related drugs using the through model
-        for pd in instance.pharmaceuticaldrug_set.all():
-            stock = pd.drug  # Stock instance
-            stock.amount -= pd.amount_used
-            stock.save()
+# Sent after rows are changed with ``QuerySet.update``, which skips
+# ``post_save``. Arguments: ``sender`` (the model).
+bulk_updated = Signal()
@@ -1,3 +1,974 @@
-from django.test import TestCase
+import sqlite3
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.reports.engine import day_start
+from apps.reports.models import DailyLedger
+
+from . import forecasting
+from .db import pragma_statements
+from .management.commands import copy_sqlite_data
+from .models import (
+    CategoryType,
+    DrugConsumption,
+    LabTest,
+    Patient,
+    Pharmaceutical,
+    PharmaceuticalDrug,
+    Stock,
+)
+from . import replicas
+from .query_plans import capture_plans, full_scans, indexes_used
+from .search import search_patients
+from .serializers import StockSerializer
+from . import services
+from .services import (
+    InsufficientStock,
+    StockContention,
+    adjust_prices,
+    dispense,
+    refresh_usage,
+    reserve_stock,
+    update_stock,
+)
+
+
+def make_stock(name="Paracetamol", amount=100):
+    return Stock.objects.create(
+        name=name, price=10, percentage=10, total_price=11, amount=amount
+    )
+
+
+class PharmaceuticalQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.patient = Patient.objects.create(name="Ahmad", patient_type="OPD")
+        self.stocks = [make_stock(f"Drug {i}") for i in range(3)]
+
+    def add_prescriptions(self, count):
+        for _ in range(count):
+            pharmaceutical = Pharmaceutical.objects.create(
+                patient_name=self.patient, copy="", price=10
+            )
+            for stock in self.stocks:
+                PharmaceuticalDrug.objects.create(
+                    pharmaceutical=pharmaceutical, drug=stock, amount_used=1
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(captured.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for url in ("/core/pharmaceuticals/", "/core/pharmaceuticals/list/"):
+            self.add_prescriptions(2)
+            few = self.count_queries(url)
+            self.add_prescriptions(20)
+            many = self.count_queries(url)
+
+            self.assertEqual(few, many, url)
+            self.assertLessEqual(many, 3, url)
+
+
+class DispenseTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.patient = Patient.objects.create(name="Ahmad", patient_type="OPD")
+
+    def test_shortage_rolls_back_the_whole_prescription(self):
+        plenty = make_stock("Plenty", amount=10)
+        scarce = make_stock("Scarce", amount=1)
+
+        response = self.client.post(
+            "/core/pharmaceuticals/",
+            {
+                "patient_name": self.patient.pk,
+                "copy": "1",
+                "price": "5.00",
+                "drugs": [
+                    {"drug_id": plenty.pk, "amount_used": 3},
+                    {"drug_id": scarce.pk, "amount_used": 2},
+                ],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f"drug_{scarce.pk}", response.data)
+        plenty.refresh_from_db()
+        self.assertEqual(plenty.amount, 10)
+        self.assertFalse(Pharmaceutical.objects.exists())
+
+    def test_repeated_drug_is_checked_against_its_total(self):
+        stock = make_stock(amount=3)
+        pharmaceutical = Pharmaceutical.objects.create(
+            patient_name=self.patient, copy="", price=0
+        )
+
+        with self.assertRaises(InsufficientStock):
+            dispense(pharmaceutical, [(stock, 2), (stock, 2)])
+
+        dispense(pharmaceutical, [(stock, 1), (stock, 2)])
+        stock.refresh_from_db()
+        self.assertEqual(stock.amount, 0)
+        self.assertEqual(pharmaceutical.pharmaceuticaldrug_set.count(), 2)
+
+    def test_reservation_retries_are_bounded(self):
+        stock = make_stock(amount=3)
+
+        # The UPDATE keeps missing although the stock covers the amount, as
+        # when other counters keep restocking and taking it.
+        with mock.patch.object(
+            services, "_shift_stock", return_value=0
+        ) as shift, self.assertRaises(StockContention):
+            reserve_stock([(stock, 1)], attempts=3)
+        self.assertEqual(shift.call_count, 3)
+
+    def test_update_restores_previous_stock(self):
+        stock = make_stock(amount=10)
+        url = "/core/pharmaceuticals/"
+        payload = {
+            "patient_name": self.patient.pk,
+            "copy": "1",
+            "price": "5.00",
+            "drugs": [{"drug_id": stock.pk, "amount_used": 4}],
+        }
+        pk = self.client.post(url, payload, format="json").data["id"]
+
+        payload["drugs"] = [{"drug_id": stock.pk, "amount_used": 1}]
+        response = self.client.put(f"{url}{pk}/", payload, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        stock.refresh_from_db()
+        self.assertEqual(stock.amount, 9)
+
+
+class ConcurrentDispenseTests(TransactionTestCase):
+    threads = 16
+    attempts_per_thread = 8
+    initial_amount = 50
+
+    def test_concurrent_counters_never_oversell(self):
+        stock = make_stock(amount=self.initial_amount)
+        patient = Patient.objects.create(name="Ahmad", patient_type="OPD")
+        outcomes = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.threads)
+
+        def counter():
+            start.wait()
+            try:
+                for _ in range(self.attempts_per_thread):
+                    while True:
+                        try:
+                            pharmaceutical = Pharmaceutical.objects.create(
+                                patient_name=patient, copy="", price=0
+                            )
+                            dispense(pharmaceutical, [(stock, 1)])
+                            outcome = "sold"
+                        except InsufficientStock:
+                            outcome = "refused"
+                        except OperationalError:
+                            # SQLite reports lock contention instead of
+                            # waiting; the attempt is simply retried.
+                            continue
+                        break
+                    with lock:
+                        outcomes.append(outcome)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=counter) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        stock.refresh_from_db()
+        sold = outcomes.count("sold")
+        self.assertEqual(len(outcomes), self.threads * self.attempts_per_thread)
+        self.assertEqual(sold, self.initial_amount)
+        self.assertEqual(stock.amount, 0)
+        self.assertEqual(
+            PharmaceuticalDrug.objects.filter(drug=stock).count(), self.initial_amount
+        )
+
+
+class BulkDispenseTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.patient = Patient.objects.create(name="Ahmad", patient_type="OPD")
+        self.stock = make_stock(amount=5)
+
+    def prescription(self, amount, **overrides):
+        return {
+            "patient_name": self.patient.pk,
+            "copy": "1",
+            "price": "2.00",
+            "drugs": [{"drug_id": self.stock.pk, "amount_used": amount}],
+            **overrides,
+        }
+
+    def test_batch_reports_per_item_errors(self):
+        response = self.client.post(
+            "/core/pharmaceuticals/bulk/",
+            [
+                self.prescription(3),
+                self.prescription(3),  # only 2 left after the first
+                self.prescription(1, patient_name=999),
+                self.prescription(2),
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["created"]), 2)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2])
+        self.assertIn(f"drug_{self.stock.pk}", response.data["errors"][0]["errors"])
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.amount, 0)
+        self.assertEqual(PharmaceuticalDrug.objects.filter(drug=self.stock).count(), 2)
+
+    def test_batch_updates_the_daily_ledger(self):
+        self.client.post(
+            "/core/pharmaceuticals/bulk/",
+            [self.prescription(1), self.prescription(1)],
+            format="json",
+        )
+
+        row = DailyLedger.objects.get(source=DailyLedger.PHARMACY_SALES)
+        self.assertEqual((row.total, row.entries), (4, 2))
+
+    def test_contended_drug_is_reported_under_its_index(self):
+        other = make_stock("Ibuprofen", amount=5)
+        reserve = services.reserve_stock
+
+        def contended(items, **kwargs):
+            if any(drug.pk == self.stock.pk for drug, _ in items):
+                raise InsufficientStock(self.stock)
+            return reserve(items, **kwargs)
+
+        with mock.patch.object(services, "reserve_stock", side_effect=contended):
+            response = self.client.post(
+                "/core/pharmaceuticals/bulk/",
+                [
+                    self.prescription(1),
+                    self.prescription(
+                        1, drugs=[{"drug_id": other.pk, "amount_used": 1}]
+                    ),
+                ],
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["created"]), 1)
+        self.assertEqual(
+            response.data["errors"],
+            [{"index": 0, "errors": {f"drug_{self.stock.pk}": mock.ANY}}],
+        )
+
+    def test_requires_a_non_empty_list(self):
+        for payload in (self.prescription(1), []):
+            response = self.client.post(
+                "/core/pharmaceuticals/bulk/", payload, format="json"
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("non-empty list", response.data["error"])
+
+
+class StockUpdateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user("Ad", "Min", "admin@example.com")
+        admin.role = admin.Admin
+        admin.save()
+        self.client.force_authenticate(admin)
+        self.stock = make_stock(amount=7)
+
+    def test_partial_update_writes_only_changed_columns(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.put(
+                f"/core/stocks/{self.stock.pk}/", {"price": "20.00"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data["total_price"]), Decimal("22.00"))
+        update = next(
+            query["sql"]
+            for query in captured.captured_queries
+            if query["sql"].startswith("UPDATE")
+        )
+        self.assertNotIn('"amount"', update)
+        self.assertNotIn('"name"', update)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.amount, 7)
+
+    def test_serializer_updates_through_the_same_path(self):
+        serializer = StockSerializer(
+            self.stock, data={"percentage": "15"}, partial=True
+        )
+        self.assertTrue(serializer.is_valid())
+
+        stock = serializer.save()
+        self.assertEqual(stock.total_price, Decimal("11.50"))
+        self.assertEqual(stock.amount, 7)
+
+    def test_missing_stock_is_404(self):
+        response = self.client.put("/core/stocks/999/", {"amount": 1}, format="json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_adjust_prices_in_one_update(self):
+        other = make_stock("Ibuprofen")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(adjust_prices(Decimal("-10"), ids=[self.stock.pk]), 1)
+
+        self.stock.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            (self.stock.price, self.stock.total_price),
+            (Decimal("9.00"), Decimal("9.90")),
+        )
+        self.assertEqual(other.price, Decimal("10.00"))
+
+    def test_adjust_price_endpoint(self):
+        response = self.client.post(
+            "/core/stocks/adjust-price/", {"percentage": "50"}, format="json"
+        )
+
+        self.assertEqual(response.data, {"updated": 1})
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.total_price, Decimal("16.50"))
+
+
+class LowStockTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("Ph", "Armacist", "ph@example.com")
+        )
+        self.patient = Patient.objects.create(name="Ahmad", patient_type="OPD")
+
+    def dispense(self, stock, amount):
+        pharmaceutical = Pharmaceutical.objects.create(
+            patient_name=self.patient, copy="", price=0
+        )
+        dispense(pharmaceutical, [(stock, amount)])
+
+    def test_dispensing_refreshes_days_of_cover(self):
+        stock = make_stock(amount=100)
+        self.dispense(stock, 30)  # 1 a day over the 30-day window
+
+        stock.refresh_from_db()
+        self.assertEqual(stock.avg_daily_usage, Decimal("1.00"))
+        self.assertEqual(stock.days_of_cover, Decimal("70.0"))
+
+        update_stock(stock.pk, {"amount": 7})
+        stock.refresh_from_db()
+        self.assertEqual(stock.days_of_cover, Decimal("7.0"))
+
+    def test_usage_outside_the_window_ages_out(self):
+        stock = make_stock(amount=100)
+        self.dispense(stock, 30)
+        Pharmaceutical.objects.update(
+            created_at=timezone.now() - timedelta(days=Stock.USAGE_WINDOW_DAYS + 1)
+        )
+
+        self.assertEqual(refresh_usage(), 1)
+        stock.refresh_from_db()
+        self.assertEqual(stock.avg_daily_usage, 0)
+        self.assertIsNone(stock.days_of_cover)
+
+    def test_lists_most_urgent_first(self):
+        fast = make_stock("Fast", amount=40)
+        slow = make_stock("Slow", amount=40)
+        empty = make_stock("Empty", amount=0)
+        make_stock("Idle", amount=40)
+        self.dispense(fast, 30)  # 10 left, 10 days of cover
+        self.dispense(slow, 3)  # 37 left, 370 days of cover
+
+        response = self.client.get("/core/stocks/low-stock/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data], [empty.pk, fast.pk])
+
+        response = self.client.get("/core/stocks/low-stock/?days=400&limit=2")
+        self.assertEqual([row["id"] for row in response.data], [empty.pk, fast.pk])
+        response = self.client.get("/core/stocks/low-stock/?days=400")
+        self.assertEqual(
+            [row["id"] for row in response.data], [empty.pk, fast.pk, slow.pk]
+        )
+
+    def test_rejects_bad_limit(self):
+        response = self.client.get("/core/stocks/low-stock/?limit=0")
+        self.assertEqual(response.status_code, 400)
+
+
+class ConsumptionForecastTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(name="Ahmad", patient_type="OPD")
+        self.end = timezone.localdate() - timedelta(days=1)
+
+    def dispense_on(self, day, stock, amount):
+        pharmaceutical = Pharmaceutical.objects.create(
+            patient_name=self.patient, copy="", price=0
+        )
+        PharmaceuticalDrug.objects.create(
+            pharmaceutical=pharmaceutical, drug=stock, amount_used=amount
+        )
+        Pharmaceutical.objects.filter(pk=pharmaceutical.pk).update(
+            created_at=day_start(day) + timedelta(hours=10)
+        )
+
+    def test_moving_average_matches_a_plain_mean(self):
+        matrix = np.arange(20, dtype=float).reshape(2, 10)
+        averages = forecasting.moving_average(matrix, 4)
+
+        self.assertEqual(averages.shape, (2, 7))
+        self.assertEqual(averages[1, -1], matrix[1, -4:].mean())
+
+    def test_refresh_summarizes_every_drug(self):
+        busy = make_stock("Busy", amount=10)
+        idle = make_stock("Idle", amount=10)
+        for offset in range(30):
+            self.dispense_on(self.end - timedelta(days=offset), busy, 2)
+        # Outside the 30-day averages, but still within the history.
+        self.dispense_on(self.end - timedelta(days=40), busy, 50)
+
+        # The usage refresh (two UPDATEs and a savepoint), the stock list,
+        # the history and the upsert.
+        with self.assertNumQueries(7):
+            self.assertEqual(forecasting.refresh(), 2)
+
+        busy.refresh_from_db()
+        summary = DrugConsumption.objects.get(drug=busy)
+        self.assertEqual(summary.avg_7_days, Decimal("2.00"))
+        self.assertEqual(summary.std_daily, 0)
+        # The stock's live average is refreshed too. Whether the oldest day
+        # still falls in its rolling window depends on the time of day.
+        self.assertIn(busy.avg_daily_usage, (Decimal("1.93"), Decimal("2.00")))
+        # The reorder point uses the 30 days ending at ``end``.
+        self.assertEqual(summary.reorder_point, 2 * forecasting.LEAD_TIME_DAYS)
+        self.assertEqual(DrugConsumption.objects.get(drug=idle).reorder_point, 0)
+
+        # Refreshing again updates the rows in place.
+        forecasting.refresh()
+        self.assertEqual(DrugConsumption.objects.count(), 2)
+
+    def test_reorder_points_for_a_past_end_date(self):
+        stock = make_stock("Seasonal", amount=10)
+        end = self.end - timedelta(days=60)
+        for offset in range(30):
+            self.dispense_on(end - timedelta(days=offset), stock, 3)
+
+        forecasting.refresh(end_date=end)
+
+        stock.refresh_from_db()
+        # Nothing dispensed recently, but the reorder point reflects the
+        # window that was asked for.
+        self.assertEqual(stock.avg_daily_usage, 0)
+        summary = DrugConsumption.objects.get(drug=stock)
+        self.assertEqual(summary.reorder_point, 3 * forecasting.LEAD_TIME_DAYS)
+
+    def test_usage_of_unknown_drugs_is_left_out(self):
+        known = make_stock("Known", amount=10)
+        added = make_stock("Added later", amount=10)
+        self.dispense_on(self.end, known, 2)
+        self.dispense_on(self.end, added, 5)
+
+        drug_ids, matrix = forecasting.usage_matrix(
+            self.end, 30, np.array([known.pk], dtype=np.int64)
+        )
+
+        self.assertEqual(list(drug_ids), [known.pk])
+        self.assertEqual(matrix.sum(), 2)
+
+    def test_reorder_endpoint_lists_drugs_below_their_reorder_point(self):
+        low = make_stock("Low", amount=10)
+        make_stock("Plenty", amount=1000)
+        for offset in range(30):
+            self.dispense_on(self.end - timedelta(days=offset), low, 2)
+        forecasting.refresh()
+
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_user("Ph", "Armacist", "ph@example.com")
+        )
+        response = client.get("/core/stocks/reorder/")
+
+        self.assertEqual([row["id"] for row in response.data], [low.pk])
+        self.assertEqual(response.data[0]["consumption"]["reorder_point"], 14)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.patients = [
+            Patient.objects.create(name=f"Patient {i}", patient_type="OPD")
+            for i in range(12)
+        ]
+        # Five patients share one timestamp, so ties are broken by id.
+        same_time = timezone.now() - timedelta(days=1)
+        Patient.objects.filter(pk__in=[p.pk for p in self.patients[:5]]).update(
+            created_at=same_time
+        )
+        self.newest_first = list(
+            Patient.objects.order_by("-created_at", "-pk").values_list("pk", flat=True)
+        )
+
+    def ids(self, response):
+        return [row["id"] for row in response.data["results"]]
+
+    def test_lists_stay_unpaginated_unless_asked(self):
+        response = self.client.get("/core/patients/")
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 12)
+
+    def test_walks_forward_and_back_without_gaps(self):
+        response = self.client.get("/core/patients/?limit=5&count=true")
+        self.assertEqual(response.data["count"], 12)
+        self.assertIsNone(response.data["previous"])
+
+        seen, pages = self.ids(response), [response]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            pages.append(response)
+            seen += self.ids(response)
+        self.assertEqual(seen, self.newest_first)
+
+        response = self.client.get(pages[-1].data["previous"])
+        self.assertEqual(self.ids(response), self.ids(pages[-2]))
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(self.ids(response), self.ids(pages[0]))
+        self.assertIsNone(response.data["previous"])
+
+    def test_new_rows_do_not_shift_the_next_page(self):
+        first = self.client.get("/core/patients/?limit=5")
+        Patient.objects.create(name="Walk-in", patient_type="OPD")
+
+        response = self.client.get(first.data["next"])
+        self.assertEqual(self.ids(response), self.newest_first[5:10])
+
+    def test_page_query_costs_no_offset(self):
+        first = self.client.get("/core/patients/?limit=5")
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(first.data["next"])
+        sql = captured.captured_queries[-1]["sql"]
+        self.assertNotIn("OFFSET", sql)
+        self.assertIn("LIMIT 6", sql)
+
+    def test_bad_cursor_is_404(self):
+        response = self.client.get("/core/patients/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+    def test_pharmaceutical_list_keeps_count(self):
+        for patient in self.patients[:3]:
+            Pharmaceutical.objects.create(patient_name=patient, copy="", price=1)
+
+        response = self.client.get("/core/pharmaceuticals/list/")
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 3)
+
+
+class PatientSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("Re", "Ception", "re@example.com")
+        )
+        self.category = CategoryType.objects.create(name="Insured")
+        for name in ("Ahmad Zaki", "Zakia Rahimi", "José Ramos", "Ahmadullah"):
+            Patient.objects.create(name=name, patient_type="OPD")
+        Patient.objects.create(
+            name="Ahmad Karimi", patient_type="IPD", category=self.category
+        )
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row["name"] for row in response.data]
+
+    def test_prefix_matches_come_before_substring_matches(self):
+        self.assertEqual(
+            self.names("/core/patients/search/?q=zak"), ["Zakia Rahimi", "Ahmad Zaki"]
+        )
+
+    def test_matching_ignores_case_accents_and_spacing(self):
+        self.assertEqual(
+            self.names("/core/patients/search/?q=JOSE%20%20ram"), ["José Ramos"]
+        )
+
+    def test_filters_and_limit(self):
+        self.assertEqual(
+            self.names(f"/core/patients/search/?q=ahmad&category={self.category.pk}"),
+            ["Ahmad Karimi"],
+        )
+        self.assertEqual(
+            self.names("/core/patients/search/?q=ahmad&patient_type=OPD&limit=1"),
+            ["Ahmad Zaki"],
+        )
+
+    def test_index_follows_renames_and_deletes(self):
+        patient = Patient.objects.get(name="Ahmadullah")
+        patient.name = "Bashir Zaki"
+        patient.save()
+        Patient.objects.filter(name="Zakia Rahimi").delete()
+
+        self.assertEqual(
+            [p.name for p in search_patients("zaki")], ["Bashir Zaki", "Ahmad Zaki"]
+        )
+
+    def test_substring_search_uses_the_fts_index(self):
+        with CaptureQueriesContext(connection) as captured:
+            search_patients("rahim")
+        self.assertIn("core_patient_fts MATCH", captured.captured_queries[-1]["sql"])
+        self.assertNotIn("LIKE", captured.captured_queries[-1]["sql"])
+
+    def test_requires_a_query(self):
+        response = self.client.get("/core/patients/search/")
+        self.assertEqual(response.status_code, 400)
+
+
+class PatientTimelineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("Re", "Ception", "re@example.com")
+        )
+        self.patient = Patient.objects.create(name="Ahmad Zaki", patient_type="OPD")
+        other = Patient.objects.create(name="Zakia Rahimi", patient_type="OPD")
+        drug = make_stock()
+
+        now = timezone.now()
+        for days in range(4):
+            LabTest.objects.create(patient=self.patient, price=5, refer_to="Lab")
+            pharmaceutical = Pharmaceutical.objects.create(
+                patient_name=self.patient, copy="1"
+            )
+            PharmaceuticalDrug.objects.create(
+                pharmaceutical=pharmaceutical, drug=drug, amount_used=2
+            )
+            # Day 0 puts a lab test and a prescription at the same instant.
+            LabTest.objects.filter(pk=LabTest.objects.latest("pk").pk).update(
+                date=now - timedelta(days=days)
+            )
+            Pharmaceutical.objects.filter(pk=pharmaceutical.pk).update(
+                created_at=now - timedelta(days=days, hours=0 if days == 0 else 6)
+            )
+        LabTest.objects.create(patient=other, price=5, refer_to="Lab")
+
+        self.url = f"/core/patients/{self.patient.pk}/timeline/"
+
+    def keys(self, response):
+        return [(row["type"], row["data"]["id"]) for row in response.data["results"]]
+
+    def test_merges_both_histories_newest_first(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["next"])
+
+        expected = sorted(
+            [
+                ("lab_test", lab.date, 0, lab.pk)
+                for lab in self.patient.labtest_set.all()
+            ]
+            + [
+                ("pharmaceutical", p.created_at, 1, p.pk)
+                for p in self.patient.pharmaceutical_set.all()
+            ],
+            key=lambda entry: entry[1:],
+            reverse=True,
+        )
+        self.assertEqual(
+            self.keys(response), [(kind, pk) for kind, _, _, pk in expected]
+        )
+        prescription = response.data["results"][0]["data"]
+        self.assertEqual(prescription["drugs"][0]["amount_used"], 2)
+
+    def test_pages_cover_the_history_once(self):
+        everything = self.keys(self.client.get(self.url))
+        seen = []
+        response = self.client.get(f"{self.url}?limit=3")
+        while True:
+            self.assertLessEqual(len(response.data["results"]), 3)
+            seen += self.keys(response)
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, everything)
+
+    def test_query_count_does_not_grow_with_history(self):
+        # Patient check, lab tests, prescriptions and their drugs.
+        with self.assertNumQueries(4):
+            self.client.get(f"{self.url}?limit=5")
+        for _ in range(10):
+            LabTest.objects.create(patient=self.patient, price=5, refer_to="Lab")
+        with self.assertNumQueries(4):
+            self.client.get(f"{self.url}?limit=5")
+
+    def test_unknown_patient_and_bad_cursor(self):
+        self.assertEqual(self.client.get("/core/patients/0/timeline/").status_code, 404)
+        response = self.client.get(f"{self.url}?cursor=nonsense")
+        self.assertEqual(response.status_code, 404)
+
+
+@skipUnless(connection.vendor == "sqlite", "Reads SQLite query plans.")
+class ListQueryPlanTests(TestCase):
+    """
+    The paginated lists and the usage refresh read through the indexes
+    declared for them instead of scanning their tables.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("Re", "Ception", "re@example.com")
+        )
+        self.patient = Patient.objects.create(name="Ahmad Zaki", patient_type="OPD")
+        self.drug = make_stock()
+
+    def indexes(self, func, *args):
+        plans = capture_plans(func, *args)
+        self.assertTrue(plans)
+        for sql, plan in plans:
+            self.assertEqual(full_scans(plan), [], sql)
+        return set().union(*(indexes_used(plan) for _, plan in plans))
+
+    def test_paginated_lists(self):
+        lists = {
+            "/core/patients/?limit=5": "patient_created_id_idx",
+            "/core/lab/?limit=5": "labtest_date_id_idx",
+            "/core/pharmaceuticals/list/?limit=5": "pharm_created_id_idx",
+            "/core/daily-expenses/?limit=5": "dailyexp_date_id_idx",
+            "/core/taken-expenses/?limit=5": "takenprice_date_id_idx",
+            "/core/daily-expenses-pharmacy/?limit=5": "pharmexp_date_id_idx",
+            f"/core/patients/{self.patient.pk}/timeline/": "labtest_patient_date_idx",
+        }
+        for url, index in lists.items():
+            with self.subTest(url=url):
+                self.assertIn(index, self.indexes(self.client.get, url))
+
+    def test_timeline_reads_prescriptions_by_patient(self):
+        Pharmaceutical.objects.create(patient_name=self.patient, copy="1")
+        used = self.indexes(
+            self.client.get, f"/core/patients/{self.patient.pk}/timeline/"
+        )
+        self.assertIn("pharm_patient_created_idx", used)
+        self.assertIn("pharmdrug_pharm_drug_idx", used)
+
+    def test_usage_refresh_reads_one_drug_history(self):
+        self.assertIn("pharmdrug_drug_pharm_idx", self.indexes(refresh_usage, [1]))
+
+
+@skipUnless(connection.vendor == "sqlite", "Checks SQLite pragmas.")
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connections_are_tuned(self):
+        self.assertEqual(self.pragma("busy_timeout"), 20000)
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("temp_store"), 2)  # MEMORY
+        self.assertEqual(
+            connection.settings_dict["OPTIONS"]["transaction_mode"], "IMMEDIATE"
+        )
+
+    def test_rejects_unknown_pragmas_and_values(self):
+        self.assertEqual(
+            pragma_statements({"journal_mode": "WAL", "cache_size": "-2000"}),
+            ["PRAGMA journal_mode = wal", "PRAGMA cache_size = -2000"],
+        )
+        for pragmas in ({"synchronous": "normal; DROP TABLE x"}, {"writable": 1}):
+            with self.assertRaises(ValueError):
+                pragma_statements(pragmas)
+
+
+class CopySQLiteDataTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Built before the test isolation guards go up; bulk_create keeps
+        # the ledger signals from writing to the default test database.
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        cls.path = f"{directory.name}/source.sqlite3"
+        source = copy_sqlite_data.SOURCE_ALIAS
+        copy_sqlite_data.register_source(cls.path)
+        try:
+            call_command("migrate", database=source, verbosity=0)
+            (patient,) = Patient.objects.using(source).bulk_create(
+                [
+                    Patient(
+                        name="Ahmad Zaki",
+                        name_normalized="ahmad zaki",
+                        patient_type="OPD",
+                    )
+                ]
+            )
+            Patient.objects.using(source).update(
+                created_at=timezone.now() - timedelta(days=400)
+            )
+            (drug,) = Stock.objects.using(source).bulk_create(
+                [
+                    Stock(
+                        name="Paracetamol",
+                        price=10,
+                        percentage=10,
+                        total_price=11,
+                        amount=5,
+                    )
+                ]
+            )
+            (pharmaceutical,) = Pharmaceutical.objects.using(source).bulk_create(
+                [Pharmaceutical(patient_name=patient, copy="1")]
+            )
+            PharmaceuticalDrug.objects.using(source).bulk_create(
+                [
+                    PharmaceuticalDrug(
+                        pharmaceutical=pharmaceutical, drug=drug, amount_used=2
+                    )
+                ]
+            )
+            cls.source_patient_pk = patient.pk
+        finally:
+            copy_sqlite_data.unregister_source()
+        super().setUpClass()
+
+    def copy(self, *args):
+        # The command opens its own connection to the source file.
+        allowed = self.databases | {copy_sqlite_data.SOURCE_ALIAS}
+        with mock.patch.object(type(self), "databases", allowed):
+            call_command("copy_sqlite_data", self.path, *args, stdout=StringIO())
+
+    def test_copies_rows_as_they_are(self):
+        Patient.objects.create(name="Left over", patient_type="OPD")
+        with self.assertRaises(CommandError):
+            self.copy()
+
+        self.copy("--replace")
+
+        patient = Patient.objects.get()
+        self.assertEqual(patient.pk, self.source_patient_pk)
+        self.assertEqual(patient.name_normalized, "ahmad zaki")
+        self.assertLess(patient.created_at, timezone.now() - timedelta(days=399))
+        self.assertEqual(
+            list(PharmaceuticalDrug.objects.values_list("drug__name", "amount_used")),
+            [("Paracetamol", 2)],
+        )
+        self.assertEqual(search_patients("zak"), [patient])
+
+    def test_orders_tables_after_their_foreign_keys(self):
+        order = copy_sqlite_data.copy_order(
+            [PharmaceuticalDrug, Stock, Pharmaceutical, Patient, CategoryType]
+        )
+        self.assertLess(order.index(Patient), order.index(Pharmaceutical))
+        self.assertLess(order.index(CategoryType), order.index(Patient))
+        self.assertLess(order.index(Pharmaceutical), order.index(PharmaceuticalDrug))
+        self.assertLess(order.index(Stock), order.index(PharmaceuticalDrug))
+
+
+@skipUnless(connection.vendor == "sqlite", "Replicates by copying SQLite files.")
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The primary is the test database and the replica a second SQLite file.
+    ``sync_replica`` stands in for replication, so anything written since
+    the last sync is only visible on the primary.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        cls.replica_path = f"{directory.name}/replica.sqlite3"
+        # Added after the runner has set up the test databases, then
+        # allowed for this class.
+        connections.settings[replicas.REPLICA_DB_ALIAS] = {
+            **connections["default"].settings_dict,
+            "NAME": cls.replica_path,
+        }
+        cls.databases = cls.databases | {replicas.REPLICA_DB_ALIAS}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[replicas.REPLICA_DB_ALIAS].close()
+        del connections[replicas.REPLICA_DB_ALIAS]
+        del connections.settings[replicas.REPLICA_DB_ALIAS]
+
+    def sync_replica(self):
+        connections[replicas.REPLICA_DB_ALIAS].close()
+        connection.ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    def setUp(self):
+        self.client = APIClient()
+        Patient.objects.create(name="Replicated", patient_type="OPD")
+        self.sync_replica()
+        Patient.objects.create(name="Not yet replicated", patient_type="OPD")
+
+    def names(self, response):
+        return sorted(row["name"] for row in response.json())
+
+    def test_marked_lists_read_from_the_replica(self):
+        self.assertEqual(self.names(self.client.get("/core/patients/")), ["Replicated"])
+
+    def test_exports_stream_from_the_replica(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("Rep", "Orter", "rep@x.com")
+        )
+        response = self.client.get("/reports/api/v1/exports/pharmaceuticals/")
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 1)
+        self.sync_replica()
+        # A fresh client: creating the user above pinned this one.
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.get(email="rep@x.com"))
+        Pharmaceutical.objects.create(patient_name=Patient.objects.first(), copy="1")
+        response = client.get("/reports/api/v1/exports/pharmaceuticals/")
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 1)
+
+    def test_a_write_pins_the_client_to_the_primary(self):
+        response = self.client.post(
+            "/core/patients/", {"name": "Walk-in", "patient_type": "OPD"}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(replicas.STICKY_COOKIE, response.cookies)
+
+        self.assertEqual(
+            self.names(self.client.get("/core/patients/")),
+            ["Not yet replicated", "Replicated", "Walk-in"],
+        )
+
+    def test_reads_after_a_write_in_the_same_request_use_the_primary(self):
+        with replicas.use_replica():
+            self.assertEqual(Patient.objects.count(), 1)
+            Patient.objects.create(name="Walk-in", patient_type="OPD")
+            self.assertEqual(Patient.objects.count(), 3)
+
+    def test_everything_else_reads_from_the_primary(self):
+        self.assertEqual(Patient.objects.count(), 2)
+        user = get_user_model().objects.create_user("Ph", "Armacist", "ph@x.com")
+        self.client.force_authenticate(user)
+        make_stock()
+        # The stock list isn't marked; the counter must see current amounts.
+        self.assertEqual(len(self.client.get("/core/stocks/").json()), 1)
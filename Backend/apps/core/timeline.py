@@ -0,0 +1,88 @@
+"""
+A patient's lab tests and prescriptions as one newest-first history.
+
+Each source is read with its own keyset query over the patient's composite
+index (``labtest_patient_date_idx``, ``pharm_patient_created_idx``), taking
+at most ``limit + 1`` rows, and the two sorted lists are merged in Python.
+A page therefore costs the same fixed set of queries however long the
+history is, and never sorts more than ``2 * (limit + 1)`` rows.
+
+Entries are ordered by ``(timestamp, kind, id)`` descending, which is total
+even when a lab test and a prescription share a timestamp; the cursor
+carries that key for the last entry on the page.
+"""
+
+import heapq
+from datetime import datetime
+
+from django.db.models import Q
+
+from .models import LabTest, Pharmaceutical
+from .pagination import decode_cursor, encode_cursor
+
+# Tie-break between sources at the same timestamp; higher comes first.
+SOURCES = {
+    "pharmaceutical": (1, Pharmaceutical, "patient_name", "created_at"),
+    "lab_test": (0, LabTest, "patient", "date"),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_cursor(token):
+    """
+    Returns the ``(timestamp, rank, id)`` key encoded in ``token``.
+    """
+    try:
+        data = decode_cursor(token)
+        return datetime.fromisoformat(data["t"]), int(data["k"]), int(data["id"])
+    except (TypeError, ValueError, KeyError):
+        raise InvalidCursor(token)
+
+
+def _after(field, rank, cursor):
+    """
+    The rows of a source with ``rank`` that sort after ``cursor``.
+    """
+    timestamp, cursor_rank, pk = cursor
+    if rank == cursor_rank:
+        return Q(**{f"{field}__lt": timestamp}) | Q(**{field: timestamp, "pk__lt": pk})
+    if rank < cursor_rank:
+        return Q(**{f"{field}__lte": timestamp})
+    return Q(**{f"{field}__lt": timestamp})
+
+
+def _entries(kind, patient, limit, cursor):
+    rank, model, patient_field, field = SOURCES[kind]
+    queryset = model.objects.filter(**{patient_field: patient})
+    if model is Pharmaceutical:
+        queryset = queryset.with_drugs()
+    if cursor is not None:
+        queryset = queryset.filter(_after(field, rank, cursor))
+    rows = queryset.order_by(f"-{field}", "-pk")[: limit + 1]
+    return [(getattr(row, field), rank, row.pk, kind, row) for row in rows]
+
+
+def patient_timeline(patient, limit=20, cursor=None):
+    """
+    Returns ``(entries, next_cursor)`` for one page of ``patient``'s
+    history. ``entries`` are ``(kind, timestamp, instance)`` triples and
+    ``next_cursor`` is None on the last page.
+    """
+    key = parse_cursor(cursor) if cursor else None
+    merged = heapq.merge(
+        *(_entries(kind, patient, limit, key) for kind in SOURCES),
+        key=lambda entry: entry[:3],
+        reverse=True,
+    )
+    page = list(merged)
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    next_cursor = None
+    if has_more:
+        timestamp, rank, pk = page[-1][:3]
+        next_cursor = encode_cursor({"t": timestamp.isoformat(), "k": rank, "id": pk})
+    return [(kind, timestamp, row) for timestamp, _, _, kind, row in page], next_cursor
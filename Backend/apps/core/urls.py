@@ -7,14 +7,20 @@ from .views import (
     DailyExpensePharmacyViewSet,
     DailyExpenseViewSet,
     LabTestApiView,
+    LowStockView,
     PatientDeleteView,
     PatientListView,
+    PatientSearchView,
+    PatientTimelineView,
     PatientUpdateView,
+    PharmaceuticalBulkCreateView,
     PharmaceuticalDetailView,
     PharmaceuticalListCreateView,
     PharmaceuticalListView,
+    ReorderView,
     StaffViewSet,
     StockListView,
+    StockPriceAdjustmentView,
     TakenDailyExpenseViewSet,
     TestTypeApiView,
 )
@@ -27,14 +33,27 @@ router.register("staff", StaffViewSet, basename="staff")
 urlpatterns = [
     path("", include(router.urls)),
     path("patients/", PatientListView.as_view(), name="patient-list"),
+    path("patients/search/", PatientSearchView.as_view(), name="patient-search"),
     path("lab/", LabTestApiView.as_view(), name="lab"),
     path("test-type/", TestTypeApiView.as_view(), name="lab"),
     path("patients/<int:pk>/", PatientDeleteView.as_view(), name="patient-delete"),
+    path(
+        "patients/<int:pk>/timeline/",
+        PatientTimelineView.as_view(),
+        name="patient-timeline",
+    ),
     path(
         "patients/<int:pk>/update/", PatientUpdateView.as_view(), name="patient-update"
     ),
     path("stocks/", StockListView.as_view(), name="stock-list"),
     path("stocks/<int:pk>/", StockListView.as_view(), name="stock-detail"),
+    path("stocks/low-stock/", LowStockView.as_view(), name="stock-low-stock"),
+    path("stocks/reorder/", ReorderView.as_view(), name="stock-reorder"),
+    path(
+        "stocks/adjust-price/",
+        StockPriceAdjustmentView.as_view(),
+        name="stock-adjust-price",
+    ),
     path(
         "category-types/",
         CategoryTypeListCreateView.as_view(),
@@ -50,6 +69,11 @@ urlpatterns = [
         PharmaceuticalListCreateView.as_view(),
         name="pharmaceutical-list-create",
     ),
+    path(
+        "pharmaceuticals/bulk/",
+        PharmaceuticalBulkCreateView.as_view(),
+        name="pharmaceutical-bulk-create",
+    ),
     path(
         "pharmaceuticals/<int:pk>/",
         PharmaceuticalDetailView.as_view(),
@@ -1,10 +1,16 @@
 import logging
 
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q
 from rest_framework import generics, status, viewsets
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
+from apps.users.permissions import RolePermission
+
 from .models import (
     CategoryType,
     DailyExpense,
@@ -17,19 +23,33 @@ from .models import (
     TakenPrice,
     TestType,
 )
-from .pagination import PharmaceuticalPagination, TestTypePagination
+from .pagination import (
+    OptionalDateKeysetPagination,
+    OptionalKeysetPagination,
+    PharmaceuticalPagination,
+    TestTypePagination,
+)
 from .serializers import (
+    BulkPharmaceuticalSerializer,
     CategoryTypeSerializer,
     DailyExpensePharmacySerializer,
     DailyExpenseSerializer,
     LabTestSerializer,
+    LowStockQuerySerializer,
+    PatientSearchQuerySerializer,
     PatientSerializer,
+    PatientTimelineQuerySerializer,
     PharmaceuticalSerializer,
+    ReorderSerializer,
     StaffSerializer,
+    StockPriceAdjustmentSerializer,
     StockSerializer,
     TakenPriceSerializer,
     TestTypeSerializer,
 )
+from .search import search_patients
+from .services import adjust_prices, dispense_batch, update_stock
+from .timeline import InvalidCursor, patient_timeline
 
 logger = logging.getLogger(__name__)
 
@@ -53,19 +73,31 @@ class TestTypeApiView(generics.ListCreateAPIView):
 
 
 class LabTestApiView(generics.ListCreateAPIView):
+    replica_reads = True
+    token_claims = True
     permission_classes = [AllowAny]
     queryset = LabTest.objects.all()
     serializer_class = LabTestSerializer
+    pagination_class = OptionalDateKeysetPagination
 
 
 class PatientListView(APIView):
+    replica_reads = True
+    token_claims = True
     permission_classes = [AllowAny]
 
     def get(self, request):
         try:
             patients = Patient.objects.all()
+            paginator = OptionalKeysetPagination()
+            page = paginator.paginate_queryset(patients, request, view=self)
+            if page is not None:
+                serializer = PatientSerializer(page, many=True)
+                return paginator.get_paginated_response(serializer.data)
             serializer = PatientSerializer(patients, many=True)
             return Response(serializer.data)
+        except NotFound:
+            raise
         except Exception as e:
             print(f"Error fetching patients: {e}")
             return Response({"error": "Failed to load patients."}, status=500)
@@ -87,6 +119,77 @@ class PatientListView(APIView):
             return Response({"error": "Failed to register patient."}, status=500)
 
 
+class PatientSearchView(APIView):
+    """
+    GET ``?q=&category=&patient_type=&limit=`` for the patients whose name
+    starts with, then contains, ``q``.
+    """
+
+    replica_reads = True
+    token_claims = True
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = PatientSearchQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {}
+        if "category" in params.validated_data:
+            filters["category_id"] = params.validated_data["category"]
+        if "patient_type" in params.validated_data:
+            filters["patient_type"] = params.validated_data["patient_type"]
+
+        patients = search_patients(
+            params.validated_data["q"], params.validated_data["limit"], **filters
+        )
+        return Response(PatientSerializer(patients, many=True).data)
+
+
+class PatientTimelineView(APIView):
+    """
+    GET ``?limit=&cursor=`` for a patient's lab tests and prescriptions,
+    newest first. Follow ``next`` for older entries.
+    """
+
+    replica_reads = True
+    token_claims = True
+    permission_classes = [IsAuthenticated]
+    serializers = {
+        "lab_test": LabTestSerializer,
+        "pharmaceutical": PharmaceuticalSerializer,
+    }
+
+    def get(self, request, pk):
+        params = PatientTimelineQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not Patient.objects.filter(pk=pk).exists():
+            raise NotFound("Patient not found.")
+
+        try:
+            entries, cursor = patient_timeline(
+                pk, params.validated_data["limit"], params.validated_data.get("cursor")
+            )
+        except InvalidCursor:
+            raise NotFound("Invalid cursor.")
+
+        next_link = None
+        if cursor:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), "cursor", cursor
+            )
+        results = [
+            {
+                "type": kind,
+                "date": timestamp,
+                "data": self.serializers[kind](row).data,
+            }
+            for kind, timestamp, row in entries
+        ]
+        return Response({"next": next_link, "results": results})
+
+
 class PatientDeleteView(APIView):
     permission_classes = [AllowAny]
 
@@ -145,8 +248,13 @@ class PatientUpdateView(APIView):
 
 
 class StockListView(APIView):
-    permission_classes = [IsAuthenticated]  # Only authenticated users can access
-    # permission_classes = [AllowAny]
+    token_claims = True
+    permission_classes = [IsAuthenticated, RolePermission]
+    role_permissions = {
+        "POST": "stock.change",
+        "PUT": "stock.change",
+        "DELETE": "stock.change",
+    }
 
     def get(self, request):
         stocks = Stock.objects.all()
@@ -154,13 +262,6 @@ class StockListView(APIView):
         return Response(serializer.data)
 
     def post(self, request):
-        # Only Admin can create
-        if request.user.role != request.user.Admin:
-            return Response(
-                {"error": "You do not have permission to add stock."},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-
         serializer = StockSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -168,34 +269,18 @@ class StockListView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def put(self, request, pk):
-        # Only Admin can update
-        if request.user.role != request.user.Admin:
-            return Response(
-                {"error": "You do not have permission to update stock."},
-                status=status.HTTP_403_FORBIDDEN,
-            )
+        serializer = StockSerializer(data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            stock = Stock.objects.get(pk=pk)
-        except Stock.DoesNotExist:
+        # Update in place without loading the row first
+        if not update_stock(pk, serializer.validated_data):
             return Response(
                 {"error": "Stock not found."}, status=status.HTTP_404_NOT_FOUND
             )
-
-        serializer = StockSerializer(stock, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(StockSerializer(Stock.objects.get(pk=pk)).data)
 
     def delete(self, request, pk):
-        # Only Admin can delete
-        if request.user.role != request.user.Admin:
-            return Response(
-                {"error": "You do not have permission to delete stock."},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-
         try:
             stock = Stock.objects.get(pk=pk)
             stock.delete()
@@ -209,6 +294,69 @@ class StockListView(APIView):
             )
 
 
+class LowStockView(APIView):
+    """
+    GET ``?limit=&days=&min_amount=`` for the drugs closest to running out,
+    read straight off the amount and days_of_cover indexes.
+    """
+
+    replica_reads = True
+    token_claims = True
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = LowStockQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        stocks = Stock.objects.filter(
+            Q(days_of_cover__lte=params.validated_data["days"])
+            | Q(amount__lte=params.validated_data["min_amount"])
+        ).order_by(F("days_of_cover").asc(nulls_first=True), "amount", "pk")[
+            : params.validated_data["limit"]
+        ]
+        return Response(StockSerializer(stocks, many=True).data)
+
+
+class ReorderView(generics.ListAPIView):
+    """
+    Drugs at or below their forecast reorder point, biggest shortfall first.
+    """
+
+    replica_reads = True
+    token_claims = True
+    permission_classes = [IsAuthenticated]
+    serializer_class = ReorderSerializer
+
+    def get_queryset(self):
+        return (
+            Stock.objects.filter(amount__lte=F("consumption__reorder_point"))
+            .select_related("consumption")
+            .order_by(F("amount") - F("consumption__reorder_point"), "pk")
+        )
+
+
+class StockPriceAdjustmentView(APIView):
+    """
+    POST {"percentage": 5, "ids": [1, 2]} to move drug prices by a percentage
+    in one UPDATE. Without ``ids`` every drug is adjusted.
+    """
+
+    permission_classes = [IsAuthenticated, RolePermission]
+    role_permissions = {"POST": "stock.adjust_prices"}
+
+    def post(self, request):
+        serializer = StockPriceAdjustmentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        updated = adjust_prices(
+            serializer.validated_data["percentage"],
+            serializer.validated_data.get("ids"),
+        )
+        return Response({"updated": updated})
+
+
 class StockCreateView(APIView):
     def post(self, request):
         print("Request payload:", request.data)  # Log incoming request data
@@ -238,39 +386,118 @@ class CategoryTypeDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class PharmaceuticalListCreateView(generics.ListCreateAPIView):
+    replica_reads = True
+    token_claims = True
     permission_classes = [AllowAny]
-    queryset = Pharmaceutical.objects.all()
+    queryset = Pharmaceutical.objects.with_drugs()
     serializer_class = PharmaceuticalSerializer
+    pagination_class = OptionalKeysetPagination
 
 
 class PharmaceuticalListView(generics.ListAPIView):
     """
-    API endpoint to list all pharmaceuticals with pagination.
+    API endpoint to list all pharmaceuticals, newest first, a cursor page
+    at a time.
     """
 
+    replica_reads = True
+    token_claims = True
     permission_classes = [AllowAny]
-    queryset = Pharmaceutical.objects.all().order_by("-created_at")
+    queryset = Pharmaceutical.objects.with_drugs()
     serializer_class = PharmaceuticalSerializer
     pagination_class = PharmaceuticalPagination
 
 
+class PharmaceuticalBulkCreateView(APIView):
+    """
+    POST a list of prescriptions to create them all in one transaction.
+
+    Items that fail validation or would overdraw stock are reported by their
+    position in the list; the others are still created.
+    """
+
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        if not isinstance(request.data, list) or not request.data:
+            return Response(
+                {"error": "Expected a non-empty list of prescriptions."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        errors = {}
+        pending = []
+        for index, item in enumerate(request.data):
+            serializer = BulkPharmaceuticalSerializer(data=item)
+            if serializer.is_valid():
+                pending.append((index, serializer))
+            else:
+                errors[index] = serializer.errors
+
+        # Resolve every referenced row for the whole batch in three queries.
+        valid = [serializer.validated_data for _, serializer in pending]
+        patients = Patient.objects.in_bulk({data["patient_name"] for data in valid})
+        doctors = get_user_model().objects.in_bulk(
+            {data["doctor_name"] for data in valid if data.get("doctor_name")}
+        )
+        stocks = Stock.objects.in_bulk(
+            {drug["drug_id"] for data in valid for drug in data["drugs"]}
+        )
+
+        positions, prescriptions = [], []
+        for index, serializer in pending:
+            try:
+                prescriptions.append(serializer.resolve(patients, doctors, stocks))
+                positions.append(index)
+            except ValidationError as e:
+                errors[index] = e.detail
+
+        created, shortages = dispense_batch(prescriptions)
+        for position, shortage in shortages.items():
+            errors[positions[position]] = {f"drug_{shortage.drug.id}": str(shortage)}
+
+        created = (
+            Pharmaceutical.objects.with_drugs()
+            .filter(pk__in=[pharmaceutical.pk for pharmaceutical in created])
+            .order_by("pk")
+        )
+        return Response(
+            {
+                "created": PharmaceuticalSerializer(created, many=True).data,
+                "errors": [
+                    {"index": index, "errors": errors[index]}
+                    for index in sorted(errors)
+                ],
+            },
+            status=(
+                status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+
 class PharmaceuticalDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [AllowAny]
-    queryset = Pharmaceutical.objects.all()
+    queryset = Pharmaceutical.objects.with_drugs()
     serializer_class = PharmaceuticalSerializer
 
 
 class DailyExpenseViewSet(viewsets.ModelViewSet):
+    replica_reads = True
+    token_claims = True
     permission_classes = [AllowAny]
 
     queryset = DailyExpense.objects.all()
     serializer_class = DailyExpenseSerializer
+    pagination_class = OptionalDateKeysetPagination
 
 
 class TakenDailyExpenseViewSet(viewsets.ModelViewSet):
+    replica_reads = True
+    token_claims = True
     permission_classes = [AllowAny]
     queryset = TakenPrice.objects.all()
     serializer_class = TakenPriceSerializer
+    pagination_class = OptionalDateKeysetPagination
 
 
 class StaffViewSet(viewsets.ModelViewSet):
@@ -286,6 +513,9 @@ class StaffViewSet(viewsets.ModelViewSet):
 
 
 class DailyExpensePharmacyViewSet(viewsets.ModelViewSet):
+    replica_reads = True
+    token_claims = True
     permission_classes = [AllowAny]
     queryset = DailyExpensePharmacy.objects.all()
     serializer_class = DailyExpensePharmacySerializer
+    pagination_class = OptionalDateKeysetPagination
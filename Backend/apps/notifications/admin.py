@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import OutboundEmail
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "created_at")
+    list_filter = ("status",)
+    search_fields = ("subject",)
+    readonly_fields = ("claim", "claimed_at", "sent_at", "last_error")
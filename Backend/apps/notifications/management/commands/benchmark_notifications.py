@@ -0,0 +1,115 @@
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from apps.notifications import outbox
+from apps.notifications.notify import notify, render_messages, site_context
+from apps.notifications.smtp_sink import SMTPSink
+
+TEMPLATE = "notifications/salary_notice.html"
+SUBJECT = "Salary notice for {{ month }}"
+
+
+def legacy_message(request, template, context, email):
+    """
+    How the senders in utils.py built each email before: site lookup and
+    ``render_to_string`` per message.
+    """
+    site = get_current_site(request)
+    body = render_to_string(template, {**context, "domain": site.domain})
+    message = EmailMessage("Salary notice for October", body, to=[email])
+    message.content_subtype = "html"
+    return message
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends a salary notice to RECIPIENTS fake staff members through an "
+        "in-process SMTP sink, once the old way (render and send each "
+        "message on its own connection) and once through notify() and the "
+        "outbox worker. Outbox rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipients", type=int, default=10_000)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        # RequestFactory's host, for get_current_site().
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            self.run(options)
+
+    def run(self, options):
+        count = options["recipients"]
+        request = RequestFactory().get("/")
+        recipients = [
+            (
+                f"staff{n}@example.com",
+                {
+                    "staff": SimpleNamespace(
+                        first_name=f"Staff {n}", salary=Decimal("1000.00") + n
+                    )
+                },
+            )
+            for n in range(count)
+        ]
+        shared = {"month": "October 2026"}
+
+        self.stdout.write(f"{'phase':<22}{'seconds':>10}{'msgs/s':>10}{'conns':>8}")
+
+        def report(name, seconds, connections=""):
+            self.stdout.write(
+                f"{name:<22}{seconds:>10.2f}{count / seconds:>10,.0f}"
+                f"{connections:>8}"
+            )
+
+        started = time.perf_counter()
+        for email, context in recipients:
+            legacy_message(request, TEMPLATE, {**shared, **context}, email)
+        report("render, per message", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in render_messages(
+            TEMPLATE, SUBJECT, recipients, {**site_context(request), **shared}
+        ):
+            pass
+        report("render, batch", time.perf_counter() - started)
+
+        with SMTPSink(keep=False) as sink, override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST=sink.host,
+            EMAIL_PORT=sink.port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        ):
+            started = time.perf_counter()
+            for email, context in recipients:
+                legacy_message(request, TEMPLATE, {**shared, **context}, email).send()
+            report("send, per message", time.perf_counter() - started, sink.connections)
+            assert sink.count == count
+
+            with transaction.atomic():
+                sink.count = sink.connections = 0
+                started = time.perf_counter()
+                notify(TEMPLATE, SUBJECT, recipients, context=shared, request=request)
+                report("queue (notify)", time.perf_counter() - started)
+
+                started = time.perf_counter()
+                while batch := outbox.claim_batch(options["batch_size"]):
+                    outbox.deliver(batch)
+                report(
+                    "send, outbox worker",
+                    time.perf_counter() - started,
+                    sink.connections,
+                )
+                assert sink.count == count
+                transaction.set_rollback(True)
@@ -0,0 +1,58 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.notifications import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends queued emails in batches, one SMTP connection per batch, "
+        "retrying failures with backoff. Runs until stopped; use --once to "
+        "send what is due and exit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Exit when nothing is due."
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between checks when nothing is due.",
+        )
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=settings.OUTBOX_STALE_SECONDS)
+        total_sent = total_failed = 0
+        try:
+            while True:
+                close_old_connections()
+                requeued = outbox.requeue_stale(stale_after)
+                if requeued:
+                    self.stderr.write(f"Requeued {requeued} stalled email(s).")
+
+                batch = outbox.claim_batch(options["batch_size"])
+                if not batch:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+
+                sent, failed = outbox.deliver(batch)
+                total_sent += sent
+                total_failed += failed
+                if options["verbosity"] > 1 or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}.")
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {total_sent} email(s); {total_failed} attempt(s) failed."
+            )
+        )
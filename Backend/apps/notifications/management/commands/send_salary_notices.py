@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateformat import format as format_date
+
+from apps.core.models import Staff
+from apps.notifications.notify import notify
+
+# Staff.email's default, for staff added without an address.
+NO_EMAIL = "noemail@domain.com"
+
+
+class Command(BaseCommand):
+    help = (
+        "Queues a salary notice for every staff member with an email "
+        "address. Run send_outbox to deliver them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", help="Shown in the notice, e.g. 'October 2026'.")
+
+    def handle(self, *args, **options):
+        month = options["month"] or format_date(timezone.localdate(), "F Y")
+        staff = Staff.objects.exclude(email=NO_EMAIL).only(
+            "first_name", "last_name", "email", "salary"
+        )
+        queued = notify(
+            "notifications/salary_notice.html",
+            "Salary notice for {{ month }}",
+            ((member.email, {"staff": member}) for member in staff.iterator()),
+            context={"month": month},
+        )
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} salary notice(s)."))
@@ -0,0 +1,101 @@
+"""
+Templated emails to many recipients at once.
+
+``notify`` renders one template per recipient and queues the results in
+the outbox:
+
+- The template and the subject are looked up and compiled once per call.
+  Django's cached loader keeps the compiled template across calls.
+- The site (domain and protocol) is resolved once and shared by every
+  recipient, through ``site_context``.
+- The rows are inserted with ``bulk_create``.
+
+``send_outbox`` then sends them, a batch per SMTP connection::
+
+    notify(
+        "notifications/salary_notice.html",
+        "Salary for {{ month }}",
+        [(staff.email, {"staff": staff}) for staff in staff_members],
+        context={"month": "October 2026"},
+    )
+"""
+
+from django.conf import settings
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.mail import EmailMessage
+from django.template import engines
+from django.template.loader import get_template
+from django.utils import timezone
+
+from . import outbox
+
+
+def site_context(request=None):
+    """
+    ``domain``, ``protocol`` and ``current_year`` for links and footers,
+    from the request when there is one and from ``SITE_DOMAIN`` and
+    ``SITE_PROTOCOL`` otherwise (management commands, workers).
+    """
+    if request is not None:
+        domain = get_current_site(request).domain
+        protocol = "https" if request.is_secure() else "http"
+    else:
+        domain, protocol = settings.SITE_DOMAIN, settings.SITE_PROTOCOL
+    return {
+        "domain": domain,
+        "protocol": protocol,
+        "current_year": timezone.localdate().year,
+    }
+
+
+def render_messages(
+    template_name, subject, recipients, context=None, from_email=None, html=True
+):
+    """
+    Yields one ``EmailMessage`` per ``(email, context)`` in ``recipients``.
+    ``subject`` is a template string rendered with the same context as the
+    body, which is ``context`` updated with the recipient's own.
+    """
+    body_template = get_template(template_name)
+    # Subjects are plain text, so "&" must not become "&amp;".
+    subject_template = engines["django"].from_string(
+        "{% autoescape off %}" + subject + "{% endautoescape %}"
+    )
+    base = dict(context or {})
+    for email, extra in recipients:
+        values = {**base, **extra}
+        message = EmailMessage(
+            # Subjects can't contain newlines.
+            " ".join(subject_template.render(values).split()),
+            body_template.render(values),
+            from_email,
+            [email],
+        )
+        if html:
+            message.content_subtype = "html"
+        yield message
+
+
+def notify(
+    template_name,
+    subject,
+    recipients,
+    context=None,
+    request=None,
+    from_email=None,
+    html=True,
+):
+    """
+    Queues ``template_name`` for every recipient and returns how many were
+    queued. ``context`` is shared by all of them, on top of
+    ``site_context(request)``.
+    """
+    messages = render_messages(
+        template_name,
+        subject,
+        recipients,
+        context={**site_context(request), **(context or {})},
+        from_email=from_email,
+        html=html,
+    )
+    return outbox.queue_messages(messages)
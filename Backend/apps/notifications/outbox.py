@@ -0,0 +1,182 @@
+"""
+Durable outbound email.
+
+Code that used to call ``EmailMessage.send()`` passes the message to
+``queue_message`` instead, which only inserts an ``OutboundEmail`` row.
+The row commits or rolls back with the caller's transaction, so a signup
+that fails sends nothing, and a slow or unreachable SMTP server never
+holds up a request or its database lock.
+
+``send_outbox`` delivers the rows:
+
+- ``claim_batch`` takes up to ``OUTBOX_BATCH_SIZE`` due rows in one
+  UPDATE, tagged with a fresh claim id, so parallel workers never send
+  the same email.
+- ``deliver`` sends them over one SMTP connection.
+- A failed email is retried after ``OUTBOX_RETRY_BASE_SECONDS``, doubling
+  each time up to ``OUTBOX_RETRY_MAX_SECONDS``. After
+  ``OUTBOX_MAX_ATTEMPTS`` it is marked failed.
+- Rows left "sending" by a worker that died are put back by
+  ``requeue_stale``.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def to_row(message):
+    return OutboundEmail(
+        subject=message.subject,
+        body=message.body,
+        content_subtype=message.content_subtype,
+        from_email=message.from_email or "",
+        to=list(message.to),
+    )
+
+
+def queue_message(message):
+    """
+    Queues an ``EmailMessage`` for delivery and returns the
+    ``OutboundEmail`` row. Attachments and extra headers are not kept.
+    """
+    row = to_row(message)
+    row.save()
+    return row
+
+
+def queue_messages(messages, batch_size=1000):
+    """
+    Queues an iterable of ``EmailMessage`` with one INSERT per
+    ``batch_size`` messages and returns how many were queued.
+    """
+    queued = 0
+    for batch in batched(map(to_row, messages), batch_size):
+        OutboundEmail.objects.bulk_create(batch)
+        queued += len(batch)
+    return queued
+
+
+def queue(subject, body, to, from_email=None, html=False):
+    if isinstance(to, str):
+        to = [to]
+    message = EmailMessage(subject, body, from_email, to)
+    if html:
+        message.content_subtype = "html"
+    return queue_message(message)
+
+
+def retry_delay(attempts):
+    delay = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.OUTBOX_RETRY_MAX_SECONDS))
+
+
+def claim_batch(limit=None):
+    """
+    Marks up to ``limit`` due emails as sending and returns them.
+    """
+    limit = limit or settings.OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    due = list(
+        OutboundEmail.objects.filter(
+            status=OutboundEmail.PENDING, next_attempt_at__lte=now
+        )
+        .order_by("next_attempt_at", "id")
+        .values_list("pk", flat=True)[:limit]
+    )
+    if not due:
+        return []
+    claim = uuid.uuid4()
+    # Rows another worker took between the SELECT and here are no longer
+    # pending, so this UPDATE skips them.
+    OutboundEmail.objects.filter(pk__in=due, status=OutboundEmail.PENDING).update(
+        status=OutboundEmail.SENDING, claim=claim, claimed_at=now
+    )
+    return list(OutboundEmail.objects.filter(claim=claim).order_by("id"))
+
+
+def requeue_stale(older_than):
+    return OutboundEmail.objects.filter(
+        status=OutboundEmail.SENDING, claimed_at__lt=timezone.now() - older_than
+    ).update(status=OutboundEmail.PENDING, claim=None)
+
+
+def to_message(email, connection=None):
+    message = EmailMessage(
+        email.subject,
+        email.body,
+        email.from_email or None,
+        email.to,
+        connection=connection,
+    )
+    message.content_subtype = email.content_subtype
+    return message
+
+
+def deliver(emails, connection=None):
+    """
+    Sends ``emails`` over one SMTP connection and records the outcome of
+    each. Returns ``(sent, failed)`` counts.
+    """
+    connection = connection or get_connection()
+    sent, failures = [], {}
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning("Could not connect to the mail server: %s", e)
+        failures = {email.pk: e for email in emails}
+    else:
+        try:
+            for email in emails:
+                try:
+                    # One message per call, so a rejected recipient fails
+                    # only its own email.
+                    connection.send_messages([to_message(email, connection)])
+                except Exception as e:
+                    failures[email.pk] = e
+                else:
+                    sent.append(email.pk)
+        finally:
+            connection.close()
+
+    now = timezone.now()
+    OutboundEmail.objects.filter(pk__in=sent).update(
+        status=OutboundEmail.SENT, sent_at=now, claim=None, last_error=""
+    )
+    for email in emails:
+        if email.pk not in failures:
+            continue
+        email.attempts += 1
+        email.last_error = repr(failures[email.pk])[:1000]
+        email.claim = None
+        if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            email.status = OutboundEmail.FAILED
+            logger.error("Giving up on email %s: %s", email.pk, email.last_error)
+        else:
+            email.status = OutboundEmail.PENDING
+            email.next_attempt_at = now + retry_delay(email.attempts)
+        email.save(
+            update_fields=[
+                "attempts",
+                "last_error",
+                "claim",
+                "status",
+                "next_attempt_at",
+            ]
+        )
+    return len(sent), len(failures)
@@ -0,0 +1,88 @@
+"""
+A minimal SMTP server that accepts every message and keeps it in memory,
+for tests and for the mail benchmarks. It speaks just enough SMTP for
+``smtplib`` (and so Django's SMTP backend): no TLS, no AUTH.
+
+    with SMTPSink() as sink:
+        ... EMAIL_HOST="127.0.0.1", EMAIL_PORT=sink.port ...
+        sink.messages  # [(sender, recipients, data), ...]
+
+``reject`` makes the server answer DATA with a temporary failure for
+every recipient that matches it, to exercise retries.
+"""
+
+import socketserver
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        with sink._lock:
+            sink.connections += 1
+        sender, recipients = None, []
+        self.reply("220 sink ready")
+        while line := self.rfile.readline():
+            command = line.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 sink")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip("<> "), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip("<> "))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+                    data.append(chunk)
+                if sink.reject and any(sink.reject in r for r in recipients):
+                    self.reply("451 Try again later")
+                else:
+                    sink.received(sender, recipients, b"".join(data))
+                    self.reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    def __init__(self, host="127.0.0.1", port=0, reject=None, keep=True):
+        self.reject = reject
+        self.keep = keep
+        self.messages = []
+        self.count = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+
+    def received(self, sender, recipients, data):
+        with self._lock:
+            self.count += 1
+            if self.keep:
+                self.messages.append((sender, recipients, data))
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
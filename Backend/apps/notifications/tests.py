@@ -0,0 +1,197 @@
+import socket
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import Staff
+
+from . import outbox
+from .models import OutboundEmail
+from .notify import notify
+from .smtp_sink import SMTPSink
+
+
+def smtp_settings(port):
+    return override_settings(
+        EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+        EMAIL_HOST="127.0.0.1",
+        EMAIL_PORT=port,
+        EMAIL_USE_TLS=False,
+        EMAIL_HOST_USER="",
+        EMAIL_HOST_PASSWORD="",
+        EMAIL_TIMEOUT=5,
+    )
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class OutboxQueueTests(TransactionTestCase):
+    def test_rows_follow_the_callers_transaction(self):
+        with transaction.atomic():
+            outbox.queue("Hi", "Body", "kept@example.com")
+        try:
+            with transaction.atomic():
+                outbox.queue("Hi", "Body", "dropped@example.com")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(
+            list(OutboundEmail.objects.values_list("to", flat=True)),
+            [["kept@example.com"]],
+        )
+
+    def test_signup_queues_the_activation_email(self):
+        response = APIClient().post(
+            "/users/create/",
+            {
+                "first_name": "New",
+                "last_name": "User",
+                "email": "new@example.com",
+                "role": 1,
+                "password": "s3cret-pass",
+                "password_confirm": "s3cret-pass",
+            },
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to, ["new@example.com"])
+        self.assertEqual(email.content_subtype, "html")
+        self.assertIn("/users/activate/", email.body)
+
+
+class OutboxDeliveryTests(TestCase):
+    def setUp(self):
+        for n in range(3):
+            outbox.queue(f"Notice {n}", "Body", f"user{n}@example.com")
+
+    def send(self):
+        out = StringIO()
+        call_command("send_outbox", "--once", stdout=out)
+        return out.getvalue()
+
+    def test_batch_goes_over_one_connection(self):
+        with SMTPSink() as sink, smtp_settings(sink.port):
+            out = self.send()
+
+        self.assertIn("Sent 3 email(s)", out)
+        self.assertEqual(sink.connections, 1)
+        self.assertEqual(
+            sorted(recipients[0] for _, recipients, _ in sink.messages),
+            ["user0@example.com", "user1@example.com", "user2@example.com"],
+        )
+        self.assertFalse(OutboundEmail.objects.exclude(status="sent").exists())
+
+    def test_failures_are_retried_with_backoff(self):
+        with SMTPSink(reject="user1") as sink, smtp_settings(sink.port):
+            self.send()
+
+        self.assertEqual(len(sink.messages), 2)
+        failed = OutboundEmail.objects.get(to=["user1@example.com"])
+        self.assertEqual(failed.status, OutboundEmail.PENDING)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn("451", failed.last_error)
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+        self.assertEqual(outbox.retry_delay(3), timedelta(seconds=120))
+
+        with override_settings(OUTBOX_MAX_ATTEMPTS=2):
+            OutboundEmail.objects.filter(pk=failed.pk).update(
+                next_attempt_at=timezone.now()
+            )
+            with SMTPSink(reject="user1") as sink, smtp_settings(
+                sink.port
+            ), self.assertLogs(outbox.logger, "ERROR"):
+                self.send()
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, OutboundEmail.FAILED)
+
+    def test_unreachable_server_keeps_everything_queued(self):
+        with smtp_settings(free_port()), self.assertLogs(outbox.logger, "WARNING"):
+            self.send()
+
+        self.assertEqual(
+            set(OutboundEmail.objects.values_list("status", "attempts")),
+            {(OutboundEmail.PENDING, 1)},
+        )
+
+    def test_claims_do_not_overlap(self):
+        first = outbox.claim_batch(2)
+        second = outbox.claim_batch(2)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(outbox.claim_batch(), [])
+
+        OutboundEmail.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(outbox.requeue_stale(timedelta(minutes=10)), 3)
+        self.assertEqual(len(outbox.claim_batch()), 3)
+
+
+class NotifyTests(TestCase):
+    def test_each_recipient_gets_its_own_rendering(self):
+        recipients = [
+            (f"user{n}@example.com", {"staff": {"first_name": f"User {n}"}})
+            for n in range(5)
+        ]
+        with self.assertNumQueries(1):
+            queued = notify(
+                "notifications/salary_notice.html",
+                "Hello {{ staff.first_name }} &\n{{ month }}",
+                recipients,
+                context={"month": "May"},
+            )
+
+        self.assertEqual(queued, 5)
+        email = OutboundEmail.objects.get(to=["user3@example.com"])
+        self.assertEqual(email.subject, "Hello User 3 & May")
+        self.assertEqual(email.content_subtype, "html")
+        self.assertIn("Hello, User 3!", email.body)
+        self.assertIn(f"&copy; {timezone.localdate().year}", email.body)
+
+    @override_settings(ALLOWED_HOSTS=["clinic.example.com"])
+    def test_site_comes_from_the_request_or_settings(self):
+        request = RequestFactory().get("/", HTTP_HOST="clinic.example.com")
+        for kwargs, link in [
+            ({"request": request}, "//clinic.example.com/users/activate/u/t/"),
+            ({}, "//opd.example.com/users/activate/u/t/"),
+        ]:
+            with override_settings(
+                SITE_DOMAIN="opd.example.com", SITE_PROTOCOL="https"
+            ):
+                notify(
+                    "activation_email.html",
+                    "Activate",
+                    [("a@example.com", {"uid": "u", "token": "t"})],
+                    **kwargs,
+                )
+            self.assertIn(link, OutboundEmail.objects.latest("id").body)
+
+    def test_salary_notices_skip_staff_without_email(self):
+        Staff.objects.create(first_name="Sara", email="sara@example.com", salary=900)
+        Staff.objects.create(first_name="Nobody", salary=900)
+        out = StringIO()
+
+        call_command("send_salary_notices", "--month", "May 2026", stdout=out)
+
+        self.assertIn("Queued 1 salary notice(s)", out.getvalue())
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to, ["sara@example.com"])
+        self.assertEqual(email.subject, "Salary notice for May 2026")
+        self.assertIn("<strong>900.00</strong>", email.body)
@@ -1,3 +1,18 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DailyLedger, ReportJob
+
+
+@admin.register(DailyLedger)
+class DailyLedgerAdmin(admin.ModelAdmin):
+    list_display = ("day", "source", "total", "entries", "updated_at")
+    list_filter = ("source",)
+    date_hierarchy = "day"
+    ordering = ("-day", "source")
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "start_date", "end_date", "bucket", "status", "created_at")
+    list_filter = ("status", "bucket")
+    readonly_fields = ("result", "error", "started_at", "finished_at")
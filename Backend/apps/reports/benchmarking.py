@@ -0,0 +1,198 @@
+"""
+Helpers shared by the ``benchmark_*`` management commands.
+
+Seeding goes through ``bulk_create`` in fixed-size batches so a million rows
+per table fit in memory, and spreads timestamps over a number of days so
+date-windowed queries have something realistic to filter.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.core import models as core_model
+
+BATCH_SIZE = 10_000
+
+# model -> timestamp column stamped with ``auto_now_add``
+TIMESTAMP_FIELDS = {
+    core_model.Patient: "created_at",
+    core_model.Pharmaceutical: "created_at",
+    core_model.LabTest: "date",
+    core_model.DailyExpense: "date",
+    core_model.DailyExpensePharmacy: "date",
+    core_model.TakenPrice: "date",
+}
+
+
+@contextmanager
+def timestamps_unlocked():
+    """
+    Temporarily lifts ``auto_now_add`` so seeded rows keep the timestamps we
+    give them instead of all being stamped with ``now()``.
+    """
+    fields = [model._meta.get_field(name) for model, name in TIMESTAMP_FIELDS.items()]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def batched(model, rows, build):
+    batch = []
+    for i in range(rows):
+        batch.append(build(i))
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def seed(rows, days=365, stdout=None):
+    """
+    Inserts ``rows`` rows into every table the reports read, with timestamps
+    spread uniformly over the last ``days`` days.
+    """
+    rng = random.Random(42)
+    now = timezone.now()
+
+    def stamp():
+        return now - timedelta(seconds=rng.randrange(days * 86400))
+
+    def money():
+        return Decimal(rng.randrange(100, 100_000)) / 100
+
+    def log(model):
+        if stdout is not None:
+            stdout.write(f"  seeded {rows:,} {model._meta.verbose_name_plural}")
+
+    with timestamps_unlocked():
+        category = core_model.CategoryType.objects.create(name="Benchmark")
+        stocks = core_model.Stock.objects.bulk_create(
+            core_model.Stock(
+                name=f"Drug {i}",
+                price=10,
+                percentage=10,
+                total_price=11,
+                amount=rows,
+            )
+            for i in range(100)
+        )
+        core_model.Staff.objects.bulk_create(
+            core_model.Staff(
+                first_name=f"Staff {i}",
+                email=f"staff{i}@benchmark.local",
+                position=category,
+                salary=money(),
+            )
+            for i in range(50)
+        )
+
+        first_patient = core_model.Patient.objects.count()
+        batched(
+            core_model.Patient,
+            rows,
+            lambda i: core_model.Patient(
+                name=f"Patient {i}",
+                name_normalized=f"patient {i}",
+                patient_type="OPD",
+                category=category,
+                created_at=stamp(),
+            ),
+        )
+        log(core_model.Patient)
+        patient_ids = list(
+            core_model.Patient.objects.order_by("pk").values_list("pk", flat=True)[
+                first_patient:
+            ]
+        )
+
+        batched(
+            core_model.Pharmaceutical,
+            rows,
+            lambda i: core_model.Pharmaceutical(
+                patient_name_id=patient_ids[i],
+                copy="",
+                price=money(),
+                created_at=stamp(),
+            ),
+        )
+        log(core_model.Pharmaceutical)
+        pharmaceutical_ids = list(
+            core_model.Pharmaceutical.objects.order_by("-pk").values_list(
+                "pk", flat=True
+            )[:rows]
+        )
+
+        batched(
+            core_model.PharmaceuticalDrug,
+            rows,
+            lambda i: core_model.PharmaceuticalDrug(
+                pharmaceutical_id=pharmaceutical_ids[i],
+                drug=stocks[i % len(stocks)],
+                amount_used=rng.randrange(1, 5),
+            ),
+        )
+        log(core_model.PharmaceuticalDrug)
+
+        batched(
+            core_model.LabTest,
+            rows,
+            lambda i: core_model.LabTest(
+                patient_id=patient_ids[i], price=money(), refer_to="", date=stamp()
+            ),
+        )
+        log(core_model.LabTest)
+
+        batched(
+            core_model.DailyExpense,
+            rows,
+            lambda i: core_model.DailyExpense(
+                name="Expense", salary=0, who="", totla_price=money(), date=stamp()
+            ),
+        )
+        log(core_model.DailyExpense)
+
+        batched(
+            core_model.DailyExpensePharmacy,
+            rows,
+            lambda i: core_model.DailyExpensePharmacy(
+                name="Expense", amount=money(), date=stamp()
+            ),
+        )
+        log(core_model.DailyExpensePharmacy)
+
+        batched(
+            core_model.TakenPrice,
+            rows,
+            lambda i: core_model.TakenPrice(
+                name="Taken", description="", amount=money(), date=stamp()
+            ),
+        )
+        log(core_model.TakenPrice)
+
+
+def measure(func, repeat=5):
+    """
+    Runs ``func`` ``repeat`` times and returns ``(queries, best_ms)``.
+    """
+    best = None
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - started) * 1000
+        queries = len(captured.captured_queries)
+        best = elapsed if best is None else min(best, elapsed)
+    return queries, best
@@ -0,0 +1,135 @@
+"""
+Cache for computed reports.
+
+Entries are keyed by report kind and date window, prefixed with a
+*generation* number. Any committed write to a model a report reads bumps
+the generation (see ``apps.reports.signals``), which orphans every cached
+report at once without having to know which windows it touched; orphaned
+entries simply expire.
+
+The generation is the ``ReportGeneration`` row, not a cache key: every
+worker reads the same value whatever the cache backend, and it never goes
+back, so an old entry can't become current again after a restart or an
+eviction. It is bumped after the writing transaction commits, because a
+bump inside the transaction would be undone by a rollback. Until then that
+transaction's own reports skip the cache, since they read rows nobody else
+can see yet.
+
+The hit/miss counters live in the configured cache, so they are shared
+between workers when a file-based or other shared backend is used. Backends
+without an atomic ``incr`` (local-memory and file-based both emulate it with
+get+set) can drop an increment under heavy contention.
+"""
+
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.db.models import F
+
+from .models import ReportGeneration
+
+HITS_KEY = "reports:hits"
+MISSES_KEY = "reports:misses"
+
+# Per thread, the database aliases with an open transaction that wrote
+# report data and hasn't committed yet.
+_uncommitted = threading.local()
+
+
+def get_cache():
+    return caches[settings.REPORTS_CACHE_ALIAS]
+
+
+def _incr(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # First use, or the key was evicted.
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def generation():
+    return (
+        ReportGeneration.objects.filter(pk=1).values_list("value", flat=True).first()
+        or 0
+    )
+
+
+def _uncommitted_aliases():
+    if not hasattr(_uncommitted, "aliases"):
+        _uncommitted.aliases = set()
+    return _uncommitted.aliases
+
+
+def _bump(alias=None):
+    _uncommitted_aliases().discard(alias)
+    if not ReportGeneration.objects.filter(pk=1).update(value=F("value") + 1):
+        _, created = ReportGeneration.objects.get_or_create(pk=1, defaults={"value": 1})
+        if not created:
+            ReportGeneration.objects.filter(pk=1).update(value=F("value") + 1)
+
+
+def invalidate(using=None):
+    """
+    Drops every cached report, once the current transaction on ``using``
+    commits (at once outside a transaction).
+    """
+    connection = transaction.get_connection(using)
+    if connection.in_atomic_block:
+        _uncommitted_aliases().add(connection.alias)
+        transaction.on_commit(partial(_bump, connection.alias), using=using)
+    else:
+        _bump()
+
+
+def _has_uncommitted_writes():
+    aliases = _uncommitted_aliases()
+    # An alias is left behind when its transaction rolled back.
+    aliases.difference_update(
+        [alias for alias in aliases if not connections[alias].in_atomic_block]
+    )
+    return bool(aliases)
+
+
+def cached_report(kind, window, compute):
+    """
+    Returns the cached result for ``(kind, window)``, calling ``compute`` and
+    storing its result on a miss.
+    """
+    if _has_uncommitted_writes():
+        return compute()
+
+    cache = get_cache()
+    key = "reports:{}:{}:{}".format(
+        generation(), kind, ":".join(str(part) for part in window)
+    )
+
+    result = cache.get(key)
+    if result is not None:
+        _incr(HITS_KEY)
+        return result
+
+    _incr(MISSES_KEY)
+    result = compute()
+    cache.set(key, result, timeout=settings.REPORTS_CACHE_TIMEOUT)
+    return result
+
+
+def stats():
+    cache = get_cache()
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+        "generation": generation(),
+    }
@@ -0,0 +1,221 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import CharField, Count, Sum, Value
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from apps.core import models as core_model
+
+from .helper import iter_buckets
+from .models import DailyLedger
+
+
+# -------------------------------------------------------------------
+# TIME WINDOWS
+# -------------------------------------------------------------------
+def day_start(day):
+    """
+    Returns the aware datetime at which ``day`` begins in the current timezone.
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_window(start_date, end_date=None):
+    """
+    Converts an inclusive ``start_date``..``end_date`` pair into a half-open
+    ``[start, end)`` datetime range.
+
+    Filtering on ``created_at >= start AND created_at < end`` lets the
+    database use an index on the raw column, whereas ``created_at__date``
+    wraps every row in a date cast and forces a full scan.
+    """
+    if end_date is None:
+        end_date = timezone.localdate()
+    return day_start(start_date), day_start(end_date + timedelta(days=1))
+
+
+# -------------------------------------------------------------------
+# AGGREGATES
+# -------------------------------------------------------------------
+def _figure(queryset, name, aggregate):
+    """
+    A single-row ``SELECT '<name>', <aggregate>`` over ``queryset``.
+
+    Grouping on a constant adds no GROUP BY clause, so every figure yields
+    exactly one row and the figures can be glued together with UNION ALL.
+    """
+    return (
+        queryset.annotate(source=Value(name, output_field=CharField()))
+        .values("source")
+        .annotate(total=aggregate)
+        .values_list("source", "total")
+    )
+
+
+def collect_figures(start, end):
+    """
+    Returns every scalar report figure for ``[start, end)`` as a dict,
+    fetched in one UNION ALL round trip.
+    """
+    figures = [
+        _figure(
+            core_model.Pharmaceutical.objects.filter(
+                created_at__gte=start, created_at__lt=end
+            ),
+            "pharmacy_sales",
+            Sum("price"),
+        ),
+        _figure(
+            core_model.LabTest.objects.filter(date__gte=start, date__lt=end),
+            "lab_tests",
+            Sum("price"),
+        ),
+        _figure(
+            core_model.TakenPrice.objects.filter(date__gte=start, date__lt=end),
+            "taken_price",
+            Sum("amount"),
+        ),
+        _figure(
+            core_model.DailyExpense.objects.filter(date__gte=start, date__lt=end),
+            "daily_expense",
+            Sum("totla_price"),
+        ),
+        _figure(
+            core_model.DailyExpensePharmacy.objects.filter(
+                date__gte=start, date__lt=end
+            ),
+            "pharmacy_expense",
+            Sum("amount"),
+        ),
+        _figure(core_model.Staff.objects.all(), "staff_salary", Sum("salary")),
+        _figure(
+            core_model.Patient.objects.filter(
+                created_at__gte=start, created_at__lt=end
+            ),
+            "patients_registered",
+            Count("id"),
+        ),
+    ]
+    first, *rest = figures
+    return {source: total or 0 for source, total in first.union(*rest, all=True)}
+
+
+def collect_ledger_figures(start_date, end_date):
+    """
+    Same figures as ``collect_figures`` read from the ``DailyLedger`` rollup,
+    so the cost grows with the number of days rather than transactions.
+    """
+    ledger = (
+        DailyLedger.objects.filter(day__gte=start_date, day__lte=end_date)
+        .values("source")
+        .annotate(total=Sum("total"))
+        .values_list("source", "total")
+        .order_by()
+    )
+    staff = _figure(core_model.Staff.objects.all(), "staff_salary", Sum("salary"))
+    return {source: total or 0 for source, total in ledger.union(staff, all=True)}
+
+
+def collect_stock_usage(start, end):
+    """
+    Returns the per-drug amount dispensed in ``[start, end)``.
+    """
+    return list(
+        core_model.PharmaceuticalDrug.objects.filter(
+            pharmaceutical__created_at__gte=start,
+            pharmaceutical__created_at__lt=end,
+        )
+        .values("drug__name")
+        .annotate(total_used=Sum("amount_used"))
+    )
+
+
+# -------------------------------------------------------------------
+# REPORT
+# -------------------------------------------------------------------
+def build_report(figures, stock_usage):
+    """
+    Shapes raw figures into the report payload returned by the API.
+    """
+    money = {
+        key: Decimal(figures.get(key) or 0)
+        for key in (
+            "pharmacy_sales",
+            "lab_tests",
+            "taken_price",
+            "daily_expense",
+            "pharmacy_expense",
+            "staff_salary",
+        )
+    }
+
+    total_income = money["pharmacy_sales"] + money["lab_tests"] + money["taken_price"]
+    total_expenses = (
+        money["daily_expense"] + money["pharmacy_expense"] + money["staff_salary"]
+    )
+
+    return {
+        "patients_registered": int(figures.get("patients_registered") or 0),
+        "income": {
+            "pharmacy_sales": money["pharmacy_sales"],
+            "lab_tests": money["lab_tests"],
+            "taken_price": money["taken_price"],
+            "total_income": total_income,
+        },
+        "expenses": {
+            "daily_expense": money["daily_expense"],
+            "pharmacy_expense": money["pharmacy_expense"],
+            "staff_salary": money["staff_salary"],
+            "total_expenses": total_expenses,
+        },
+        "net_profit": total_income - total_expenses,
+        "stock_usage": stock_usage,
+    }
+
+
+def generate_report(start_date, end_date=None):
+    """
+    Generates a financial & operational report for the days
+    ``start_date``..``end_date`` (inclusive, ``end_date`` defaults to today).
+
+    Runs two queries regardless of data size: one UNION ALL over the daily
+    ledger for the scalar figures and one grouped query for stock usage.
+    """
+    if end_date is None:
+        end_date = timezone.localdate()
+    start, end = day_window(start_date, end_date)
+    return build_report(
+        collect_ledger_figures(start_date, end_date),
+        collect_stock_usage(start, end),
+    )
+
+
+def generate_series(start_date, end_date, bucket):
+    """
+    Returns one point per ``bucket`` (day, week or month) between
+    ``start_date`` and ``end_date``, computed by a single grouped query over
+    the daily ledger. Buckets without activity are filled with zeros.
+
+    Staff salary is not tied to a date, so it is left out of the per-bucket
+    expenses; it is part of the summary from ``generate_report``.
+    """
+    rows = (
+        DailyLedger.objects.filter(day__gte=start_date, day__lte=end_date)
+        .annotate(period=Trunc("day", bucket))
+        .values("period", "source")
+        .annotate(total=Sum("total"))
+        .order_by()
+    )
+
+    figures = {period: {} for period in iter_buckets(start_date, end_date, bucket)}
+    for row in rows:
+        figures.setdefault(row["period"], {})[row["source"]] = row["total"]
+
+    series = []
+    for period in sorted(figures):
+        point = build_report(figures[period], stock_usage=None)
+        point.pop("stock_usage")
+        point["expenses"].pop("staff_salary")
+        series.append({"period": period, **point})
+    return series
@@ -0,0 +1,158 @@
+"""
+Streaming CSV exports.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` and written
+one line at a time into the response, so memory stays flat no matter how many
+rows an export covers.
+"""
+
+import csv
+from collections import namedtuple
+
+from rest_framework import renderers
+
+from apps.core import models as core_model
+
+from .engine import day_window
+from .models import DailyLedger
+
+CHUNK_SIZE = 2000
+
+Dataset = namedtuple("Dataset", ["queryset", "timestamp", "columns"])
+
+# name -> (queryset, timestamp column used for the window, {header: field})
+DATASETS = {
+    "report": Dataset(
+        lambda: DailyLedger.objects.all(),
+        "day",
+        {
+            "day": "day",
+            "source": "source",
+            "total": "total",
+            "entries": "entries",
+        },
+    ),
+    "pharmaceuticals": Dataset(
+        lambda: core_model.Pharmaceutical.objects.all(),
+        "created_at",
+        {
+            "id": "id",
+            "created_at": "created_at",
+            "patient": "patient_name__name",
+            "doctor": "doctor_name__email",
+            "copy": "copy",
+            "price": "price",
+        },
+    ),
+    "pharmaceutical-drugs": Dataset(
+        lambda: core_model.PharmaceuticalDrug.objects.all(),
+        "pharmaceutical__created_at",
+        {
+            "pharmaceutical_id": "pharmaceutical_id",
+            "created_at": "pharmaceutical__created_at",
+            "drug": "drug__name",
+            "amount_used": "amount_used",
+        },
+    ),
+    "lab-tests": Dataset(
+        lambda: core_model.LabTest.objects.all(),
+        "date",
+        {
+            "id": "id",
+            "date": "date",
+            "patient": "patient__name",
+            "test_type": "test_type__name",
+            "refer_to": "refer_to",
+            "price": "price",
+        },
+    ),
+    "daily-expenses": Dataset(
+        lambda: core_model.DailyExpense.objects.all(),
+        "date",
+        {
+            "id": "id",
+            "date": "date",
+            "name": "name",
+            "who": "who",
+            "salary": "salary",
+            "total_price": "totla_price",
+        },
+    ),
+    "pharmacy-expenses": Dataset(
+        lambda: core_model.DailyExpensePharmacy.objects.all(),
+        "date",
+        {"id": "id", "date": "date", "name": "name", "amount": "amount"},
+    ),
+    "taken-prices": Dataset(
+        lambda: core_model.TakenPrice.objects.all(),
+        "date",
+        {
+            "id": "id",
+            "date": "date",
+            "name": "name",
+            "description": "description",
+            "amount": "amount",
+        },
+    ),
+}
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """
+    Lets clients send ``Accept: text/csv``; the body itself is streamed by
+    the view, so only error payloads ever pass through here.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return str(data)
+
+
+class Echo:
+    """
+    A file-like object whose ``write`` hands the line back instead of
+    buffering it, so ``csv.writer`` can feed a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_rows(name, start_date=None, end_date=None, using=None):
+    """
+    Returns an iterator over the rows of dataset ``name``, optionally limited
+    to the inclusive ``start_date``..``end_date`` window, read from database
+    ``using`` (the router's choice by default).
+    """
+    dataset = DATASETS[name]
+    queryset = dataset.queryset()
+    if using is not None:
+        queryset = queryset.using(using)
+
+    if start_date is not None:
+        if dataset.timestamp == "day":
+            queryset = queryset.filter(day__gte=start_date, day__lte=end_date)
+        else:
+            start, end = day_window(start_date, end_date)
+            queryset = queryset.filter(
+                **{f"{dataset.timestamp}__gte": start, f"{dataset.timestamp}__lt": end}
+            )
+
+    return (
+        queryset.order_by("pk")
+        .values_list(*dataset.columns.values())
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def stream_csv(name, start_date=None, end_date=None, using=None):
+    """
+    Yields dataset ``name`` as CSV, one line at a time.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(DATASETS[name].columns.keys())
+    for row in export_rows(name, start_date, end_date, using):
+        yield writer.writerow(row)
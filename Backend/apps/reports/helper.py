@@ -1,8 +1,110 @@
-from datetime import timedelta
+from datetime import date, timedelta
+
 from django.utils import timezone
 
-today = timezone.now().date()
+BUCKETS = ("day", "week", "month")
+
+
+class TooManyBuckets(ValueError):
+    pass
+
+
+def get_date_ranges(today=None):
+    """
+    Returns the fixed daily/weekly/monthly report starts, computed from
+    ``today`` at call time rather than once at import.
+    """
+    if today is None:
+        today = timezone.localdate()
+
+    return {
+        "daily": {
+            "start": today,
+        },
+        "weekly": {
+            "start": today - timedelta(days=7),
+        },
+        "monthly": {
+            "start": today.replace(day=1),
+        },
+    }
+
+
+def parse_window(params, max_buckets=None):
+    """
+    Reads ``start``/``end`` (YYYY-MM-DD, inclusive) and ``bucket`` from query
+    params or a request body. ``end`` defaults to today and ``bucket`` to ``day``. With
+    ``max_buckets``, windows spanning more buckets than that are refused.
+
+    Raises ``ValueError`` with a user-facing message on bad input.
+    """
+    try:
+        start_date = date.fromisoformat(params["start"])
+        end_date = (
+            date.fromisoformat(params["end"])
+            if params.get("end")
+            else timezone.localdate()
+        )
+    except KeyError:
+        raise ValueError("'start' is required when requesting a date range.")
+    except (TypeError, ValueError):
+        # TypeError: a non-string date from a JSON body.
+        raise ValueError("Dates must be in YYYY-MM-DD format.")
+
+    if end_date < start_date:
+        raise ValueError("'end' must not be before 'start'.")
+
+    bucket = params.get("bucket", "day")
+    if bucket not in BUCKETS:
+        raise ValueError("Invalid bucket. Use day, week, or month.")
+
+    if max_buckets is not None and (
+        bucket_count(start_date, end_date, bucket) > max_buckets
+    ):
+        raise TooManyBuckets(
+            f"A range can span at most {max_buckets} {bucket}s. Use a larger bucket."
+        )
+
+    return start_date, end_date, bucket
+
+
+def bucket_start(day, bucket):
+    """
+    Returns the first day of the ``bucket`` containing ``day``; weeks start on
+    Monday to match ``TruncWeek``.
+    """
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_count(start_date, end_date, bucket):
+    """
+    How many buckets ``iter_buckets`` yields, without enumerating them.
+    """
+    if bucket == "month":
+        return (
+            (end_date.year - start_date.year) * 12
+            + end_date.month
+            - start_date.month
+            + 1
+        )
+    days = (bucket_start(end_date, bucket) - bucket_start(start_date, bucket)).days
+    return days // (7 if bucket == "week" else 1) + 1
+
 
-daily_start = today
-weekly_start = today - timedelta(days=7)
-monthly_start = today.replace(day=1)
+def iter_buckets(start_date, end_date, bucket):
+    """
+    Yields the start of every ``bucket`` overlapping ``start_date``..``end_date``.
+    """
+    current = bucket_start(start_date, bucket)
+    while current <= end_date:
+        yield current
+        if bucket == "day":
+            current += timedelta(days=1)
+        elif bucket == "week":
+            current += timedelta(days=7)
+        else:
+            current = (current + timedelta(days=32)).replace(day=1)
@@ -0,0 +1,132 @@
+"""
+Background range reports.
+
+``POST /api/v1/reports/jobs/`` queues a ``ReportJob`` and returns at once;
+the ``run_report_jobs`` command computes it in a separate process and
+stores the result on the row, where ``GET /api/v1/reports/jobs/<id>/``
+picks it up. The database is the queue, so no broker is needed.
+
+A job for a window that is already queued, running or finished at the
+current data generation (the ``ReportGeneration`` row, see
+``apps.reports.cache``) is reused instead of queued again, so repeated
+requests for the same month or year cost one computation. The generation
+only ever grows and is shared by every worker, so a job computed before a
+write is never served after it.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import cache
+from .engine import generate_report, generate_series
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(start_date, end_date, bucket, user=None, refresh=False):
+    """
+    Returns ``(job, created)`` for the window, reusing a live job unless
+    ``refresh`` is set.
+    """
+    generation = cache.generation()
+    if not refresh:
+        job = (
+            ReportJob.objects.filter(
+                start_date=start_date,
+                end_date=end_date,
+                bucket=bucket,
+                generation=generation,
+                status__in=(ReportJob.PENDING, ReportJob.RUNNING, ReportJob.DONE),
+                created_at__gte=timezone.now()
+                - timedelta(seconds=settings.REPORT_JOB_REUSE_SECONDS),
+            )
+            .order_by("-created_at")
+            .first()
+        )
+        if job is not None:
+            return job, False
+
+    job = ReportJob.objects.create(
+        start_date=start_date,
+        end_date=end_date,
+        bucket=bucket,
+        generation=generation,
+        requested_by=user,
+    )
+    return job, True
+
+
+def claim_next():
+    """
+    Marks the oldest pending job as running and returns it, or None when
+    the queue is empty.
+
+    The claim is a conditional UPDATE, so when two workers pick the same
+    row only the one whose UPDATE matched gets it; the other moves on to
+    the next row. That works the same on SQLite and PostgreSQL.
+    """
+    while True:
+        pk = (
+            ReportJob.objects.filter(status=ReportJob.PENDING)
+            .order_by("created_at", "id")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+        claimed = ReportJob.objects.filter(pk=pk, status=ReportJob.PENDING).update(
+            status=ReportJob.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return ReportJob.objects.get(pk=pk)
+
+
+def requeue_stale(older_than):
+    """
+    Puts jobs that have been running longer than ``older_than`` (a
+    timedelta) back in the queue; their worker is assumed to have died.
+    """
+    return ReportJob.objects.filter(
+        status=ReportJob.RUNNING, started_at__lt=timezone.now() - older_than
+    ).update(status=ReportJob.PENDING, started_at=None)
+
+
+def compute(job):
+    """
+    The same payload the synchronous range report returns. Results go
+    through the report cache too, so a later ``GET /api/v1/reports/`` for
+    the window is a hit when the cache is shared.
+    """
+    window = (job.start_date, job.end_date)
+    return {
+        "data": cache.cached_report(
+            "summary", window, lambda: generate_report(*window)
+        ),
+        "series": cache.cached_report(
+            f"series-{job.bucket}",
+            window,
+            lambda: generate_series(*window, job.bucket),
+        ),
+    }
+
+
+def run(job):
+    try:
+        result = compute(job)
+    except Exception:
+        logger.exception("Report job %s failed", job.pk)
+        job.status = ReportJob.FAILED
+        job.error = traceback.format_exc(limit=5)
+        job.result = None
+    else:
+        job.status = ReportJob.DONE
+        job.result = result
+        job.error = ""
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "result", "error", "finished_at"])
+    return job
@@ -0,0 +1,136 @@
+import logging
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.core import models as core_model
+
+from . import cache
+from .engine import day_start
+from .models import DailyLedger
+
+logger = logging.getLogger(__name__)
+
+LedgerSource = namedtuple("LedgerSource", ["source", "timestamp", "amount"])
+
+# model -> where its rows land in the ledger. ``amount`` is None for sources
+# that are counted rather than summed.
+LEDGER_SOURCES = {
+    core_model.Pharmaceutical: LedgerSource(
+        DailyLedger.PHARMACY_SALES, "created_at", "price"
+    ),
+    core_model.LabTest: LedgerSource(DailyLedger.LAB_TESTS, "date", "price"),
+    core_model.TakenPrice: LedgerSource(DailyLedger.TAKEN_PRICE, "date", "amount"),
+    core_model.DailyExpense: LedgerSource(
+        DailyLedger.DAILY_EXPENSE, "date", "totla_price"
+    ),
+    core_model.DailyExpensePharmacy: LedgerSource(
+        DailyLedger.PHARMACY_EXPENSE, "date", "amount"
+    ),
+    core_model.Patient: LedgerSource(
+        DailyLedger.PATIENTS_REGISTERED, "created_at", None
+    ),
+}
+
+
+def entry_for(instance):
+    """
+    Returns the ``(day, amount)`` pair ``instance`` contributes to the ledger.
+    """
+    spec = LEDGER_SOURCES[type(instance)]
+    day = timezone.localdate(getattr(instance, spec.timestamp))
+    amount = getattr(instance, spec.amount) if spec.amount else 1
+    return day, Decimal(amount or 0)
+
+
+def post(source, day, amount, entries):
+    """
+    Adds ``amount`` and ``entries`` to the ledger row for ``(day, source)``
+    with a single ``UPDATE ... SET total = total + %s``, creating the row the
+    first time the day is seen.
+    """
+    if not amount and not entries:
+        return
+
+    def apply():
+        return DailyLedger.objects.filter(day=day, source=source).update(
+            total=F("total") + amount,
+            entries=F("entries") + entries,
+            updated_at=timezone.now(),
+        )
+
+    if apply():
+        return
+    try:
+        with transaction.atomic():
+            DailyLedger.objects.create(
+                day=day, source=source, total=amount, entries=entries
+            )
+    except IntegrityError:
+        # Another writer created the row between our UPDATE and INSERT.
+        if apply():
+            return
+        # No row and none could be created: a negative delta on a day the
+        # ledger has never seen, i.e. the ledger is missing data. Don't fail
+        # the caller's write over it, but don't drop it silently either.
+        logger.error(
+            "Could not post %s (%s entries) to the %s ledger for %s; "
+            "run backfill_ledger to rebuild it.",
+            amount,
+            entries,
+            source,
+            day,
+        )
+
+
+def rebuild(start_date=None, end_date=None):
+    """
+    Recomputes the ledger from the raw transactions, for every day or for the
+    inclusive ``start_date``..``end_date`` window, and returns the number of
+    ledger rows written.
+    """
+    start = day_start(start_date) if start_date is not None else None
+    end = day_start(end_date + timedelta(days=1)) if end_date is not None else None
+
+    rows = []
+    with transaction.atomic():
+        ledger = DailyLedger.objects.all()
+        if start_date is not None:
+            ledger = ledger.filter(day__gte=start_date)
+        if end_date is not None:
+            ledger = ledger.filter(day__lte=end_date)
+        ledger.delete()
+
+        for model, spec in LEDGER_SOURCES.items():
+            queryset = model.objects.all()
+            if start is not None:
+                queryset = queryset.filter(**{f"{spec.timestamp}__gte": start})
+            if end is not None:
+                queryset = queryset.filter(**{f"{spec.timestamp}__lt": end})
+            totals = (
+                queryset.annotate(ledger_day=TruncDate(spec.timestamp))
+                .values("ledger_day")
+                .annotate(
+                    total=Sum(spec.amount) if spec.amount else Count("pk"),
+                    entries=Count("pk"),
+                )
+                .order_by()
+            )
+            rows.extend(
+                DailyLedger(
+                    day=row["ledger_day"],
+                    source=spec.source,
+                    total=row["total"] or 0,
+                    entries=row["entries"],
+                )
+                for row in totals
+            )
+
+        DailyLedger.objects.bulk_create(rows, batch_size=1000)
+        cache.invalidate()
+    return len(rows)
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from apps.reports import ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the DailyLedger rollup from the raw transactions. Migration "
+        "reports 0004 fills it once; run this after any bulk import that "
+        "bypasses model signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start", type=date.fromisoformat, help="First day (YYYY-MM-DD)."
+        )
+        parser.add_argument(
+            "--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD)."
+        )
+
+    def handle(self, *args, **options):
+        written = ledger.rebuild(options["start"], options["end"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} ledger rows."))
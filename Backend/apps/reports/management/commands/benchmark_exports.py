@@ -0,0 +1,69 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.reports import benchmarking, exports, ledger
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes (Linux).
+    """
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds ROWS rows per table inside a transaction, streams every export "
+        "dataset and fails if resident memory grows by more than --max-growth "
+        "MB while streaming. Rolls back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--max-growth", type=int, default=32)
+        parser.add_argument("--sample-every", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        if not os.path.exists("/proc/self/statm"):
+            raise CommandError("RSS sampling needs /proc (Linux).")
+
+        failed = []
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['rows']:,} rows per table...")
+            benchmarking.seed(options["rows"], stdout=self.stdout)
+            ledger.rebuild()
+
+            self.stdout.write(
+                f"{'dataset':<24}{'rows':>12}{'MB out':>10}"
+                f"{'RSS start':>12}{'RSS peak':>12}{'growth':>10}"
+            )
+            for name in exports.DATASETS:
+                baseline = peak = current_rss()
+                rows = written = 0
+                for line in exports.stream_csv(name):
+                    rows += 1
+                    written += len(line)
+                    if rows % options["sample_every"] == 0:
+                        peak = max(peak, current_rss())
+                peak = max(peak, current_rss())
+
+                growth = (peak - baseline) / 2**20
+                self.stdout.write(
+                    f"{name:<24}{rows - 1:>12,}{written / 2**20:>10.1f}"
+                    f"{baseline / 2**20:>11.1f}M{peak / 2**20:>11.1f}M"
+                    f"{growth:>9.1f}M"
+                )
+                if growth > options["max_growth"]:
+                    failed.append(name)
+
+            transaction.set_rollback(True)
+
+        if failed:
+            raise CommandError(
+                f"RSS grew by more than {options['max_growth']} MB while "
+                f"streaming: {', '.join(failed)}"
+            )
+        self.stdout.write(self.style.SUCCESS("Memory stayed flat for every export."))
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.core import models as core_model
+from apps.reports import benchmarking, ledger
+from apps.reports.engine import (
+    build_report,
+    collect_figures,
+    collect_stock_usage,
+    day_window,
+    generate_report,
+)
+
+
+def legacy_report(start_date):
+    """
+    The original one-query-per-figure report, kept for comparison.
+    """
+    figures = [
+        core_model.Patient.objects.filter(created_at__date__gte=start_date).count(),
+        core_model.Pharmaceutical.objects.filter(
+            created_at__date__gte=start_date
+        ).aggregate(total=Sum("price")),
+        core_model.LabTest.objects.filter(date__date__gte=start_date).aggregate(
+            total=Sum("price")
+        ),
+        core_model.DailyExpense.objects.filter(date__date__gte=start_date).aggregate(
+            total=Sum("totla_price")
+        ),
+        core_model.DailyExpensePharmacy.objects.filter(
+            date__date__gte=start_date
+        ).aggregate(total=Sum("amount")),
+        core_model.TakenPrice.objects.filter(date__date__gte=start_date).aggregate(
+            total=Sum("amount")
+        ),
+        core_model.Staff.objects.aggregate(total=Sum("salary")),
+        list(
+            core_model.PharmaceuticalDrug.objects.filter(
+                pharmaceutical__created_at__date__gte=start_date
+            )
+            .values("drug__name")
+            .annotate(total_used=Sum("amount_used"))
+        ),
+    ]
+    return figures
+
+
+def raw_report(start_date):
+    """
+    The report engine reading raw transactions instead of the daily ledger.
+    """
+    start, end = day_window(start_date)
+    return build_report(collect_figures(start, end), collect_stock_usage(start, end))
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds ROWS rows per report table inside a transaction, compares the "
+        "legacy report queries with the report engine on raw rows and on the "
+        "daily ledger, then rolls back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        windows = {
+            "daily": today,
+            "weekly": today - timedelta(days=7),
+            "monthly": today.replace(day=1),
+            "yearly": today - timedelta(days=365),
+        }
+
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['rows']:,} rows per table...")
+            benchmarking.seed(options["rows"], options["days"], stdout=self.stdout)
+            queries, best = benchmarking.measure(ledger.rebuild, repeat=1)
+            self.stdout.write(f"Ledger backfill: {queries} queries, {best:.1f} ms")
+
+            self.stdout.write(
+                f"{'window':<10}{'impl':<10}{'queries':>10}{'best ms':>12}"
+            )
+            for name, start_date in windows.items():
+                for label, func in (
+                    ("legacy", lambda: legacy_report(start_date)),
+                    ("raw", lambda: raw_report(start_date)),
+                    ("ledger", lambda: generate_report(start_date)),
+                ):
+                    queries, best = benchmarking.measure(func, options["repeat"])
+                    self.stdout.write(
+                        f"{name:<10}{label:<10}{queries:>10}{best:>12.1f}"
+                    )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,56 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.reports import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Works through queued report jobs (POST /api/v1/reports/jobs/). Runs "
+        "until stopped, polling for new jobs; start as many as the database "
+        "can take. Use --once to drain the queue and exit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Exit when the queue is empty."
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between checks of an empty queue.",
+        )
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=settings.REPORT_JOB_STALE_SECONDS)
+        done = 0
+        try:
+            while True:
+                close_old_connections()
+                requeued = jobs.requeue_stale(stale_after)
+                if requeued:
+                    self.stderr.write(f"Requeued {requeued} stalled job(s).")
+
+                job = jobs.claim_next()
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+
+                started = time.monotonic()
+                jobs.run(job)
+                done += 1
+                self.stdout.write(
+                    f"Job {job.pk} ({job.start_date}..{job.end_date}, "
+                    f"{job.bucket}): {job.status} in "
+                    f"{time.monotonic() - started:.2f}s"
+                )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} report job(s)."))
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyLedger",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("pharmacy_sales", "Pharmacy sales"),
+                            ("lab_tests", "Lab tests"),
+                            ("taken_price", "Taken price"),
+                            ("daily_expense", "Daily expense"),
+                            ("pharmacy_expense", "Pharmacy expense"),
+                            ("patients_registered", "Patients registered"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                (
+                    "total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                ("entries", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["day", "source"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "source"), name="unique_ledger_day_source"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0002_report_jobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportGeneration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
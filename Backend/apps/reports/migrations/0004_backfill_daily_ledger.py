@@ -0,0 +1,70 @@
+from django.db import migrations
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+# Frozen copy of apps.reports.ledger.LEDGER_SOURCES as of this migration:
+# model -> (source, timestamp field, amount field or None when counted).
+LEDGER_SOURCES = {
+    "Pharmaceutical": ("pharmacy_sales", "created_at", "price"),
+    "LabTest": ("lab_tests", "date", "price"),
+    "TakenPrice": ("taken_price", "date", "amount"),
+    "DailyExpense": ("daily_expense", "date", "totla_price"),
+    "DailyExpensePharmacy": ("pharmacy_expense", "date", "amount"),
+    "Patient": ("patients_registered", "created_at", None),
+}
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    Fills DailyLedger from the existing transactions, so reports on an
+    existing database don't read an empty rollup. Same as ``ledger.rebuild()``
+    over every day.
+    """
+    alias = schema_editor.connection.alias
+    DailyLedger = apps.get_model("reports", "DailyLedger")
+    ReportGeneration = apps.get_model("reports", "ReportGeneration")
+
+    rows = []
+    for model_name, (source, timestamp, amount) in LEDGER_SOURCES.items():
+        model = apps.get_model("core", model_name)
+        totals = (
+            model.objects.using(alias)
+            .annotate(ledger_day=TruncDate(timestamp))
+            .values("ledger_day")
+            .annotate(
+                total=Sum(amount) if amount else Count("pk"),
+                entries=Count("pk"),
+            )
+            .order_by()
+        )
+        rows.extend(
+            DailyLedger(
+                day=row["ledger_day"],
+                source=source,
+                total=row["total"] or 0,
+                entries=row["entries"],
+            )
+            for row in totals
+        )
+
+    DailyLedger.objects.using(alias).all().delete()
+    DailyLedger.objects.using(alias).bulk_create(rows, batch_size=1000)
+    # Orphan any report cached while the ledger was empty.
+    if (
+        not ReportGeneration.objects.using(alias)
+        .filter(pk=1)
+        .update(value=F("value") + 1)
+    ):
+        ReportGeneration.objects.using(alias).create(pk=1, value=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0003_report_generation"),
+        ("core", "0020_remove_drugconsumption_avg_30_days"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
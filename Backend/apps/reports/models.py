@@ -1,3 +1,111 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+
+class DailyLedger(models.Model):
+    """
+    One row per day per income/expense source, kept in step with the raw
+    transactions by the signals in ``apps.reports.signals``.
+    """
+
+    PHARMACY_SALES = "pharmacy_sales"
+    LAB_TESTS = "lab_tests"
+    TAKEN_PRICE = "taken_price"
+    DAILY_EXPENSE = "daily_expense"
+    PHARMACY_EXPENSE = "pharmacy_expense"
+    PATIENTS_REGISTERED = "patients_registered"
+    SOURCE_CHOICES = (
+        (PHARMACY_SALES, "Pharmacy sales"),
+        (LAB_TESTS, "Lab tests"),
+        (TAKEN_PRICE, "Taken price"),
+        (DAILY_EXPENSE, "Daily expense"),
+        (PHARMACY_EXPENSE, "Pharmacy expense"),
+        (PATIENTS_REGISTERED, "Patients registered"),
+    )
+
+    day = models.DateField()
+    source = models.CharField(max_length=32, choices=SOURCE_CHOICES)
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    entries = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["day", "source"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "source"], name="unique_ledger_day_source"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.source}: {self.total}"
+
+
+class ReportGeneration(models.Model):
+    """
+    A single row counting committed writes to the data reports read. The
+    report cache and report jobs are keyed on it (see
+    ``apps.reports.cache``). It lives in the database so every worker sees
+    the same value and it never goes back after a restart or an eviction.
+    """
+
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Report generation {self.value}"
+
+
+class ReportJob(models.Model):
+    """
+    A range report computed in the background by ``run_report_jobs``.
+
+    The table doubles as the queue: workers claim the oldest pending row, and
+    the finished row keeps the result so later requests for the same window
+    can reuse it (see ``apps.reports.jobs``).
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    bucket = models.CharField(max_length=8)
+    # ReportGeneration.value when the job was queued; once it moves on, the
+    # data behind the result has changed.
+    generation = models.PositiveBigIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # The queue: only pending rows, oldest first.
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(status="pending"),
+                name="reportjob_pending_idx",
+            ),
+            models.Index(
+                fields=["start_date", "end_date", "bucket", "generation"],
+                name="reportjob_window_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.start_date}..{self.end_date} by {self.bucket}: {self.status}"
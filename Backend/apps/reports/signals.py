@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from apps.core import models as core_model
+from apps.core.signals import bulk_created, bulk_updated
+
+from . import cache, ledger
+
+
+def remember_ledger_entry(sender, instance, **kwargs):
+    """
+    Before an update, remember what the row contributed to the ledger so
+    ``post_save`` can move just the difference.
+    """
+    instance._ledger_previous = None
+    if instance.pk is None or instance._state.adding:
+        return
+    spec = ledger.LEDGER_SOURCES[sender]
+    fields = [spec.timestamp] + ([spec.amount] if spec.amount else [])
+    previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    if previous is not None:
+        instance._ledger_previous = ledger.entry_for(sender(**previous))
+
+
+def post_ledger_entry(sender, instance, created, **kwargs):
+    source = ledger.LEDGER_SOURCES[sender].source
+    day, amount = ledger.entry_for(instance)
+    previous = getattr(instance, "_ledger_previous", None)
+
+    if previous is None:
+        ledger.post(source, day, amount, 1)
+    elif previous[0] == day:
+        ledger.post(source, day, amount - previous[1], 0)
+    else:
+        ledger.post(source, previous[0], -previous[1], -1)
+        ledger.post(source, day, amount, 1)
+
+
+def remove_ledger_entry(sender, instance, **kwargs):
+    source = ledger.LEDGER_SOURCES[sender].source
+    day, amount = ledger.entry_for(instance)
+    ledger.post(source, day, -amount, -1)
+
+
+for model in ledger.LEDGER_SOURCES:
+    pre_save.connect(remember_ledger_entry, sender=model)
+    post_save.connect(post_ledger_entry, sender=model)
+    post_delete.connect(remove_ledger_entry, sender=model)
+
+
+def post_bulk_ledger_entries(sender, instances, **kwargs):
+    """
+    ``bulk_create`` skips ``post_save``; fold the whole batch into one ledger
+    update per day instead.
+    """
+    if sender not in ledger.LEDGER_SOURCES:
+        return
+    source = ledger.LEDGER_SOURCES[sender].source
+    per_day = defaultdict(lambda: [0, 0])
+    for instance in instances:
+        day, amount = ledger.entry_for(instance)
+        per_day[day][0] += amount
+        per_day[day][1] += 1
+    for day, (amount, entries) in per_day.items():
+        ledger.post(source, day, amount, entries)
+
+
+def invalidate_reports(sender, using=None, **kwargs):
+    cache.invalidate(using)
+
+
+# Everything a report reads: the ledger sources, plus the rows behind staff
+# salary and stock usage.
+for model in (
+    *ledger.LEDGER_SOURCES,
+    core_model.Staff,
+    core_model.PharmaceuticalDrug,
+    core_model.Stock,
+):
+    post_save.connect(invalidate_reports, sender=model)
+    post_delete.connect(invalidate_reports, sender=model)
+
+bulk_created.connect(post_bulk_ledger_entries)
+bulk_created.connect(invalidate_reports)
+bulk_updated.connect(invalidate_reports)
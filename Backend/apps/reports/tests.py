@@ -0,0 +1,475 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core import models as core_model
+from apps.core.query_plans import capture_plans, full_scans, indexes_used
+
+from . import cache, exports, jobs, ledger
+from .engine import (
+    collect_figures,
+    collect_ledger_figures,
+    collect_stock_usage,
+    day_window,
+)
+from .models import DailyLedger, ReportJob
+
+
+class DailyLedgerTests(TestCase):
+    def setUp(self):
+        self.patient = core_model.Patient.objects.create(
+            name="Ahmad", patient_type="OPD"
+        )
+
+    def snapshot(self):
+        return list(
+            DailyLedger.objects.exclude(entries=0, total=0).values_list(
+                "day", "source", "total", "entries"
+            )
+        )
+
+    def assertLedgerMatchesRaw(self):
+        today = timezone.localdate()
+        start = today - timedelta(days=30)
+        raw = collect_figures(*day_window(start, today))
+        rolled = collect_ledger_figures(start, today)
+        for source, total in raw.items():
+            self.assertEqual(Decimal(total), Decimal(rolled.get(source, 0)), source)
+
+        incremental = self.snapshot()
+        ledger.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_saves_are_rolled_up(self):
+        core_model.Pharmaceutical.objects.create(
+            patient_name=self.patient, copy="", price="12.50"
+        )
+        core_model.Pharmaceutical.objects.create(
+            patient_name=self.patient, copy="", price="7.50"
+        )
+        core_model.TakenPrice.objects.create(name="x", description="", amount=3)
+
+        row = DailyLedger.objects.get(source=DailyLedger.PHARMACY_SALES)
+        self.assertEqual(row.total, Decimal("20.00"))
+        self.assertEqual(row.entries, 2)
+        self.assertLedgerMatchesRaw()
+
+    def test_updates_move_only_the_difference(self):
+        expense = core_model.DailyExpense.objects.create(
+            name="Fuel", salary=0, who="", totla_price=10
+        )
+        expense.totla_price = 25
+        expense.save()
+
+        row = DailyLedger.objects.get(source=DailyLedger.DAILY_EXPENSE)
+        self.assertEqual(row.total, Decimal("25.00"))
+        self.assertEqual(row.entries, 1)
+        self.assertLedgerMatchesRaw()
+
+    def test_moving_a_row_to_another_day(self):
+        test = core_model.LabTest.objects.create(
+            patient=self.patient, price=40, refer_to=""
+        )
+        test.date = test.date - timedelta(days=3)
+        test.save()
+
+        rows = dict(
+            DailyLedger.objects.filter(source=DailyLedger.LAB_TESTS).values_list(
+                "day", "entries"
+            )
+        )
+        self.assertEqual(rows[timezone.localdate(test.date)], 1)
+        self.assertEqual(rows[timezone.localdate()], 0)
+        self.assertLedgerMatchesRaw()
+
+    def test_deletes_are_reversed(self):
+        expense = core_model.DailyExpensePharmacy.objects.create(name="x", amount=9)
+        expense.delete()
+        self.patient.delete()
+
+        self.assertEqual(self.snapshot(), [])
+
+    def test_deletes_missing_from_the_ledger_are_logged(self):
+        expense = core_model.DailyExpensePharmacy.objects.create(name="x", amount=9)
+        DailyLedger.objects.all().delete()
+
+        with self.assertLogs("apps.reports.ledger", "ERROR"):
+            expense.delete()
+        self.assertFalse(core_model.DailyExpensePharmacy.objects.exists())
+
+    def test_migration_backfills_the_ledger(self):
+        migration = import_module("apps.reports.migrations.0004_backfill_daily_ledger")
+        core_model.LabTest.objects.create(patient=self.patient, price=40, refer_to="")
+        expected = self.snapshot()
+        DailyLedger.objects.all().delete()
+
+        migration.backfill_ledger(django_apps, SimpleNamespace(connection=connection))
+        self.assertEqual(sorted(self.snapshot()), sorted(expected))
+
+
+class ReportRangeTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("Rep", "Orter", "rep@example.com")
+        )
+        patient = core_model.Patient.objects.create(name="Ahmad", patient_type="OPD")
+        core_model.Pharmaceutical.objects.create(
+            patient_name=patient, copy="", price=30
+        )
+        core_model.DailyExpense.objects.create(
+            name="Fuel", salary=0, who="", totla_price=10
+        )
+
+    def test_series_has_one_point_per_bucket(self):
+        today = timezone.localdate()
+        start = today - timedelta(days=6)
+
+        response = self.client.get(
+            "/reports/api/v1/reports/",
+            {"start": start.isoformat(), "end": today.isoformat(), "bucket": "day"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        series = response.data["series"]
+        self.assertEqual([point["period"] for point in series][-1], today)
+        self.assertEqual(len(series), 7)
+        self.assertEqual(series[-1]["income"]["pharmacy_sales"], Decimal("30"))
+        self.assertEqual(series[-1]["net_profit"], Decimal("20"))
+        self.assertEqual(series[0]["net_profit"], Decimal("0"))
+
+    def test_month_buckets_start_on_the_first(self):
+        response = self.client.get(
+            "/reports/api/v1/reports/",
+            {"start": "2024-01-15", "end": "2024-03-02", "bucket": "month"},
+        )
+
+        self.assertEqual(
+            [point["period"].isoformat() for point in response.data["series"]],
+            ["2024-01-01", "2024-02-01", "2024-03-01"],
+        )
+
+    def test_rejects_bad_windows(self):
+        for params in (
+            {"start": "2024-13-01"},
+            {"start": "2024-02-01", "end": "2024-01-01"},
+            {"start": "2024-02-01", "bucket": "year"},
+            {"start": "0001-01-01", "end": "2024-01-01"},
+        ):
+            response = self.client.get("/reports/api/v1/reports/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+    @override_settings(REPORT_MAX_BUCKETS=3)
+    def test_span_is_capped_per_bucket(self):
+        for bucket, end, status in [
+            ("day", "2024-01-03", 200),
+            ("day", "2024-01-04", 400),
+            ("week", "2024-01-21", 200),
+            ("week", "2024-01-22", 400),
+            ("month", "2024-03-31", 200),
+            ("month", "2024-04-01", 400),
+        ]:
+            response = self.client.get(
+                "/reports/api/v1/reports/",
+                {"start": "2024-01-01", "end": end, "bucket": bucket},
+            )
+            self.assertEqual(response.status_code, status, (bucket, end))
+        self.assertIn("at most 3 months", response.data["error"])
+        self.assertIn("/api/v1/reports/jobs/", response.data["error"])
+
+
+class ReportCacheTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("Rep", "Orter", "rep@example.com")
+        )
+        # Reports skip the cache until the writes behind them commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient = core_model.Patient.objects.create(
+                name="Ahmad", patient_type="OPD"
+            )
+
+    def fetch(self):
+        response = self.client.get("/reports/api/v1/reports/", {"type": "daily"})
+        return response.data["data"]
+
+    def check_hits_and_invalidation(self):
+        self.fetch()
+        # Only the generation is read.
+        with self.assertNumQueries(1):
+            self.fetch()
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            core_model.Pharmaceutical.objects.create(
+                patient_name=self.patient, copy="", price=15
+            )
+
+        self.assertEqual(self.fetch()["income"]["pharmacy_sales"], Decimal("15"))
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_local_memory_cache(self):
+        self.check_hits_and_invalidation()
+
+    def test_file_based_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = "django.core.cache.backends.filebased.FileBasedCache"
+            with override_settings(
+                CACHES={"default": {"BACKEND": backend, "LOCATION": location}}
+            ):
+                self.check_hits_and_invalidation()
+
+    def test_uncommitted_writes_are_not_cached(self):
+        self.fetch()
+        before = cache.generation()
+        # The callbacks are dropped, as on a rollback.
+        with self.captureOnCommitCallbacks():
+            core_model.Pharmaceutical.objects.create(
+                patient_name=self.patient, copy="", price=15
+            )
+            # This transaction sees the new row, so it must neither read nor
+            # fill the cache.
+            self.assertEqual(self.fetch()["income"]["pharmacy_sales"], Decimal("15"))
+
+        self.assertEqual(cache.generation(), before)
+        self.assertEqual(cache.stats()["hits"], 0)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_generation_outlives_the_cache(self):
+        before = cache.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            core_model.Pharmaceutical.objects.create(
+                patient_name=self.patient, copy="", price=15
+            )
+        cache.get_cache().clear()
+
+        self.assertEqual(cache.generation(), before + 1)
+
+    def test_stats_endpoint(self):
+        self.fetch()
+        response = self.client.get("/reports/api/v1/reports/cache/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["misses"], 1)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("Rep", "Orter", "rep@example.com")
+        )
+        core_model.TakenPrice.objects.create(name="Rent", description="", amount=5)
+
+    def test_streams_csv(self):
+        today = timezone.localdate().isoformat()
+        response = self.client.get(
+            "/reports/api/v1/exports/taken-prices/", {"start": today}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,date,name,description,amount")
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Rent", lines[1])
+
+    def test_unknown_dataset(self):
+        response = self.client.get("/reports/api/v1/exports/salaries/")
+        self.assertEqual(response.status_code, 404)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("Rep", "Orter", "rep@example.com")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient = core_model.Patient.objects.create(
+                name="Ahmad", patient_type="OPD"
+            )
+            core_model.Pharmaceutical.objects.create(
+                patient_name=self.patient, copy="", price=30
+            )
+        self.window = {
+            "start": (timezone.localdate() - timedelta(days=60)).isoformat(),
+            "bucket": "month",
+        }
+
+    def enqueue(self, **extra):
+        return self.client.post(
+            "/reports/api/v1/reports/jobs/", {**self.window, **extra}
+        )
+
+    def poll(self, job_id):
+        return self.client.get(f"/reports/api/v1/reports/jobs/{job_id}/")
+
+    def test_job_is_queued_then_computed_by_the_worker(self):
+        response = self.enqueue()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], ReportJob.PENDING)
+        self.assertEqual(self.poll(response.data["id"]).data["status"], "pending")
+
+        out = StringIO()
+        call_command("run_report_jobs", "--once", stdout=out)
+        self.assertIn("Ran 1 report job(s).", out.getvalue())
+
+        job = self.poll(response.data["id"]).data
+        self.assertEqual(job["status"], ReportJob.DONE)
+        self.assertEqual(job["result"]["data"]["income"]["pharmacy_sales"], "30")
+        self.assertEqual(len(job["result"]["series"]), 3)
+
+        # The synchronous endpoint now finds the worker's result cached and
+        # only reads the generation, once per cached part.
+        with self.assertNumQueries(2):
+            self.client.get("/reports/api/v1/reports/", self.window)
+
+    def test_same_window_reuses_the_job_until_data_changes(self):
+        first = self.enqueue().data["id"]
+        self.assertEqual(self.enqueue().data["id"], first)
+        jobs.run(jobs.claim_next())
+
+        response = self.enqueue()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], first)
+        self.assertIn("result", response.data)
+        self.assertNotEqual(self.enqueue(refresh="true").data["id"], first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            core_model.Pharmaceutical.objects.create(
+                patient_name=self.patient, copy="", price=5
+            )
+        self.assertEqual(self.enqueue().status_code, 202)
+
+    def test_finished_jobs_are_not_revived_by_a_cache_reset(self):
+        first = self.enqueue().data["id"]
+        jobs.run(jobs.claim_next())
+        with self.captureOnCommitCallbacks(execute=True):
+            core_model.Pharmaceutical.objects.create(
+                patient_name=self.patient, copy="", price=5
+            )
+        # Losing every cache entry (a restart, an eviction) must not bring
+        # the generation back to the one the job was computed at.
+        cache.get_cache().clear()
+
+        response = self.enqueue()
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.data["id"], first)
+
+    @override_settings(REPORT_JOB_MAX_BUCKETS=2)
+    def test_window_is_capped(self):
+        response = self.enqueue(bucket="day")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("at most 2 days", response.data["error"])
+
+    def test_malformed_json_bodies_are_rejected(self):
+        url = "/reports/api/v1/reports/jobs/"
+        for body in ({"start": 2024}, {**self.window, "end": 5}, [self.window]):
+            response = self.client.post(url, body, format="json")
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_a_job_is_claimed_once(self):
+        job = ReportJob.objects.get(pk=self.enqueue().data["id"])
+
+        self.assertEqual(jobs.claim_next(), job)
+        self.assertIsNone(jobs.claim_next())
+
+    def test_stalled_jobs_are_requeued(self):
+        job_id = self.enqueue().data["id"]
+        jobs.claim_next()
+        ReportJob.objects.filter(pk=job_id).update(
+            started_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(jobs.requeue_stale(timedelta(minutes=10)), 1)
+        self.assertEqual(jobs.claim_next().pk, job_id)
+
+    def test_failures_are_recorded(self):
+        job_id = self.enqueue().data["id"]
+        with mock.patch.object(
+            jobs, "compute", side_effect=RuntimeError("boom")
+        ), self.assertLogs("apps.reports.jobs", "ERROR"):
+            jobs.run(jobs.claim_next())
+
+        job = self.poll(job_id).data
+        self.assertEqual(job["status"], ReportJob.FAILED)
+        self.assertNotIn("boom", job["error"])
+        self.assertIn("boom", ReportJob.objects.get(pk=job_id).error)
+
+    def test_validation(self):
+        self.assertEqual(self.enqueue(bucket="year").status_code, 400)
+        self.assertEqual(self.poll(999).status_code, 404)
+
+
+@skipUnless(connection.vendor == "sqlite", "Reads SQLite query plans.")
+class ReportQueryPlanTests(TestCase):
+    """
+    Every date-windowed report query must be served by an index on its
+    timestamp column, not by reading the whole table.
+    """
+
+    def setUp(self):
+        today = timezone.localdate()
+        self.start_date = today - timedelta(days=30)
+        self.end_date = today
+        self.window = day_window(self.start_date, today)
+
+    def plans(self, func, *args):
+        plans = capture_plans(func, *args)
+        self.assertTrue(plans)
+        for sql, plan in plans:
+            # Staff salary is a total over the whole (small) staff table.
+            scans = [line for line in full_scans(plan) if line != "SCAN core_staff"]
+            self.assertEqual(scans, [], sql)
+        return set().union(*(indexes_used(plan) for _, plan in plans))
+
+    def test_raw_figures(self):
+        used = self.plans(collect_figures, *self.window)
+        self.assertLessEqual(
+            {
+                "pharm_created_id_idx",
+                "labtest_date_id_idx",
+                "takenprice_date_id_idx",
+                "dailyexp_date_id_idx",
+                "pharmexp_date_id_idx",
+                "patient_created_id_idx",
+            },
+            used,
+        )
+
+    def test_ledger_figures(self):
+        used = self.plans(collect_ledger_figures, self.start_date, self.end_date)
+        self.assertIn("sqlite_autoindex_reports_dailyledger_1", used)
+
+    def test_stock_usage_joins_through_covering_indexes(self):
+        used = self.plans(collect_stock_usage, *self.window)
+        self.assertIn("pharm_created_id_idx", used)
+        self.assertIn("pharmdrug_pharm_drug_idx", used)
+
+    def test_windowed_exports(self):
+        for name in exports.DATASETS:
+            with self.subTest(dataset=name):
+                self.plans(
+                    lambda: list(
+                        exports.export_rows(name, self.start_date, self.end_date)
+                    )
+                )
@@ -4,4 +4,20 @@ from . import views
 
 urlpatterns = [
     path("api/v1/reports/", views.ReportAPIView.as_view(), name="reports"),
+    path(
+        "api/v1/reports/cache/",
+        views.ReportCacheStatsAPIView.as_view(),
+        name="reports-cache",
+    ),
+    path("api/v1/reports/jobs/", views.ReportJobAPIView.as_view(), name="report-jobs"),
+    path(
+        "api/v1/reports/jobs/<int:pk>/",
+        views.ReportJobDetailAPIView.as_view(),
+        name="report-job",
+    ),
+    path(
+        "api/v1/exports/<slug:dataset>/",
+        views.ExportAPIView.as_view(),
+        name="reports-export",
+    ),
 ]
@@ -1,106 +1,17 @@
-from datetime import timedelta
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Sum, Count
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from apps.core import models as core_model
+from rest_framework.renderers import JSONRenderer
 
+from apps.core import replicas
 
-# -------------------------------------------------------------------
-# DATE HELPERS
-# -------------------------------------------------------------------
-def get_date_ranges():
-    today = timezone.now().date()
-
-    return {
-        "daily": {
-            "start": today,
-        },
-        "weekly": {
-            "start": today - timedelta(days=7),
-        },
-        "monthly": {
-            "start": today.replace(day=1),
-        },
-    }
-
-
-# -------------------------------------------------------------------
-# CORE REPORT LOGIC
-# -------------------------------------------------------------------
-def generate_report(start_date):
-    """
-    Generates a financial & operational report from a start date.
-    """
-
-    patients_count = core_model.Patient.objects.filter(
-        created_at__date__gte=start_date
-    ).count()
-
-    pharmacy_sales = core_model.Pharmaceutical.objects.filter(
-        created_at__date__gte=start_date
-    ).aggregate(
-        total=Sum("price")
-    )["total"] or 0
-
-    lab_income = core_model.LabTest.objects.filter(
-        date__date__gte=start_date
-    ).aggregate(
-        total=Sum("price")
-    )["total"] or 0
-
-    daily_expenses = core_model.DailyExpense.objects.filter(
-        date__date__gte=start_date
-    ).aggregate(
-        total=Sum("totla_price")
-    )["total"] or 0
-
-    pharmacy_expenses = core_model.DailyExpensePharmacy.objects.filter(
-        date__date__gte=start_date
-    ).aggregate(
-        total=Sum("amount")
-    )["total"] or 0
-
-    taken_price = core_model.TakenPrice.objects.filter(
-        date__date__gte=start_date
-    ).aggregate(
-        total=Sum("amount")
-    )["total"] or 0
-
-    staff_salary = core_model.Staff.objects.aggregate(
-        total=Sum("salary")
-    )["total"] or 0
-
-    stock_usage = core_model.PharmaceuticalDrug.objects.filter(
-        pharmaceutical__created_at__date__gte=start_date
-    ).values(
-        "drug__name"
-    ).annotate(
-        total_used=Sum("amount_used")
-    )
-
-    total_income = pharmacy_sales + lab_income + taken_price
-    total_expenses = daily_expenses + pharmacy_expenses + staff_salary
-    net_profit = total_income - total_expenses
-
-    return {
-        "patients_registered": patients_count,
-        "income": {
-            "pharmacy_sales": pharmacy_sales,
-            "lab_tests": lab_income,
-            "taken_price": taken_price,
-            "total_income": total_income,
-        },
-        "expenses": {
-            "daily_expense": daily_expenses,
-            "pharmacy_expense": pharmacy_expenses,
-            "staff_salary": staff_salary,
-            "total_expenses": total_expenses,
-        },
-        "net_profit": net_profit,
-        "stock_usage": list(stock_usage),
-    }
+from . import cache, exports, jobs
+from .engine import generate_report, generate_series
+from .helper import TooManyBuckets, get_date_ranges, parse_window
+from .models import ReportJob
 
 
 # -------------------------------------------------------------------
@@ -109,11 +20,20 @@ def generate_report(start_date):
 class ReportAPIView(APIView):
     """
     GET /api/v1/reports/?type=daily|weekly|monthly
+    GET /api/v1/reports/?start=YYYY-MM-DD&end=YYYY-MM-DD&bucket=day|week|month
+
+    The second form returns the summary for the whole range plus a
+    ``series`` with one point per bucket, so a chart needs one request.
     """
 
+    replica_reads = True
+    token_claims = True
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        if "start" in request.query_params:
+            return self.get_range(request)
+
         report_type = request.query_params.get("type", "daily")
 
         ranges = get_date_ranges()
@@ -125,7 +45,12 @@ class ReportAPIView(APIView):
             )
 
         start_date = ranges[report_type]["start"]
-        report_data = generate_report(start_date)
+        end_date = timezone.localdate()
+        report_data = cache.cached_report(
+            "summary",
+            (start_date, end_date),
+            lambda: generate_report(start_date, end_date),
+        )
 
         return Response(
             {
@@ -135,3 +60,155 @@ class ReportAPIView(APIView):
                 "data": report_data,
             }
         )
+
+    def get_range(self, request):
+        try:
+            start_date, end_date, bucket = parse_window(
+                request.query_params, max_buckets=settings.REPORT_MAX_BUCKETS
+            )
+        except ValueError as e:
+            error = str(e)
+            if isinstance(e, TooManyBuckets):
+                error += " Longer ranges can be queued at /api/v1/reports/jobs/."
+            return Response({"error": error}, status=400)
+
+        return Response(
+            {
+                "report_type": "range",
+                "start_date": start_date,
+                "end_date": end_date,
+                "bucket": bucket,
+                "generated_at": timezone.now(),
+                "data": cache.cached_report(
+                    "summary",
+                    (start_date, end_date),
+                    lambda: generate_report(start_date, end_date),
+                ),
+                "series": cache.cached_report(
+                    f"series-{bucket}",
+                    (start_date, end_date),
+                    lambda: generate_series(start_date, end_date, bucket),
+                ),
+            }
+        )
+
+
+class ReportCacheStatsAPIView(APIView):
+    """
+    GET /api/v1/reports/cache/ -> report cache hit/miss counters.
+    """
+
+    token_claims = True
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(cache.stats())
+
+
+def job_payload(job):
+    payload = {
+        "id": job.pk,
+        "status": job.status,
+        "start_date": job.start_date,
+        "end_date": job.end_date,
+        "bucket": job.bucket,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == ReportJob.DONE:
+        payload["result"] = job.result
+    elif job.status == ReportJob.FAILED:
+        payload["error"] = "The report could not be generated."
+    return payload
+
+
+class ReportJobAPIView(APIView):
+    """
+    POST /api/v1/reports/jobs/ {"start", "end", "bucket", "refresh"}
+
+    Queues a range report for the ``run_report_jobs`` worker and returns the
+    job (202), or an existing job for the same window and data (200). Poll
+    ``GET /api/v1/reports/jobs/<id>/`` until ``status`` is ``done``.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Expected a JSON object."}, status=400)
+        try:
+            start_date, end_date, bucket = parse_window(
+                request.data, max_buckets=settings.REPORT_JOB_MAX_BUCKETS
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        job, created = jobs.enqueue(
+            start_date,
+            end_date,
+            bucket,
+            user=request.user,
+            refresh=str(request.data.get("refresh", "")).lower() in ("1", "true"),
+        )
+        return Response(job_payload(job), status=202 if created else 200)
+
+
+class ReportJobDetailAPIView(APIView):
+    """
+    GET /api/v1/reports/jobs/<id>/ -> the job's status, and its result once
+    done.
+    """
+
+    token_claims = True
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = ReportJob.objects.filter(pk=pk).first()
+        if job is None:
+            return Response({"error": "No such report job."}, status=404)
+        return Response(job_payload(job))
+
+
+class ExportAPIView(APIView):
+    """
+    GET /api/v1/exports/<dataset>/?start=YYYY-MM-DD&end=YYYY-MM-DD
+
+    Streams a dataset as CSV. Without ``start`` every row is exported.
+    """
+
+    replica_reads = True
+    token_claims = True
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, exports.CSVRenderer]
+
+    def get(self, request, dataset):
+        if dataset not in exports.DATASETS:
+            return Response(
+                {
+                    "error": "Unknown dataset. Use one of: "
+                    + ", ".join(exports.DATASETS)
+                    + "."
+                },
+                status=404,
+            )
+
+        start_date = end_date = None
+        filename = dataset
+        if "start" in request.query_params:
+            try:
+                start_date, end_date, _ = parse_window(request.query_params)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=400)
+            filename = f"{dataset}-{start_date}-{end_date}"
+
+        response = StreamingHttpResponse(
+            # Rows are read while streaming, after this view has returned,
+            # so the alias has to be picked now.
+            exports.stream_csv(
+                dataset, start_date, end_date, using=replicas.read_alias()
+            ),
+            content_type="text/csv",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+        return response
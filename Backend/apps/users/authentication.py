@@ -0,0 +1,168 @@
+"""
+JWT authentication without a ``users_user`` query on every request.
+
+``CachedJWTAuthentication`` is the default authentication class. It keeps
+recently seen users in a small in-process LRU cache (``user_cache``) for
+``AUTH_USER_CACHE_TTL`` seconds. Saving or deleting a user evicts it, so
+changes made in this process take effect on the next request. Other
+processes see them once the entry expires.
+
+Views that set ``token_claims = True`` go one step further for GET, HEAD
+and OPTIONS. They trust the role and admin claims ``get_token`` put in
+the token, so ``request.user`` is a ``ClaimsUser`` and no lookup happens
+at all. A deactivated user or a role change is only noticed when the
+token is reissued, so this only applies to tokens issued in the last
+``AUTH_CLAIMS_MAX_AGE`` seconds. Older tokens go through the cached
+lookup.
+
+Writes skip the cache and load the user from the database (refreshing
+the entry), since a view that saves ``request.user`` would otherwise
+write back a password hash, role or ``is_active`` another process has
+since changed.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+
+class UserCache:
+    """
+    A thread-safe LRU of ``user id -> User`` whose entries expire after
+    ``AUTH_USER_CACHE_TTL`` seconds. ``get`` hands out copies, so nothing a
+    request does to its ``request.user`` leaks into the next one.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        expires = time.monotonic() + settings.AUTH_USER_CACHE_TTL
+        with self._lock:
+            self._entries[user_id] = (expires, copy.copy(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.AUTH_USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+user_cache = UserCache()
+
+
+class ClaimsUser(TokenUser):
+    """
+    A user built from the token alone. It answers the role checks views
+    make (``role``, ``is_admin``, the role constants, ``get_role``) but is
+    not a model instance, so it can't be saved or used in a query.
+    """
+
+    Admin = User.Admin
+    Doctor = User.Doctor
+    Reception = User.Reception
+    Other = User.Other
+
+    get_role = User.get_role
+
+    @cached_property
+    def role(self):
+        role = self.token.get("role")
+        # get_token stores the role as a one-element list.
+        if isinstance(role, (list, tuple)):
+            role = role[0] if role else None
+        return role
+
+    @cached_property
+    def is_admin(self):
+        return bool(self.token.get("is_admin", False))
+
+    @cached_property
+    def email(self):
+        return self.token.get("email", "")
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if self.trusts_claims(request, validated_token):
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken(
+                    "Token contained no recognizable user identification"
+                )
+            return ClaimsUser(validated_token), validated_token
+        fresh = request.method not in SAFE_METHODS
+        return self.get_user(validated_token, fresh=fresh), validated_token
+
+    def trusts_claims(self, request, validated_token):
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        if request.method not in SAFE_METHODS or not getattr(
+            view, "token_claims", False
+        ):
+            return False
+        issued = validated_token.get("iat")
+        return (
+            issued is not None and time.time() - issued <= settings.AUTH_CLAIMS_MAX_AGE
+        )
+
+    def get_user(self, validated_token, fresh=False):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        user = None if fresh else user_cache.get(user_id)
+        if user is None:
+            # The parent does the lookup and the is_active/revocation checks;
+            # only users that pass them are cached.
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            return user
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                "The user's password has been changed.", code="password_changed"
+            )
+        return user
@@ -0,0 +1,73 @@
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.users.authentication import CachedJWTAuthentication, user_cache
+from apps.users.models import User
+from apps.users.serializers import MyTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the per-request cost of authenticating a JWT with "
+        "simplejwt's stock class, with the cached user lookup and with "
+        "trusted token claims. Creates a throwaway user inside a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        with transaction.atomic():
+            user = User.objects.create_user("Bench", "Mark", "bench@example.com")
+            user.is_active = True
+            user.save()
+            token = MyTokenObtainPairSerializer.get_token(user).access_token
+
+            def requests(view):
+                request = APIRequestFactory().get(
+                    "/", HTTP_AUTHORIZATION=f"Bearer {token}"
+                )
+                return Request(request, parser_context={"view": view})
+
+            plain = requests(SimpleNamespace())
+            claims = requests(SimpleNamespace(token_claims=True))
+            user_cache.clear()
+            cases = (
+                ("simplejwt", JWTAuthentication(), plain),
+                ("cached", CachedJWTAuthentication(), plain),
+                ("claims", CachedJWTAuthentication(), claims),
+            )
+
+            self.stdout.write(
+                f"{'mode':<12}{'queries':>10}{'us/request':>12}{'req/s':>12}"
+            )
+            for name, authenticator, request in cases:
+                # Warm up, then count the queries of a steady-state request.
+                authenticator.authenticate(request)
+                with CaptureQueriesContext(connection) as captured:
+                    authenticator.authenticate(request)
+
+                best = None
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    for _ in range(count):
+                        authenticator.authenticate(request)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+
+                per_request = best * 1_000_000 / count
+                self.stdout.write(
+                    f"{name:<12}{len(captured.captured_queries):>10}"
+                    f"{per_request:>12.1f}{count / best:>12,.0f}"
+                )
+            transaction.set_rollback(True)
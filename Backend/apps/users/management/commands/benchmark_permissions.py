@@ -0,0 +1,74 @@
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.permissions import BasePermission, IsAuthenticated
+
+from apps.users.authentication import ClaimsUser
+from apps.users.models import User
+from apps.users.permissions import RolePermission
+from apps.users.serializers import MyTokenObtainPairSerializer
+
+
+class LegacyCanUpdatePrice(BasePermission):
+    """
+    The old ``apps.api.permissions.CanUpdatePrice``, kept for comparison.
+    """
+
+    def has_permission(self, request, view):
+        return request.user.role == 2
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the cost of a view's permission checks (IsAuthenticated "
+        "plus the role check) per request, for the old per-view classes and "
+        "the role registry, with a model user and a token-claims user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checks", type=int, default=200_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        count = options["checks"]
+        user = User(pk=1, email="bench@example.com", role=User.Reception)
+        claims = ClaimsUser(MyTokenObtainPairSerializer.get_token(user).access_token)
+        view = SimpleNamespace(role_permissions={"PUT": "orders.update_price"})
+        cases = (
+            ("legacy", LegacyCanUpdatePrice, "model", user),
+            ("registry", RolePermission, "model", user),
+            ("registry", RolePermission, "claims", claims),
+        )
+
+        self.stdout.write(
+            f"{'permission':<12}{'user':<8}{'queries':>8}{'ns/request':>12}"
+        )
+        for name, permission_class, kind, request_user in cases:
+            request = SimpleNamespace(method="PUT", user=request_user)
+            # What DRF does per request: instantiate and check every class.
+            classes = (IsAuthenticated, permission_class)
+
+            def check():
+                return all(
+                    permission().has_permission(request, view) for permission in classes
+                )
+
+            assert check()
+            with CaptureQueriesContext(connection) as captured:
+                check()
+
+            best = None
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                for _ in range(count):
+                    check()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+
+            self.stdout.write(
+                f"{name:<12}{kind:<8}{len(captured.captured_queries):>8}"
+                f"{best * 1e9 / count:>12.0f}"
+            )
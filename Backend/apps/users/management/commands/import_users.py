@@ -0,0 +1,99 @@
+import csv
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.users.models import User, UserProfile
+
+ROLES = {label.lower(): value for value, label in User.ROLE_CHOICES}
+REQUIRED = ("first_name", "last_name", "email")
+
+
+def parse_role(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    if value.isdigit() and int(value) in dict(User.ROLE_CHOICES):
+        return int(value)
+    try:
+        return ROLES[value.lower()]
+    except KeyError:
+        raise ValueError(f"unknown role {value!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates users and their profiles from a CSV file with bulk inserts. "
+        "Columns: first_name, last_name, email, and optionally role (name or "
+        "number), phone_number and password. Users without a password get an "
+        "unusable one and can set it through the password reset flow. Emails "
+        "that are already registered are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--active", action="store_true", help="Create the users as active."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], newline="", encoding="utf-8-sig") as f:
+                reader = csv.DictReader(f)
+                missing = set(REQUIRED) - set(reader.fieldnames or ())
+                if missing:
+                    raise CommandError(
+                        f"Missing column(s): {', '.join(sorted(missing))}."
+                    )
+                rows = list(reader)
+        except OSError as e:
+            raise CommandError(e)
+
+        users = {}
+        for line, row in enumerate(rows, start=2):
+            email = User.objects.normalize_email((row["email"] or "").strip())
+            if not email:
+                raise CommandError(f"Line {line}: email is required.")
+            try:
+                role = parse_role(row.get("role"))
+            except ValueError as e:
+                raise CommandError(f"Line {line}: {e}.")
+            users.setdefault(
+                email,
+                User(
+                    email=email,
+                    first_name=row["first_name"].strip(),
+                    last_name=row["last_name"].strip(),
+                    role=role,
+                    phone_number=(row.get("phone_number") or "").strip() or None,
+                    # make_password(None) is an unusable password.
+                    password=make_password(row.get("password") or None),
+                    is_active=options["active"],
+                ),
+            )
+
+        batch_size = options["batch_size"]
+        emails = list(users)
+        existing = set()
+        for start in range(0, len(emails), batch_size):
+            existing.update(
+                User.objects.filter(
+                    email__in=emails[start : start + batch_size]
+                ).values_list("email", flat=True)
+            )
+        new = [user for email, user in users.items() if email not in existing]
+
+        with transaction.atomic():
+            User.objects.bulk_create(new, batch_size=batch_size)
+            UserProfile.objects.bulk_create(
+                [UserProfile(user=user) for user in new], batch_size=batch_size
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {len(new)} user(s); skipped {len(rows) - len(new)} "
+                "already registered or repeated."
+            )
+        )
@@ -3,6 +3,13 @@ from django.db import models
 
 
 class UserManager(BaseUserManager):
+    def get_by_natural_key(self, email):
+        # Login puts the profile picture in the token; fetch it in the same
+        # query as the user.
+        return self.select_related("userprofile").get(
+            **{self.model.USERNAME_FIELD: email}
+        )
+
     def create_user(self, first_name, last_name, email, password=None):
         if not email:
             raise ValueError("User must have an email address!")
@@ -81,6 +88,14 @@ class User(AbstractBaseUser):
             return "Admin"
 
 
+class UserProfileManager(models.Manager):
+    def for_user(self, user):
+        """
+        The user's profile, created on first access if it's missing.
+        """
+        return self.get_or_create(user_id=user.pk)[0]
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, blank=True, null=True)
     profile_pic = models.ImageField(
@@ -92,5 +107,7 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserProfileManager()
+
     def __str__(self) -> str:
         return self.user.email
@@ -1,21 +1,69 @@
-from rest_framework.exceptions import PermissionDenied
-from rest_framework.permissions import BasePermission
+"""
+Role permissions.
 
+``ROLE_PERMISSIONS`` is the one place that says which roles may do what.
+Views declare the action each HTTP method needs::
 
-class IsDesigner(BasePermission):
+    class StockListView(APIView):
+        permission_classes = [IsAuthenticated, RolePermission]
+        role_permissions = {"POST": "stock.change", "DELETE": "stock.change"}
 
-    def has_permission(self, request, view):
-        role = request.user.role
-        return role == 1
+and ``RolePermission`` checks ``request.user.role`` against the registry.
+Methods a view doesn't list are open to every role. Only attributes of
+``request.user`` are read, which the authentication class has already
+loaded (or taken from the token), so a check never touches the database.
 
+Users with ``is_admin`` (Django admins, see ``User.has_perm``) may do
+everything. Anyone can pick a role when signing up, so actions that must
+not be self-granted, like managing other users, list no roles at all and
+are left to ``is_admin``.
+"""
 
-class IsReception(BasePermission):
-    def has_permission(self, request, view):
-        role = request.user.role
-        return role == 2
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from .models import User
+
+ROLE_PERMISSIONS = {
+    "stock.change": frozenset({User.Admin}),
+    "stock.adjust_prices": frozenset({User.Admin}),
+    "records.write": frozenset({User.Admin, User.Doctor, User.Other}),
+    "users.manage": frozenset(),
+    "orders.create": frozenset({User.Doctor}),
+    "orders.update_price": frozenset({User.Reception}),
+}
+
+
+def role_allows(user, action):
+    try:
+        roles = ROLE_PERMISSIONS[action]
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown role permission {action!r}.")
+    if not getattr(user, "is_authenticated", False):
+        return False
+    return getattr(user, "is_admin", False) or getattr(user, "role", None) in roles
 
 
-class IsAdmin(BasePermission):
+class RolePermission(BasePermission):
+    message = "Your role does not allow this action."
+
+    def get_action(self, request, view):
+        return getattr(view, "role_permissions", {}).get(request.method)
+
     def has_permission(self, request, view):
-        role = request.user.role
-        return role == 0
+        action = self.get_action(request, view)
+        return action is None or role_allows(request.user, action)
+
+
+class WritesNeedRole(RolePermission):
+    """
+    Reads are open; anything else needs ``write_permission`` (by default
+    ``records.write``, which Reception doesn't have).
+    """
+
+    write_permission = "records.write"
+
+    def get_action(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        return self.write_permission
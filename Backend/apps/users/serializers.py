@@ -31,6 +31,8 @@ class CreateUserSerializer(serializers.ModelSerializer):
         role = data.get("role")
         if role not in dict(User.ROLE_CHOICES):
             raise ValidationError("Invalid role.")
+        if role == User.Admin:
+            raise ValidationError("Admin accounts are set up by an administrator.")
 
         return data
 
@@ -69,6 +71,9 @@ class UserSerializer(serializers.ModelSerializer):
             "is_active",
             "is_superadmin",
         ]
+        # Roles change through UpdateUserSerializer, which checks who is asking;
+        # the admin flags only in the Django admin.
+        read_only_fields = ["role", "is_admin", "is_staff", "is_superadmin"]
 
 
 from django.contrib.auth.password_validation import validate_password
@@ -87,7 +92,8 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         token["role"] = (user.role,)
         token["is_admin"] = user.is_admin
         try:
-            user_profile = UserProfile.objects.get(user=user)
+            # Loaded with the user by UserManager.get_by_natural_key.
+            user_profile = user.userprofile
             token["profile_pic"] = (
                 user_profile.profile_pic.url if user_profile.profile_pic else None
             )
@@ -157,6 +163,7 @@ from django.core.exceptions import ValidationError
 from rest_framework import serializers
 
 from .models import User
+from .permissions import role_allows
 
 
 class UpdateUserSerializer(serializers.ModelSerializer):
@@ -181,6 +188,15 @@ class UpdateUserSerializer(serializers.ModelSerializer):
         # Ensure passwords match if both are provided
         if "password" in data and data["password"] != data.get("password_confirm"):
             raise ValidationError("Passwords must match.")
+        # Users can't change their own role (or anyone's) unless they manage
+        # users.
+        request = self.context.get("request")
+        if (
+            "role" in data
+            and data["role"] != getattr(self.instance, "role", None)
+            and not (request and role_allows(request.user, "users.manage"))
+        ):
+            raise ValidationError("Only an administrator can change roles.")
         return data
 
     def update(self, instance, validated_data):
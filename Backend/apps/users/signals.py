@@ -1,27 +1,20 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .authentication import user_cache
 from .models import User, UserProfile
 
 
 @receiver(post_save, sender=User)
-def post_save_create_profile_receiver(sender, instance, created, **kwargs):
-    if created:
-        print("user is created")
-        UserProfile.objects.create(user=instance)
-    else:
-        try:
-            profile = UserProfile.objects.get(user=instance)
-            profile.save()
-            print("user profile is updated")
-        except:
-            UserProfile.objects.create(user=instance)
-            print("profile was not exist, but was created")
-        print("user is updated")
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
 
 
-# one way
-# post_save.connect(post_save_create_profile_receiver)
-@receiver(pre_save, sender=User)
-def pre_save_profile_receiver(sender, instance, **kwargs):
-    print(instance.first_name + " " + "this user is being saved")
+@receiver(post_save, sender=User)
+def post_save_create_profile_receiver(sender, instance, created, raw, **kwargs):
+    # Only on creation: updates (admin edits, last_login) leave the profile
+    # alone. Users without one, e.g. from older data, get it on first use
+    # through UserProfile.objects.for_user.
+    if created and not raw:
+        UserProfile.objects.get_or_create(user=instance)
@@ -1,3 +1,320 @@
-from django.test import TestCase
+import tempfile
+from io import StringIO
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.core.permissions import BlockReceptionForWriteActions
+
+from .authentication import CachedJWTAuthentication, ClaimsUser, user_cache
+from .models import User, UserProfile
+from .permissions import RolePermission, role_allows
+from .serializers import MyTokenObtainPairSerializer
+
+
+class AuthTestCase(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(
+            "Rep", "Orter", "rep@example.com", password="s3cret-pass"
+        )
+        self.user.role = User.Reception
+        self.user.is_active = True
+        self.user.save()
+
+    def token_for(self, user):
+        return str(MyTokenObtainPairSerializer.get_token(user).access_token)
+
+
+class CachedJWTAuthenticationTests(AuthTestCase):
+    def authenticate(self):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {self.token_for(self.user)}"
+        )
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_user_is_looked_up_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(), self.user)
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertIsNot(user, self.authenticate())
+
+    def test_saving_the_user_evicts_it(self):
+        self.authenticate()
+        self.user.role = User.Admin
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().role, User.Admin)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_writes_load_the_user_from_the_database(self):
+        self.authenticate()
+        # Changed by another process, so this one's cache isn't evicted.
+        User.objects.filter(pk=self.user.pk).update(role=User.Doctor)
+
+        request = APIRequestFactory().patch(
+            "/", HTTP_AUTHORIZATION=f"Bearer {self.token_for(self.user)}"
+        )
+        with self.assertNumQueries(1):
+            user = CachedJWTAuthentication().authenticate(request)[0]
+        self.assertEqual(user.role, User.Doctor)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().role, User.Doctor)
+
+    @override_settings(AUTH_USER_CACHE_SIZE=1)
+    def test_least_recently_used_user_is_dropped(self):
+        self.authenticate()
+        other = User.objects.create_user("Doc", "Tor", "doc@example.com")
+        user_cache.set(other.pk, other)
+
+        self.assertEqual(len(user_cache), 1)
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+    @override_settings(AUTH_USER_CACHE_TTL=0)
+    def test_entries_expire(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+
+class TokenClaimsTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.token_for(self.user)}"
+        )
+
+    def test_read_only_views_trust_the_token(self):
+        # Only the stock query; the user comes from the token.
+        with self.assertNumQueries(1):
+            response = self.client.get("/core/stocks/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.wsgi_request.user, ClaimsUser)
+        self.assertEqual(response.wsgi_request.user.role, User.Reception)
+        self.assertEqual(response.wsgi_request.user.get_role(), "Reception")
+
+    def test_writes_check_the_database(self):
+        self.user.role = User.Admin
+        self.user.save()
+
+        response = self.client.post("/core/stocks/", {})
+        # The token still says Reception, but the stored role is used.
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(AUTH_CLAIMS_MAX_AGE=-1)
+    def test_old_tokens_are_checked_against_the_database(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/core/stocks/")
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+
+class LoginTests(AuthTestCase):
+    def test_login_reads_user_and_profile_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = APIClient().post(
+                "/users/user/token/",
+                {"email": "rep@example.com", "password": "s3cret-pass"},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+
+
+class RolePermissionTests(AuthTestCase):
+    def check(self, permission, method, user, view=None):
+        request = SimpleNamespace(method=method, user=user)
+        return permission().has_permission(request, view or SimpleNamespace())
+
+    def test_registry(self):
+        admin = SimpleNamespace(is_authenticated=True, role=User.Admin)
+        doctor = SimpleNamespace(is_authenticated=True, role=User.Doctor)
+        superuser = SimpleNamespace(
+            is_authenticated=True, role=User.Reception, is_admin=True
+        )
+
+        self.assertTrue(role_allows(admin, "stock.change"))
+        self.assertFalse(role_allows(doctor, "stock.change"))
+        self.assertFalse(role_allows(self.user, "stock.change"))
+        self.assertTrue(role_allows(superuser, "stock.change"))
+        self.assertFalse(role_allows(AnonymousUser(), "records.write"))
+        with self.assertRaises(ImproperlyConfigured):
+            role_allows(admin, "stock.steal")
+
+    def test_views_declare_actions_per_method(self):
+        view = SimpleNamespace(role_permissions={"POST": "stock.change"})
+
+        self.assertTrue(self.check(RolePermission, "GET", self.user, view))
+        self.assertFalse(self.check(RolePermission, "POST", self.user, view))
+        self.assertTrue(self.check(BlockReceptionForWriteActions, "GET", self.user))
+        self.assertFalse(self.check(BlockReceptionForWriteActions, "PUT", self.user))
+
+    def test_checks_run_no_queries(self):
+        token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        view = SimpleNamespace(role_permissions={"POST": "stock.change"})
+        with self.assertNumQueries(0):
+            self.check(RolePermission, "POST", ClaimsUser(token), view)
+            self.check(RolePermission, "POST", self.user, view)
+
+    def test_stock_changes_need_the_admin_role(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.post("/core/stocks/", {}).status_code, 403)
+        self.assertEqual(client.post("/core/stocks/adjust-price/", {}).status_code, 403)
+
+        self.user.role = User.Admin
+        self.user.save()
+        self.assertEqual(client.post("/core/stocks/", {}).status_code, 400)
+
+
+class UserManagementTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user("Doc", "Tor", "doc@example.com")
+        self.client = APIClient()
+
+    def update(self, user, **changes):
+        # PATCH on this view replaces the whole record.
+        fields = {
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "email": user.email,
+            **changes,
+        }
+        return self.client.patch(f"/users/update/{user.pk}/", fields)
+
+    def test_signup_cannot_pick_the_admin_role(self):
+        response = self.client.post(
+            "/users/create/",
+            {
+                "first_name": "Mal",
+                "last_name": "Lory",
+                "email": "mal@example.com",
+                "role": User.Admin,
+                "password": "s3cret-pass",
+                "password_confirm": "s3cret-pass",
+            },
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(email="mal@example.com").exists())
+
+    def test_the_admin_role_alone_cannot_manage_users(self):
+        self.user.role = User.Admin
+        self.user.save()
+        self.client.force_authenticate(self.user)
+
+        response = self.update(self.other, first_name="X")
+        self.assertEqual(response.status_code, 403)
+        self.client.delete(f"/users/delete/{self.other.pk}/")
+        self.assertTrue(User.objects.filter(pk=self.other.pk).exists())
+
+    def test_users_cannot_change_their_own_role(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.update(self.user, role=User.Admin)
+        self.assertEqual(response.status_code, 400)
+        response = self.update(self.user, first_name="Re", role=User.Reception)
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.role, User.Reception)
+
+    def test_django_admins_manage_users(self):
+        self.user.is_admin = True
+        self.user.save()
+        self.client.force_authenticate(self.user)
+
+        response = self.update(self.other, role=User.Admin)
+        self.assertEqual(response.status_code, 200)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.role, User.Admin)
+
+    def test_user_viewset_writes_need_users_manage(self):
+        url = f"/users/api/users/{self.other.pk}/"
+        response = self.client.patch(url, {"is_admin": True}, format="json")
+        self.assertIn(response.status_code, (401, 403))
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(url, {"first_name": "X"}, format="json")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.user.is_admin = True
+        self.user.save()
+        response = self.client.patch(
+            url,
+            {"first_name": "X", "is_admin": True, "role": User.Admin},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.first_name, "X")
+        self.assertFalse(self.other.is_admin)
+        self.assertNotEqual(self.other.role, User.Admin)
+
+
+class UserProfileLifecycleTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("Rep", "Orter", "rep@example.com")
+
+    def test_profile_is_created_with_the_user_only(self):
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+
+        self.user.first_name = "Re"
+        with self.assertNumQueries(1):
+            self.user.save()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=["last_login"])
+
+    def test_missing_profile_is_created_on_first_access(self):
+        UserProfile.objects.filter(user=self.user).delete()
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get("/users/profiles/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user_email"], "rep@example.com")
+
+
+class ImportUsersTests(TestCase):
+    def run_import(self, rows, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+            f.write("first_name,last_name,email,role,phone_number\n")
+            f.writelines(f"{row}\n" for row in rows)
+            f.flush()
+            out = StringIO()
+            call_command("import_users", f.name, *args, stdout=out)
+        return out.getvalue()
+
+    def test_users_and_profiles_are_bulk_created(self):
+        User.objects.create_user("Old", "Timer", "old@example.com")
+        rows = [f"User,{n},user{n}@example.com,doctor," for n in range(20)]
+        rows += ["Old,Timer,old@example.com,,", "User,0,user0@example.com,2,"]
+
+        # Existing emails, users, profiles, plus the savepoints around them.
+        with self.assertNumQueries(5):
+            out = self.run_import(rows, "--active")
+
+        self.assertIn("Imported 20 user(s); skipped 2", out)
+        imported = User.objects.filter(email__startswith="user")
+        self.assertEqual(imported.count(), 20)
+        self.assertEqual(UserProfile.objects.filter(user__in=imported).count(), 20)
+        user = imported.get(email="user0@example.com")
+        self.assertEqual(user.role, User.Doctor)
+        self.assertTrue(user.is_active)
+        self.assertFalse(user.has_usable_password())
+
+    def test_bad_rows_stop_the_import(self):
+        with self.assertRaisesMessage(CommandError, "Line 3: unknown role"):
+            self.run_import(["A,B,a@example.com,,", "C,D,c@example.com,chef,"])
+        self.assertFalse(User.objects.filter(email="a@example.com").exists())
@@ -6,6 +6,8 @@ from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
+from apps.notifications import outbox
+
 
 def detect_user(user):
     if user.role == 1:
@@ -19,23 +21,16 @@ def detect_user(user):
         return redirect_url
 
 
-import datetime
-
 from django.contrib.auth.tokens import default_token_generator
-from django.contrib.sites.shortcuts import get_current_site
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
+from apps.notifications import notify
+
 
 def send_verification_email(request, user):
-    """Send the activation email with the verification link."""
-    # Get the current site domain for the URL
-    current_site = get_current_site(request)
-    protocol = (
-        "https" if request.is_secure() else "http"
-    )  # Handle secure protocol (HTTP/HTTPS)
+    """Queue the activation email with the verification link."""
+    site = notify.site_context(request)
 
     # Generate the token and uid
     uid = urlsafe_base64_encode(force_bytes(user.pk))
@@ -43,35 +38,26 @@ def send_verification_email(request, user):
 
     # Create the activation link
     activation_link = (
-        f"{protocol}://{current_site.domain}/users/activate/{uid}/{token}/"
+        f"{site['protocol']}://{site['domain']}/users/activate/{uid}/{token}/"
     )
 
-    print(f"Generated Activation Link: {activation_link}")
-
-    # Get the current year for the footer
-    current_year = datetime.datetime.now().year
-
-    # Prepare the email message
-    email_subject = "Activate Your Account"
-    email_message = render_to_string(
+    # Sent by the send_outbox worker once the caller's transaction commits.
+    notify.notify(
         "activation_email.html",
-        {
-            "user": user,
-            "domain": current_site.domain,
-            "uid": uid,
-            "token": token,
-            "activation_link": activation_link,  # Pass the full URL here
-            "current_year": current_year,  # Pass current year for footer
-        },
-    )
-
-    email = EmailMessage(
-        subject=email_subject,
-        body=email_message,
-        to=[user.email],
+        "Activate Your Account",
+        [
+            (
+                user.email,
+                {
+                    "user": user,
+                    "uid": uid,
+                    "token": token,
+                    "activation_link": activation_link,
+                },
+            )
+        ],
+        context=site,
     )
-    email.content_subtype = "html"  # Send as HTML email
-    email.send()
 
 
 def send_reset_password_email(request, user):
@@ -90,7 +76,7 @@ def send_reset_password_email(request, user):
     to_email = user.email
     mail = EmailMessage(email_subject, message, form_email, to=[to_email])
     mail.content_subtype = "html"
-    mail.send()
+    outbox.queue_message(mail)
 
 
 def send_notification(mail_subject, mail_template, context):
@@ -103,4 +89,4 @@ def send_notification(mail_subject, mail_template, context):
         to_email = context["to_email"]
     mail = EmailMessage(mail_subject, message, from_email, to_email)
     mail.content_subtype = "html"
-    mail.send()
+    outbox.queue_message(mail)
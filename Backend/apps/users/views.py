@@ -14,13 +14,14 @@ from rest_framework.authentication import (
 )
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound, PermissionDenied
-from rest_framework.permissions import AllowAny, BasePermission, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 from .models import User, UserProfile
+from .permissions import RolePermission, role_allows
 from .serializers import (
     CreateUserSerializer,
     MyTokenObtainPairSerializer,
@@ -37,7 +38,13 @@ User = get_user_model()
 class UserViewSet(ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    permission_classes = [AllowAny]
+    permission_classes = [AllowAny, RolePermission]
+    role_permissions = {
+        "POST": "users.manage",
+        "PUT": "users.manage",
+        "PATCH": "users.manage",
+        "DELETE": "users.manage",
+    }
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -83,25 +90,6 @@ class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
-class IsDesigner(BasePermission):
-
-    def has_permission(self, request, view):
-        role = request.user.role
-        return role == 1
-
-
-class IsReception(BasePermission):
-    def has_permission(self, request, view):
-        role = request.user.role
-        return role == 2
-
-
-class IsAdmin(BasePermission):
-    def has_permission(self, request, view):
-        role = request.user.role
-        return role == 0
-
-
 # views.py
 
 
@@ -110,23 +98,13 @@ class UserProfileView(APIView):
 
     def get(self, request):
         # Retrieve the user profile for the logged-in user
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-            serializer = UserProfileSerializer(profile)
-            return Response(serializer.data)
-        except UserProfile.DoesNotExist:
-            return Response(
-                {"detail": "User profile not found."}, status=status.HTTP_404_NOT_FOUND
-            )
+        profile = UserProfile.objects.for_user(request.user)
+        serializer = UserProfileSerializer(profile)
+        return Response(serializer.data)
 
     def put(self, request):
-        try:
-            # Get the user profile related to the authenticated user
-            profile = UserProfile.objects.get(user=request.user)
-        except UserProfile.DoesNotExist:
-            return Response(
-                {"detail": "User profile not found."}, status=status.HTTP_404_NOT_FOUND
-            )
+        # Get the user profile related to the authenticated user
+        profile = UserProfile.objects.for_user(request.user)
 
         # Update profile data using the serializer with the request data (partial=True allows partial updates)
         serializer = UserProfileSerializer(profile, data=request.data, partial=True)
@@ -213,7 +191,7 @@ class UpdateUserView(generics.UpdateAPIView):
 
         user = self.request.user
         try:
-            if user.is_staff:  # Admin can update any user
+            if role_allows(user, "users.manage"):  # Admin can update any user
                 return User.objects.get(pk=self.kwargs["pk"])
             elif (
                 user.id == self.kwargs["pk"]
@@ -240,7 +218,7 @@ class DeleteUserView(generics.DestroyAPIView):
 
     def get_object(self):
         user = self.request.user
-        if user.is_staff:  # Admin can delete any user
+        if role_allows(user, "users.manage"):  # Admin can delete any user
             return User.objects.get(pk=self.kwargs["pk"])
         else:  # Regular users can only delete their own account
             return user
@@ -248,8 +226,8 @@ class DeleteUserView(generics.DestroyAPIView):
     def delete(self, request, *args, **kwargs):
         user = self.get_object()
 
-        if (
-            user == request.user or request.user.is_staff
+        if user == request.user or role_allows(
+            request.user, "users.manage"
         ):  # Check if the user is deleting themselves or is an admin
             user.delete()
             return Response(
@@ -1,7 +1,9 @@
+from copy import deepcopy
 from pathlib import Path
 
 from decouple import config
 from django import conf
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,6 +50,8 @@ LOCAL_APPS = [
     "apps.users.apps.UsersConfig",
     "apps.core.apps.CoreConfig",
     "apps.reports.apps.ReportsConfig",
+    "apps.notifications.apps.NotificationsConfig",
+    "apps.api.apps.ApiConfig",
 ]
 
 
@@ -80,6 +84,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "apps.core.replicas.ReplicaMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -106,13 +111,123 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE picks the backend: "sqlite" (the default, a single file next to
+# manage.py) or "postgres". Move an existing SQLite file over with
+# ``manage.py copy_sqlite_data db.sqlite3`` after migrating the new database.
+DB_ENGINE = config("DB_ENGINE", default="sqlite")
+
+if DB_ENGINE == "postgres":
+    INSTALLED_APPS += ["django.contrib.postgres"]
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": config("DB_NAME", default="abolfazl_opd"),
+            "USER": config("DB_USER", default="postgres"),
+            "PASSWORD": config("DB_PASSWORD", default=""),
+            "HOST": config("DB_HOST", default="localhost"),
+            "PORT": config("DB_PORT", default=5432, cast=int),
+            # psycopg's pool hands each request an open connection; Django
+            # requires CONN_MAX_AGE = 0 when it is enabled.
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {
+                "pool": {
+                    "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+                    "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+                    # Seconds a request waits for a free connection.
+                    "timeout": config("DB_POOL_TIMEOUT", default=10, cast=int),
+                },
+            },
+        }
+    }
+elif DB_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": config("DB_NAME", default=str(BASE_DIR / "db.sqlite3")),
+            # Keep connections open between requests (seconds; 0 closes them
+            # after every request), checking they still work before reuse.
+            "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=600, cast=int),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                # Take the write lock when a transaction starts. A deferred
+                # transaction that reads first and writes later can't wait
+                # for the lock, so it fails with "database is locked"
+                # straight away.
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        f"DB_ENGINE must be 'sqlite' or 'postgres', not {DB_ENGINE!r}."
+    )
+
+# Optional read replica for reports, lists and exports (apps.core.replicas):
+# DB_REPLICA_HOST for a PostgreSQL streaming replica, or DB_REPLICA_NAME for
+# a copy of the SQLite file kept in step by an external replicator. Tests
+# read the primary through it.
+if DB_ENGINE == "postgres" and config("DB_REPLICA_HOST", default=""):
+    DATABASES["replica"] = {
+        **deepcopy(DATABASES["default"]),
+        "HOST": config("DB_REPLICA_HOST"),
+        "PORT": config("DB_REPLICA_PORT", default=5432, cast=int),
+        "TEST": {"MIRROR": "default"},
+    }
+elif DB_ENGINE == "sqlite" and config("DB_REPLICA_NAME", default=""):
+    DATABASES["replica"] = {
+        **deepcopy(DATABASES["default"]),
+        "NAME": config("DB_REPLICA_NAME"),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["apps.core.replicas.ReplicaRouter"]
+# How long after a write a client keeps reading from the primary.
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=5, cast=int)
+
+# Pragmas applied to each new SQLite connection by apps.core.db. WAL lets
+# reads go on while a write commits; synchronous=NORMAL only syncs at
+# checkpoints, which is safe with WAL (a power cut can lose the last
+# commits but never corrupts the file). cache_size is negative KiB.
+SQLITE_PRAGMAS = {
+    "journal_mode": config("SQLITE_JOURNAL_MODE", default="wal"),
+    "synchronous": config("SQLITE_SYNCHRONOUS", default="normal"),
+    # Milliseconds to wait for another connection's write lock.
+    "busy_timeout": config("SQLITE_BUSY_TIMEOUT_MS", default=20000, cast=int),
+    "cache_size": config("SQLITE_CACHE_SIZE", default=-64000, cast=int),
+    "mmap_size": config("SQLITE_MMAP_SIZE", default=268435456, cast=int),
+    "temp_store": "memory",
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory is per process; with several workers point CACHE_BACKEND at
+# django.core.cache.backends.filebased.FileBasedCache and CACHE_LOCATION at a
+# directory they share.
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="abolfazl-opd"),
     }
 }
 
+REPORTS_CACHE_ALIAS = "default"
+REPORTS_CACHE_TIMEOUT = config("REPORTS_CACHE_TIMEOUT", default=300, cast=int)
+# Most series points a range report computes in the request; longer ranges
+# need a larger bucket or a report job.
+REPORT_MAX_BUCKETS = config("REPORT_MAX_BUCKETS", default=400, cast=int)
+# How long a finished report job is reused for the same window (as long as
+# nothing it reads has changed), and how long a job may run before
+# run_report_jobs assumes its worker died and queues it again.
+REPORT_JOB_REUSE_SECONDS = config("REPORT_JOB_REUSE_SECONDS", default=3600, cast=int)
+REPORT_JOB_STALE_SECONDS = config("REPORT_JOB_STALE_SECONDS", default=600, cast=int)
+# Jobs run outside the request, so they may span more buckets than
+# REPORT_MAX_BUCKETS, but not without limit.
+REPORT_JOB_MAX_BUCKETS = config("REPORT_JOB_MAX_BUCKETS", default=5000, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -162,7 +277,7 @@ from datetime import timedelta
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -180,6 +295,12 @@ SIMPLE_JWT = {
     "AUTH_HEADER_NAME": "HTTP_AUTHORIZATION",
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
 }
+# apps.users.authentication: how many users to keep cached per process and
+# for how long, and how recent a token must be for views with
+# token_claims = True to trust its claims without looking the user up.
+AUTH_USER_CACHE_SIZE = config("AUTH_USER_CACHE_SIZE", default=1024, cast=int)
+AUTH_USER_CACHE_TTL = config("AUTH_USER_CACHE_TTL", default=60, cast=int)
+AUTH_CLAIMS_MAX_AGE = config("AUTH_CLAIMS_MAX_AGE", default=300, cast=int)
 DJOSER = {
     "LOGIN_FIELD": "email",
     "USER_CREATE_PASSWORD_RETYPE": True,
@@ -207,3 +328,14 @@ EMAIL_USE_TLS = config("EMAIL_USE_TLS", cast=bool)
 EMAIL_HOST_USER = config("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL")
+# Used for links in emails sent outside a request (apps.notifications.notify).
+SITE_DOMAIN = config("SITE_DOMAIN", default="localhost:8000")
+SITE_PROTOCOL = config("SITE_PROTOCOL", default="http")
+# apps.notifications.outbox: how many emails send_outbox sends per SMTP
+# connection, and the retry schedule (doubling from the base delay up to
+# the maximum) before an email is marked failed.
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", default=100, cast=int)
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", default=8, cast=int)
+OUTBOX_RETRY_BASE_SECONDS = config("OUTBOX_RETRY_BASE_SECONDS", default=30, cast=int)
+OUTBOX_RETRY_MAX_SECONDS = config("OUTBOX_RETRY_MAX_SECONDS", default=3600, cast=int)
+OUTBOX_STALE_SECONDS = config("OUTBOX_STALE_SECONDS", default=600, cast=int)
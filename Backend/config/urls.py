@@ -35,6 +35,7 @@ urlpatterns = [
     path("users/", include("apps.users.urls")),
     path("core/", include("apps.core.urls")),
     path("reports/", include("apps.reports.urls")),
+    path("api/", include("apps.api.urls")),
 ]
 admin.site.site_header = "Tamadon Admin"
 admin.site.site_title = "Tamando Admin Area."